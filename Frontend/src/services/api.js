@@ -3,6 +3,11 @@ const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000/api
 // Simple fetch wrapper that adds auth token
 const api = {
   async request(endpoint, options = {}) {
+    const response = await this.send(endpoint, options);
+    return response.json();
+  },
+
+  async send(endpoint, options = {}) {
     const token = localStorage.getItem('token');
     const headers = {
       'Content-Type': 'application/json',
@@ -23,13 +28,27 @@ const api = {
       throw new Error(error.error || 'Request failed');
     }
 
-    return response.json();
+    return response;
   },
 
   get(endpoint) {
     return this.request(endpoint, { method: 'GET' });
   },
 
+  // List endpoints return one page at a time; follow X-Next-Cursor to get every row
+  async getAll(endpoint) {
+    const rows = [];
+    let after = null;
+    do {
+      const separator = endpoint.includes('?') ? '&' : '?';
+      const url = after ? `${endpoint}${separator}after=${encodeURIComponent(after)}` : endpoint;
+      const response = await this.send(url, { method: 'GET' });
+      rows.push(...(await response.json()));
+      after = response.headers.get('X-Next-Cursor');
+    } while (after);
+    return rows;
+  },
+
   post(endpoint, data) {
     return this.request(endpoint, {
       method: 'POST',
@@ -6,7 +6,7 @@ export const chatService = {
   },
 
   getChatHistory: async () => {
-    return await api.get('/chats');
+    return await api.getAll('/chats');
   },
 
   clearChatHistory: async () => {
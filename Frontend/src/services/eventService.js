@@ -2,7 +2,7 @@ import api from './api';
 
 const eventService = {
   getAllEvents: async () => {
-    return await api.get('/events');
+    return await api.getAll('/events');
   },
 
   getEventById: async (eventId) => {
@@ -22,7 +22,7 @@ const eventService = {
   },
 
   getEventsByOrg: async (orgId) => {
-    return await api.get(`/events/by_org/${orgId}`);
+    return await api.getAll(`/events/by_org/${orgId}`);
   }
 };
 
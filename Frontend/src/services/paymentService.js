@@ -6,6 +6,6 @@ export const paymentService = {
   },
 
   getUserPayments: async (userId) => {
-    return await api.get(`/payments/by_user/${userId}`);
+    return await api.getAll(`/payments/by_user/${userId}`);
   }
 };
\ No newline at end of file
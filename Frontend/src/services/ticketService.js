@@ -10,11 +10,11 @@ export const ticketService = {
   },
 
   getUserTickets: async (userId) => {
-    return await api.get(`/tickets/by_user/${userId}`);
+    return await api.getAll(`/tickets/by_user/${userId}`);
   },
 
   getEventTickets: async (eventId) => {
-    return await api.get(`/tickets/event/${eventId}`);
+    return await api.getAll(`/tickets/event/${eventId}`);
   },
 
   updateTicketStatus: async (ticketId, status) => {
@@ -1,5 +1,8 @@
 from flask import Flask
 from flask_cors import CORS
+import database
+import metrics
+import query_trace
 from database import get_db_connection
 from routes.users import users_bp
 from routes.organizations import orgs_bp
@@ -9,14 +12,52 @@ from routes.payments import payments_bp
 from routes.chats import chats_bp
 from routes.advertisements import advertisements_bp
 import config
+from auth import protect_blueprint
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
-def create_app():
+def start_background_jobs(singletons=True):
+    """
+    Start this process's background threads
+
+    The check-in preloader fills an in-process cache, so every serving
+    process runs it. The attendance reconciler and revenue rollup worker
+    act on the shared database; with several workers pass
+    singletons=False to all but one of them.
+    """
+    # Load door check-in hot sets ahead of each event's access times
+    from services.checkin_service import start_preloader
+    start_preloader()
+
+    # Share this process's request metrics with the other workers (METRICS_DIR)
+    metrics.start_snapshot_writer()
+
+    if not singletons:
+        return
+
+    # Periodically recount per-event ticket counters from TICKETS
+    from services.attendance_service import start_reconciler
+    start_reconciler()
+
+    # Fold new payments into the revenue rollups
+    from services.payment_service import start_rollup_worker
+    start_rollup_worker()
+
+def create_app(start_background=True):
     app = Flask(__name__)
-    CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization"]}})
+    database.init_app(app)
+    metrics.init_app(app)
+    query_trace.init_app(app)
+    if os.getenv("RUN_MIGRATIONS", "false").lower() in ("1", "true", "yes"):
+        import migrate
+        migrate.run_migrations()
+    CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization"], "expose_headers": ["X-Next-Cursor", "Link", "Server-Timing"]}})
+
+    # Verify bearer tokens on every API blueprint (AUTH_MODE decides whether one is required)
+    for blueprint in (users_bp, orgs_bp, events_bp, tickets_bp, payments_bp, chats_bp, advertisements_bp):
+        protect_blueprint(blueprint)
 
     # Register blueprints
     app.register_blueprint(users_bp, url_prefix='/api/users')
@@ -27,6 +68,19 @@ def create_app():
     app.register_blueprint(chats_bp, url_prefix='/api/chats')
     app.register_blueprint(advertisements_bp, url_prefix='/api/advertisements')
 
+    # Build the chat search index up front instead of on the first chat message
+    if os.getenv("SEARCH_INDEX_PRELOAD", "true").lower() in ("1", "true", "yes"):
+        from services.search_index import event_index
+        try:
+            event_index.refresh()
+        except Exception as e:
+            print(f"Search index preload failed, will retry on first search: {e}")
+
+    # Under gunicorn the master preloads the app and each worker starts its
+    # own threads after fork (see wsgi.init_worker); threads don't survive fork
+    if start_background:
+        start_background_jobs()
+
     @app.get("/")
     def home():
         return {
@@ -58,5 +112,6 @@ def create_app():
     return app
 
 if __name__ == "__main__":
+    # Development server only; production runs gunicorn -c gunicorn.conf.py wsgi:app
     app = create_app()
     app.run(debug=True)
\ No newline at end of file
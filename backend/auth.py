@@ -0,0 +1,61 @@
+import os
+from flask import g, jsonify, request
+from services.auth_service import token_verifier
+
+# off: tokens are ignored. optional: a valid bearer token sets g.principal,
+# a missing or bad one leaves it None. required: every non-public endpoint
+# needs a valid token.
+AUTH_MODE = os.getenv("AUTH_MODE", "optional").lower()
+
+# Endpoints reachable without a token in "required" mode (sign-up, login, health)
+PUBLIC_ENDPOINTS = {
+    "users.create_user",
+    "users.login_user",
+    "organizations.create_org",
+    "organizations.login_org",
+}
+
+
+def protect_blueprint(blueprint, public=()):
+    """
+    Run bearer-token authentication before every request to `blueprint`
+
+    Safe to call more than once per blueprint (create_app() may run several
+    times in one process); the hook is only added the first time.
+
+    Args:
+        blueprint: Blueprint to guard
+        public: Extra endpoint names that never need a token
+    """
+    PUBLIC_ENDPOINTS.update(public)
+    if getattr(blueprint, "_auth_protected", False):
+        return
+    blueprint._auth_protected = True
+    blueprint.before_request(authenticate)
+
+
+def authenticate():
+    """before_request hook: put the verified principal (or None) on g.principal"""
+    g.principal = None
+    if AUTH_MODE == "off" or request.method == "OPTIONS":
+        return None
+    token = bearer_token()
+    if token:
+        g.principal = token_verifier.verify(token)
+    if g.principal is None and AUTH_MODE == "required" and request.endpoint not in PUBLIC_ENDPOINTS:
+        if token:
+            return jsonify({"error": "Invalid or expired token"}), 401
+        return jsonify({"error": "Authentication required"}), 401
+    return None
+
+
+def bearer_token():
+    header = request.headers.get("Authorization", "")
+    if header[:7].lower() == "bearer ":
+        return header[7:].strip() or None
+    return None
+
+
+def current_principal():
+    """The authenticated principal for this request, or None"""
+    return g.get("principal")
@@ -0,0 +1,95 @@
+"""
+Cost of bearer-token verification, cached vs uncached
+
+Mints HS256 tokens shaped like the ones users.login_user issues, then
+verifies them repeatedly with TokenVerifier: once with the verified-token
+cache disabled (every call decodes and checks the HMAC) and once with it on.
+The second part runs the same comparison through the Flask app with
+AUTH_MODE=required against GET /api/users/auth/stats. No database needed.
+
+Usage:
+    python benchmarks/auth_bench.py [--tokens 1000] [--calls 200000] [--requests 5000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["AUTH_MODE"] = "required"
+os.environ["AUTH_REVOCATION_POLL"] = "0"
+os.environ.setdefault("SEARCH_INDEX_PRELOAD", "false")
+os.environ.setdefault("CHECKIN_PRELOAD_INTERVAL", "0")
+os.environ.setdefault("ATTENDANCE_RECONCILE_INTERVAL", "0")
+os.environ.setdefault("ROLLUP_INTERVAL", "0")
+
+import jwt
+import config
+from services.auth_service import TokenVerifier
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def mint(count):
+    exp = datetime.utcnow() + timedelta(hours=24)
+    return [jwt.encode({"user_id": i, "email": f"user{i}@example.com", "exp": exp}, config.SECRET_KEY, algorithm="HS256")
+            for i in range(1, count + 1)]
+
+
+def time_verify(verifier, plan):
+    started = time.perf_counter()
+    for token in plan:
+        if verifier.verify(token) is None:
+            raise RuntimeError("token failed verification")
+    return time.perf_counter() - started
+
+
+def time_requests(client, plan):
+    latencies = []
+    for token in plan:
+        t = time.perf_counter()
+        response = client.get("/api/users/auth/stats", headers={"Authorization": f"Bearer {token}"})
+        latencies.append(time.perf_counter() - t)
+        if response.status_code != 200:
+            raise RuntimeError(f"request rejected: {response.status_code}")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=1000, help="distinct tokens (active sessions)")
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    tokens = mint(args.tokens)
+    rng = random.Random(3)
+    plan = [rng.choice(tokens) for _ in range(args.calls)]
+
+    print(f"TokenVerifier.verify, {args.calls} calls over {args.tokens} tokens")
+    for label, verifier in (("uncached", TokenVerifier(cache_size=0, revocation_poll=0)),
+                            ("cached", TokenVerifier(cache_size=args.tokens * 2, revocation_poll=0))):
+        elapsed = time_verify(verifier, plan)
+        print(f"  {label:<9} {elapsed / args.calls * 1e6:7.2f}us/call  hit rate {verifier.stats()['hit_rate']:.3f}")
+
+    from app import create_app
+    from services.auth_service import token_verifier
+    client = create_app().test_client()
+    plan = plan[:args.requests]
+    print(f"GET /api/users/auth/stats with AUTH_MODE=required, {len(plan)} requests")
+    for label, maxsize in (("uncached", 0), ("cached", args.tokens * 2)):
+        token_verifier.reset()
+        token_verifier.cache.maxsize = maxsize
+        latencies = time_requests(client, plan)
+        print(f"  {label:<9} p50 {statistics.median(latencies) * 1e6:7.1f}us  p99 {percentile(latencies, 99) * 1e6:7.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Time-to-first-byte of POST /api/chats versus POST /api/chats/stream
+
+Runs the Flask app in-process against the offline LLM stub and an index
+of synthetic events (no MySQL needed), fires concurrent chat requests at
+both endpoints and reports time to first byte and total time. Messages
+carry distinct price ceilings so the reply cache doesn't absorb them.
+
+Usage:
+    python benchmarks/chat_stream_bench.py [--threads 16] [--requests 400] [--latency 0.3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(client, path, threads, requests, offset):
+    timings = []
+    lock = threading.Lock()
+    counter = [0]
+
+    def worker():
+        while True:
+            with lock:
+                if counter[0] >= requests:
+                    return
+                counter[0] += 1
+                n = counter[0]
+            started = time.perf_counter()
+            response = client.post(path, json={"message": f"music under ${offset + n}"}, buffered=False)
+            first = None
+            for _ in response.response:
+                if first is None:
+                    first = time.perf_counter() - started
+            response.close()
+            total = time.perf_counter() - started
+            with lock:
+                timings.append((first if first is not None else total, total))
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return timings, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub LLM seconds per reply")
+    parser.add_argument("--events", type=int, default=20000)
+    args = parser.parse_args()
+
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["LLM_STUB_LATENCY"] = str(args.latency)
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(args.threads))
+    os.environ["SEARCH_INDEX_PRELOAD"] = "false"
+
+    from benchmarks.search_index_bench import synthetic_events
+    from services.search_index import event_index
+    from services.chat_history import chat_writer
+    from app import create_app
+
+    event_index.build(synthetic_events(args.events))
+    client = create_app().test_client()
+
+    for i, path in enumerate(("/api/chats", "/api/chats/stream")):
+        timings, wall = run(client, path, args.threads, args.requests, offset=i * args.requests)
+        first = [t[0] for t in timings]
+        total = [t[1] for t in timings]
+        print(f"{path:<18} {len(timings) / wall:7.1f} req/s  "
+              f"TTFB p50 {statistics.median(first) * 1000:7.1f}ms p95 {percentile(first, 95) * 1000:7.1f}ms  "
+              f"total p50 {statistics.median(total) * 1000:7.1f}ms p95 {percentile(total, 95) * 1000:7.1f}ms")
+    chat_writer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Door scan latency for POST /api/tickets/check_in
+
+Preloads one event's hot set (from MySQL with --event-id, otherwise from
+synthetic ticket rows) and times duplicate scans through the Flask app.
+Every scanned ticket is marked as already checked in, so no scan here
+should touch the database; the synthetic run has no database at all.
+
+Usage:
+    python benchmarks/checkin_bench.py [--tickets 50000] [--scans 5000] [--event-id N]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SEARCH_INDEX_PRELOAD", "false")
+os.environ.setdefault("CHECKIN_PRELOAD_INTERVAL", "0")
+
+from app import create_app
+from database import get_db_connection
+from services.checkin_service import door_hot_set
+
+
+class SyntheticTickets:
+    """Just enough of a cursor for DoorHotSet.load_event()"""
+
+    def __init__(self, count):
+        self.rows = [(i, f"QR-{i:08d}", "active", "2026-10-18 18:00:00") for i in range(1, count + 1)]
+
+    def execute(self, sql, params=()):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickets", type=int, default=50000)
+    parser.add_argument("--scans", type=int, default=5000)
+    parser.add_argument("--event-id", type=int, help="preload this event from MySQL instead of synthetic rows")
+    args = parser.parse_args()
+
+    event_id = args.event_id or 1
+    started = time.perf_counter()
+    if args.event_id:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        loaded = door_hot_set.load_event(cursor, event_id)
+        cursor.close()
+        conn.close()
+    else:
+        loaded = door_hot_set.load_event(SyntheticTickets(args.tickets), event_id)
+    print(f"Preloaded {loaded} tickets in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    with door_hot_set._lock:
+        codes = list(door_hot_set._by_qr)
+    for code in codes:
+        door_hot_set.mark_checked_in(code, "2026-10-18 18:00:00")
+
+    client = create_app().test_client()
+    rng = random.Random(1)
+    latencies = []
+    statuses = {}
+    for _ in range(args.scans):
+        body = {"qr_code": rng.choice(codes), "event_id": event_id}
+        t = time.perf_counter()
+        response = client.post("/api/tickets/check_in", json=body)
+        latencies.append(time.perf_counter() - t)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    print(f"Duplicate scans: {args.scans}, statuses {statuses}")
+    print(f"  p50 {statistics.median(latencies) * 1000:.3f}ms  p95 {percentile(latencies, 95) * 1000:.3f}ms  "
+          f"p99 {percentile(latencies, 99) * 1000:.3f}ms  (full Flask request/response cycle)")
+
+
+if __name__ == "__main__":
+    main()
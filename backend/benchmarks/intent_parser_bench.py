@@ -0,0 +1,120 @@
+"""
+Check the chat intent parser against its golden corpus and time it
+
+intent_corpus.json pins parse_intent() output for a set of chat messages
+at a fixed reference time ("now"; a case may set its own). The timing compares the compiled single-pass
+parser with the substring loops analyze_user_request used before, on the
+same messages, both as written and wrapped in chat-length filler text.
+
+Usage:
+    python benchmarks/intent_parser_bench.py [--iterations 20000] [--update]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.intent_parser import parse_intent
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_corpus.json")
+FILLER = ("Hi! My friends and I are visiting the city for a few days and we would love some suggestions. ",
+          " Thanks so much for the help, looking forward to it!")
+
+
+def legacy_analyze(message):
+    """analyze_user_request as it was before the compiled parser, kept as the baseline"""
+    message_lower = message.lower()
+    search_params = {'keywords': [], 'max_price': None, 'event_type': None}
+    if any(word in message_lower for word in ['free', 'no cost', 'zero price']):
+        search_params['max_price'] = 0
+    elif any(word in message_lower for word in ['cheap', 'affordable', 'budget', 'under $20', 'under 20']):
+        search_params['max_price'] = 20
+    elif any(word in message_lower for word in ['under $50', 'under 50']):
+        search_params['max_price'] = 50
+    event_types = {
+        'music': ['music', 'concert', 'festival', 'band', 'dj', 'song'],
+        'tech': ['tech', 'technology', 'coding', 'developer', 'startup', 'ai', 'programming', 'conference'],
+        'sports': ['sport', 'game', 'match', 'football', 'basketball', 'soccer', 'baseball', 'tournament'],
+        'food': ['food', 'cooking', 'dinner', 'restaurant', 'cooking', 'cuisine', 'taste', 'culinary', 'chef'],
+        'art': ['art', 'painting', 'gallery', 'exhibition', 'artist', 'craft'],
+        'culture': ['cultural', 'culture', 'performance', 'theater', 'dance', 'musical'],
+        'business': ['business', 'workshop', 'seminar', 'training', 'career', 'networking'],
+    }
+    for event_type, keywords in event_types.items():
+        if any(keyword in message_lower for keyword in keywords):
+            search_params['event_type'] = event_type
+            search_params['keywords'].extend(keywords[:2])
+            break
+    for location in ['downtown', 'park', 'center', 'hall', 'garden', 'beach']:
+        if location in message_lower:
+            search_params['keywords'].append(location)
+    return search_params
+
+
+def _serialize(params):
+    return {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in params.items()}
+
+
+def case_now(corpus, case):
+    return datetime.fromisoformat(case.get("now", corpus["now"]))
+
+
+def check_corpus(corpus):
+    """Returns a list of (message, expected, actual) for every case that differs"""
+    failures = []
+    for case in corpus["cases"]:
+        actual = _serialize(parse_intent(case["message"], case_now(corpus, case)))
+        if actual != case["expected"]:
+            failures.append((case["message"], case["expected"], actual))
+    return failures
+
+
+def timed(fn, messages, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(messages[i % len(messages)])
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--update", action="store_true", help="rewrite the expected output from the current parser")
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    if args.update:
+        for case in corpus["cases"]:
+            case["expected"] = _serialize(parse_intent(case["message"], case_now(corpus, case)))
+        with open(CORPUS_PATH, "w", encoding="utf-8") as f:
+            json.dump(corpus, f, indent=2)
+            f.write("\n")
+        print(f"Updated {len(corpus['cases'])} case(s)")
+        return
+
+    failures = check_corpus(corpus)
+    for message, expected, actual in failures:
+        print(f"MISMATCH {message!r}\n  expected {expected}\n  actual   {actual}")
+    print(f"Corpus: {len(corpus['cases']) - len(failures)}/{len(corpus['cases'])} passed")
+
+    now = datetime.fromisoformat(corpus["now"])
+    short = [case["message"] for case in corpus["cases"]]
+    padded = [FILLER[0] + message + FILLER[1] for message in short]
+    for label, messages in (("short", short), ("padded", padded)):
+        compiled = timed(lambda m: parse_intent(m, now), messages, args.iterations)
+        legacy = timed(legacy_analyze, messages, args.iterations)
+        print(f"{label:<7} parse_intent     {compiled * 1e6:8.2f} us/message")
+        print(f"{label:<7} legacy substring {legacy * 1e6:8.2f} us/message ({legacy / compiled:.2f}x)")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Throughput and tail latency of the LLM client against the offline stub
+
+Many worker threads fire prompts drawn from a small pool (so some are
+identical and in flight together) through LLMClient backed by StubBackend.
+Each scenario is also run with direct, unbounded backend calls for
+comparison. Nothing here talks to a real provider.
+
+Usage:
+    python benchmarks/llm_client_bench.py [--threads 32] [--requests 2000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.llm_client import CircuitBreaker, LLMClient, StubBackend
+
+SCENARIOS = [
+    # name, stub kwargs, client timeout
+    ("healthy", {"latency": 0.05, "jitter": 0.02}, 1.0),
+    ("slow tail", {"latency": 0.05, "jitter": 0.02, "slow_rate": 0.1, "slow_latency": 2.0}, 0.5),
+    ("failing", {"latency": 0.05, "jitter": 0.02, "failure_rate": 0.6}, 1.0),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(call, threads, requests, prompts, seed=7):
+    """Run `requests` calls of call(prompt) over `threads` threads; returns latencies and wall time"""
+    rng = random.Random(seed)
+    plan = [rng.choice(prompts) for _ in range(requests)]
+    latencies = []
+    lock = threading.Lock()
+    position = [0]
+
+    def worker():
+        while True:
+            with lock:
+                if position[0] >= len(plan):
+                    return
+                prompt = plan[position[0]]
+                position[0] += 1
+            started = time.perf_counter()
+            call(prompt)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return latencies, time.perf_counter() - started
+
+
+def report(label, latencies, wall, extra=""):
+    print(f"  {label:<10} {len(latencies) / wall:8.1f} req/s  "
+          f"p50 {statistics.median(latencies) * 1000:7.1f}ms  "
+          f"p95 {percentile(latencies, 95) * 1000:7.1f}ms  "
+          f"p99 {percentile(latencies, 99) * 1000:7.1f}ms  {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=40, help="distinct prompts in the pool")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    prompts = [f"Request: intent {i}\nEvents:\n- Event {i}" for i in range(args.distinct)]
+    for name, stub_args, timeout in SCENARIOS:
+        print(f"{name} (stub {stub_args}, timeout {timeout}s)")
+
+        direct = StubBackend(**stub_args)
+
+        def direct_call(prompt):
+            try:
+                return direct.generate(prompt, timeout)
+            except Exception:
+                return None
+
+        latencies, wall = run(direct_call, args.threads, args.requests, prompts)
+        report("direct", latencies, wall, f"provider calls {direct.calls}, peak concurrent {direct.peak_active}")
+
+        backend = StubBackend(**stub_args)
+        client = LLMClient(backend, max_concurrency=args.concurrency, timeout=timeout, queue_timeout=0.1,
+                           breaker=CircuitBreaker(threshold=5, reset_timeout=0.5))
+        fallbacks = [0]
+
+        def client_call(prompt):
+            _, used = client.generate(prompt, lambda: "template")
+            if not used:
+                fallbacks[0] += 1
+
+        latencies, wall = run(client_call, args.threads, args.requests, prompts)
+        stats = client.stats()
+        report("client", latencies, wall,
+               f"provider calls {backend.calls}, peak concurrent {backend.peak_active}, coalesced {stats['coalesced']}, fallbacks {fallbacks[0]}, "
+               f"timeouts {stats['timeouts']}, busy {stats['rejected_busy']}, breaker opens {stats['breaker_opens']}")
+        client.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+Mixed-workload load test across the API, with JSON results and regression checks
+
+Seeds a throwaway slice of data into the configured MySQL (every row is
+tagged with a run id and deleted afterwards), boots create_app() in-process
+and drives it from `--threads` concurrent clients for `--seconds`. Each
+client picks a scenario by weight and runs it end to end:
+
+    browse     GET /api/events page, one event, its ads, the org's events
+    chat       POST /api/chats with a canned question
+    purchase   hold a seat on the on-sale event, then buy it
+    checkin    scan tickets of the door event (mostly first scans, some repeats)
+    dashboard  GET /api/organizations/<id>/dashboard (half with ?snapshot=true)
+
+Latency is recorded per route (method + URL rule, e.g.
+"GET /api/events/<int:event_id>") and per scenario. --out writes the report
+as JSON; --baseline compares against an earlier report and exits non-zero
+when any route's p95 grew, or its throughput dropped, by more than
+--threshold; if the baseline file does not exist yet, this run is saved
+there as the first baseline. Runs are repeatable for a given --seed, --scale and --mix.
+
+Needs a reachable, migrated MySQL configured through the usual DB_* variables.
+
+Usage:
+    python benchmarks/load_suite.py [--scale 1] [--threads 16] [--seconds 30] [--out run.json]
+    python benchmarks/load_suite.py --baseline run.json --threshold 0.15 --out new.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Rows per unit of --scale
+# TICKETS allows one ticket per user per event, so users must cover door_tickets and every purchase a run makes
+SCALE = {"orgs": 10, "events_per_org": 20, "users": 20000, "tickets_per_event": 100, "door_tickets": 5000}
+
+DEFAULT_MIX = "browse=50,chat=15,purchase=15,checkin=15,dashboard=5"
+
+CHAT_MESSAGES = (
+    "any concerts this weekend?",
+    "cheap comedy shows under $30",
+    "what's on next month",
+    "sports events near downtown",
+    "recommend something for a date night",
+    "tech conference tickets",
+)
+
+CATEGORIES = ("music", "sports", "comedy", "tech", "art", "other")
+
+# Routes with fewer samples than this are reported but not compared
+MIN_SAMPLES = 50
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def chunks(rows, size=1000):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+class Dataset:
+    """Ids of everything seeded for one run"""
+
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.org_ids = []
+        self.event_ids = []
+        self.user_ids = []
+        self.onsale_event_id = None
+        self.door_event_id = None
+        self.door_codes = []
+
+
+def seed(cursor, scale, rng, run_id):
+    """Insert orgs, events, users and tickets for this run; returns a Dataset"""
+    data = Dataset(run_id)
+    counts = {name: max(1, int(per_unit * scale)) for name, per_unit in SCALE.items()}
+    now = datetime.now().replace(microsecond=0)
+
+    cursor.executemany(
+        "INSERT INTO ORGANIZATIONS (org_name, email) VALUES (%s, %s)",
+        [(f"load-{run_id}-org{i}", f"org{i}-{run_id}@load.example.com") for i in range(counts["orgs"])]
+    )
+    cursor.execute("SELECT org_id FROM ORGANIZATIONS WHERE email LIKE %s ORDER BY org_id", (f"%-{run_id}@load.example.com",))
+    data.org_ids = [row[0] for row in cursor.fetchall()]
+
+    events = []
+    for org_id in data.org_ids:
+        for i in range(counts["events_per_org"]):
+            when = now + timedelta(days=rng.randint(1, 90), hours=rng.randint(0, 23))
+            events.append((org_id, f"load-{run_id} {rng.choice(CATEGORIES)} night {i}", when, "Load Test Hall",
+                           counts["tickets_per_event"] * 2, rng.choice((10, 25, 40, 75)), rng.choice(CATEGORIES)))
+    # The on-sale event has room for every purchase a run can make; the door event opens now
+    events.append((data.org_ids[0], f"load-{run_id} on-sale", now + timedelta(days=30), "Load Test Arena",
+                   10 ** 7, 50, "music"))
+    events.append((data.org_ids[0], f"load-{run_id} door", now, "Load Test Arena",
+                   counts["door_tickets"], 50, "music"))
+    for chunk in chunks(events):
+        cursor.executemany(
+            "INSERT INTO EVENTS (org_id, event_name, event_date, location, max_attendees, ticket_price, event_category) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            chunk
+        )
+    cursor.execute("SELECT event_id FROM EVENTS WHERE event_name LIKE %s ORDER BY event_id", (f"load-{run_id} %",))
+    event_ids = [row[0] for row in cursor.fetchall()]
+    data.event_ids = event_ids[:-2]
+    data.onsale_event_id, data.door_event_id = event_ids[-2:]
+
+    for chunk in chunks([(f"load{i}", f"user{i}-{run_id}@load.example.com", "load") for i in range(counts["users"])]):
+        cursor.executemany("INSERT INTO USERS (user_name, email, password) VALUES (%s, %s, %s)", chunk)
+    cursor.execute("SELECT user_id FROM USERS WHERE email LIKE %s ORDER BY user_id", (f"%-{run_id}@load.example.com",))
+    data.user_ids = [row[0] for row in cursor.fetchall()]
+
+    tickets = []
+    for event_id in data.event_ids:
+        holders = rng.sample(data.user_ids, min(counts["tickets_per_event"], len(data.user_ids)))
+        for i, user_id in enumerate(holders):
+            tickets.append((event_id, user_id, f"{run_id}-{event_id}-{i}", rng.choice(("direct", "direct", "promo"))))
+    door_holders = rng.sample(data.user_ids, min(counts["door_tickets"], len(data.user_ids)))
+    data.door_codes = [f"{run_id}-door-{i}" for i in range(len(door_holders))]
+    tickets.extend((data.door_event_id, user_id, code, "direct") for user_id, code in zip(door_holders, data.door_codes))
+    for chunk in chunks(tickets):
+        cursor.executemany("INSERT INTO TICKETS (event_id, user_id, qr_code, purchase_source) VALUES (%s, %s, %s, %s)", chunk)
+
+    # Keep the capacity and attendance counters consistent with the seeded tickets
+    placeholders = ", ".join(["%s"] * len(event_ids))
+    cursor.execute(
+        f"UPDATE EVENTS e SET tickets_sold = (SELECT COUNT(*) FROM TICKETS t WHERE t.event_id = e.event_id) "
+        f"WHERE e.event_id IN ({placeholders})",
+        event_ids
+    )
+    from services.attendance_service import reconcile_event
+    for event_id in event_ids:
+        reconcile_event(cursor, event_id)
+    return data
+
+
+def cleanup(cursor, data):
+    event_ids = data.event_ids + [data.onsale_event_id, data.door_event_id]
+    events = ", ".join(["%s"] * len(event_ids))
+    for table in ("TICKETS", "TICKET_HOLDS", "EVENT_TICKET_STATS", "EVENT_CHECKIN_MINUTES", "ADVERTISEMENTS"):
+        cursor.execute(f"DELETE FROM {table} WHERE event_id IN ({events})", event_ids)
+    cursor.execute("DELETE FROM CHAT_HISTORY WHERE user_id IN (SELECT user_id FROM USERS WHERE email LIKE %s)",
+                   (f"%-{data.run_id}@load.example.com",))
+    cursor.execute(f"DELETE FROM EVENTS WHERE event_id IN ({events})", event_ids)
+    cursor.execute("DELETE FROM USERS WHERE email LIKE %s", (f"%-{data.run_id}@load.example.com",))
+    cursor.execute("DELETE FROM ORGANIZATIONS WHERE email LIKE %s", (f"%-{data.run_id}@load.example.com",))
+
+
+class Recorder:
+    """Thread-safe latency samples per route and per scenario"""
+
+    def __init__(self, app):
+        self._adapter = app.url_map.bind("localhost")
+        self._lock = threading.Lock()
+        self.routes = {}
+        self.scenarios = {}
+        self.recording = False
+
+    def request(self, client, method, path, **kwargs):
+        started = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        elapsed = time.perf_counter() - started
+        if self.recording:
+            self._add(self.routes, self.route_of(method, path), elapsed, response.status_code)
+        return response
+
+    def scenario(self, name, elapsed, ok):
+        if self.recording:
+            self._add(self.scenarios, name, elapsed, 200 if ok else 500)
+
+    def route_of(self, method, path):
+        try:
+            rule, _ = self._adapter.match(path.split("?")[0], method, return_rule=True)
+            return f"{method} {rule.rule}"
+        except Exception:
+            return f"{method} {path.split('?')[0]}"
+
+    def _add(self, table, key, elapsed, status):
+        with self._lock:
+            entry = table.setdefault(key, {"latencies": [], "errors": 0, "statuses": {}})
+            entry["latencies"].append(elapsed)
+            entry["statuses"][status] = entry["statuses"].get(status, 0) + 1
+            if status >= 500:
+                entry["errors"] += 1
+
+
+class Workload:
+    """The scenarios; each takes (client, rng) and returns True on success"""
+
+    def __init__(self, recorder, data):
+        self.r = recorder
+        self.data = data
+        self._door_next = 0
+        self._door_lock = threading.Lock()
+        self._buyer_next = 0
+        self._buyer_lock = threading.Lock()
+
+    def browse(self, client, rng):
+        event_id = rng.choice(self.data.event_ids)
+        statuses = [
+            self.r.request(client, "GET", "/api/events?limit=20&sort=event_date").status_code,
+            self.r.request(client, "GET", f"/api/events/{event_id}").status_code,
+            self.r.request(client, "GET", f"/api/advertisements/by_event/{event_id}").status_code,
+            self.r.request(client, "GET", f"/api/events/by_org/{rng.choice(self.data.org_ids)}?limit=20").status_code,
+        ]
+        return all(status < 400 for status in statuses)
+
+    def chat(self, client, rng):
+        body = {"message": rng.choice(CHAT_MESSAGES), "user_id": rng.choice(self.data.user_ids)}
+        return self.r.request(client, "POST", "/api/chats", json=body).status_code == 200
+
+    def purchase(self, client, rng):
+        # Each purchase needs a user without a ticket for the on-sale event yet
+        with self._buyer_lock:
+            if self._buyer_next >= len(self.data.user_ids):
+                return False
+            user_id = self.data.user_ids[self._buyer_next]
+            self._buyer_next += 1
+        held = self.r.request(client, "POST", "/api/tickets/hold",
+                              json={"event_id": self.data.onsale_event_id, "user_id": user_id})
+        if held.status_code != 201:
+            return False
+        body = {"event_id": self.data.onsale_event_id, "user_id": user_id,
+                "hold_id": held.get_json()["hold_id"], "qr_code": f"{self.data.run_id}-buy-{uuid.uuid4().hex}"}
+        return self.r.request(client, "POST", "/api/tickets", json=body).status_code == 201
+
+    def checkin(self, client, rng):
+        # Walk the queue at the door; one scan in five is a repeat of an earlier ticket
+        with self._door_lock:
+            if self._door_next < len(self.data.door_codes) and rng.random() >= 0.2:
+                code = self.data.door_codes[self._door_next]
+                self._door_next += 1
+            else:
+                code = self.data.door_codes[rng.randrange(max(1, self._door_next))]
+        response = self.r.request(client, "POST", "/api/tickets/check_in",
+                                  json={"qr_code": code, "event_id": self.data.door_event_id})
+        return response.status_code < 500
+
+    def dashboard(self, client, rng):
+        snapshot = "?snapshot=true" if rng.random() < 0.5 else ""
+        org_id = rng.choice(self.data.org_ids)
+        return self.r.request(client, "GET", f"/api/organizations/{org_id}/dashboard{snapshot}").status_code == 200
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(Workload, name.strip()):
+            raise SystemExit(f"Unknown scenario in --mix: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def drive(app, workload, recorder, mix, threads, seconds, warmup, seed_value):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    stop_at = time.monotonic() + warmup + seconds
+    start_recording = threading.Timer(warmup, lambda: setattr(recorder, "recording", True))
+    start_recording.start()
+
+    def loop(index):
+        rng = random.Random(seed_value * 1000 + index)
+        client = app.test_client()
+        while time.monotonic() < stop_at:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                ok = getattr(workload, name)(client, rng)
+            except Exception as e:
+                print(f"{name} failed: {e}")
+                ok = False
+            recorder.scenario(name, time.perf_counter() - started, ok)
+
+    workers = [threading.Thread(target=loop, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    start_recording.cancel()
+
+
+def summarize(table, seconds):
+    summary = {}
+    for key, entry in sorted(table.items()):
+        latencies = entry["latencies"]
+        summary[key] = {
+            "count": len(latencies),
+            "rps": round(len(latencies) / seconds, 2),
+            "errors": entry["errors"],
+            "statuses": {str(k): v for k, v in sorted(entry["statuses"].items())},
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+    return summary
+
+
+def compare(report, baseline, threshold):
+    """Regression messages for routes present in both reports with enough samples"""
+    problems = []
+    for route, now in report["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before or min(now["count"], before["count"]) < MIN_SAMPLES:
+            continue
+        if now["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            problems.append(f"{route}: p95 {before['p95_ms']:.1f}ms -> {now['p95_ms']:.1f}ms")
+        if now["rps"] < before["rps"] * (1 - threshold):
+            problems.append(f"{route}: throughput {before['rps']:.1f} -> {now['rps']:.1f} req/s")
+        before_errors = before["errors"] / before["count"]
+        if now["errors"] / now["count"] > before_errors + threshold / 10:
+            problems.append(f"{route}: error rate {before_errors:.3f} -> {now['errors'] / now['count']:.3f}")
+    return problems
+
+
+def print_table(title, summary):
+    print(title)
+    print(f"  {'':<58} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'5xx':>5}")
+    for key, row in summary.items():
+        print(f"  {key:<58} {row['count']:7d} {row['rps']:8.1f} {row['p50_ms']:8.2f} {row['p95_ms']:8.2f} "
+              f"{row['p99_ms']:8.2f} {row['errors']:5d}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help=f"multiplier on {SCALE}")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5, help="seconds run before recording starts")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight,...")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the report here as JSON")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative regression (0.15 = 15%%)")
+    parser.add_argument("--keep-data", action="store_true", help="leave the seeded rows in place")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    # Size the pool for the client threads and keep background jobs out of the numbers
+    os.environ.setdefault("DB_POOL_SIZE", str(args.threads))
+    os.environ.setdefault("DB_POOL_MAX_OVERFLOW", "4")
+    os.environ.setdefault("DB_POOL_TIMEOUT", "30")
+    os.environ.setdefault("CHECKIN_PRELOAD_INTERVAL", "0")
+    os.environ.setdefault("ATTENDANCE_RECONCILE_INTERVAL", "0")
+    os.environ.setdefault("ROLLUP_INTERVAL", "0")
+    os.environ.setdefault("LLM_BACKEND", "none")
+
+    from database import get_db_connection
+
+    run_id = uuid.uuid4().hex[:8]
+    conn = get_db_connection()
+    if not conn:
+        sys.exit("Database connection failed")
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    try:
+        data = seed(cursor, args.scale, random.Random(args.seed), run_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    print(f"Seeded run {run_id} in {time.perf_counter() - started:.1f}s: {len(data.org_ids)} orgs, "
+          f"{len(data.event_ids) + 2} events, {len(data.user_ids)} users")
+
+    try:
+        # Built after seeding so the search index preload sees the new events
+        from app import create_app
+        from services.chat_history import chat_writer
+        app = create_app()
+        recorder = Recorder(app)
+        workload = Workload(recorder, data)
+        client = app.test_client()
+        client.post("/api/tickets/check_in/preload", json={"event_id": data.door_event_id})
+
+        print(f"Running {args.mix} on {args.threads} threads: {args.warmup:.0f}s warmup, {args.seconds:.0f}s measured")
+        drive(app, workload, recorder, mix, args.threads, args.seconds, args.warmup, args.seed)
+        chat_writer.flush(timeout=10)
+    finally:
+        if not args.keep_data:
+            cleanup(cursor, data)
+            conn.commit()
+        cursor.close()
+        conn.close()
+
+    report = {
+        "meta": {
+            "run_id": run_id, "commit": git_commit(), "started_at": datetime.now().isoformat(timespec="seconds"),
+            "scale": args.scale, "threads": args.threads, "seconds": args.seconds, "mix": mix,
+            "seed": args.seed, "cpus": os.cpu_count()
+        },
+        "routes": summarize(recorder.routes, args.seconds),
+        "scenarios": summarize(recorder.scenarios, args.seconds),
+    }
+    print_table("Per route", report["routes"])
+    print_table("Per scenario", report["scenarios"])
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.out}")
+
+    if args.baseline and not os.path.exists(args.baseline):
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"No baseline at {args.baseline}; saved this run there")
+    elif args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = compare(report, baseline, args.threshold)
+        if problems:
+            print(f"FAIL: regressions beyond {args.threshold:.0%} against {args.baseline}")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+        print(f"OK: no route regressed beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
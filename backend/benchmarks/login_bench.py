@@ -0,0 +1,98 @@
+"""
+Login throughput with bcrypt: hashing on request threads vs the bounded pool
+
+Simulates an on-sale login burst: `--threads` request threads each run
+logins that do a little non-hashing work (`--work` ms, standing in for the
+DB lookup and response) plus one bcrypt check. "inline" runs bcrypt on the
+request thread with no limit; "pool" goes through PasswordHasher, which
+caps concurrent hashing and sheds logins it can't start within the queue
+timeout (those count as 503s). No database needed.
+
+Usage:
+    python benchmarks/login_bench.py [--threads 64] [--logins 2000] [--rounds 12] [--workers 4]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+from services.auth_service import HasherBusy, PasswordHasher
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(login, threads, logins, work):
+    latencies = []
+    shed = [0]
+    lock = threading.Lock()
+    remaining = [logins]
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            time.sleep(work)
+            try:
+                if not login():
+                    raise RuntimeError("password did not match")
+            except HasherBusy:
+                with lock:
+                    shed[0] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return latencies, shed[0], time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=64, help="concurrent request threads")
+    parser.add_argument("--logins", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--pending", type=int, help="pool queue bound (default workers * 4)")
+    parser.add_argument("--queue-timeout", type=float, default=0.5)
+    parser.add_argument("--work", type=float, default=2.0, help="ms of non-hashing work per login")
+    args = parser.parse_args()
+
+    password = "correct horse battery staple"
+    stored = bcrypt.hashpw(password.encode(), bcrypt.gensalt(args.rounds)).decode()
+    started = time.perf_counter()
+    bcrypt.checkpw(password.encode(), stored.encode())
+    print(f"One bcrypt check at cost {args.rounds}: {(time.perf_counter() - started) * 1000:.1f}ms "
+          f"({args.threads} request threads, {args.logins} logins, {os.cpu_count()} CPUs)")
+
+    hasher = PasswordHasher(workers=args.workers, max_pending=args.pending or args.workers * 4,
+                            queue_timeout=args.queue_timeout, rounds=args.rounds)
+    scenarios = (
+        ("inline", lambda: bcrypt.checkpw(password.encode(), stored.encode())),
+        ("pool", lambda: hasher.check(password, stored)[0]),
+    )
+    for label, login in scenarios:
+        latencies, shed, wall = run(login, args.threads, args.logins, args.work / 1000)
+        print(f"  {label:<7} {len(latencies) / wall:7.1f} logins/s  p50 {statistics.median(latencies) * 1000:8.1f}ms  "
+              f"p99 {percentile(latencies, 99) * 1000:8.1f}ms  shed (503) {shed}")
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
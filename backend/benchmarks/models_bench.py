@@ -0,0 +1,140 @@
+"""
+Tuple-backed records (models/) vs dictionary-cursor rows
+
+Memory: builds `--rows` TICKETS-shaped rows as the dictionary cursor
+returns them (one dict per row) and as Ticket records, and reports
+tracemalloc bytes per row for the row containers (column values are
+shared, so only the per-row structure is counted). A record is the same
+size as the tuple a plain cursor returns.
+
+Throughput: times turning raw tuples into rows (what the dictionary cursor
+does per row vs Ticket.from_row), attribute/key access, and encoding the
+whole list through the app's JSON provider.
+
+With --db it also fetches up to `--rows` rows of the real TICKETS table
+through both kinds of cursor.
+
+Usage:
+    python benchmarks/models_bench.py [--rows 100000] [--db]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SEARCH_INDEX_PRELOAD", "false")
+os.environ.setdefault("CHECKIN_PRELOAD_INTERVAL", "0")
+os.environ.setdefault("ATTENDANCE_RECONCILE_INTERVAL", "0")
+os.environ.setdefault("ROLLUP_INTERVAL", "0")
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+from models import Ticket, TICKET_COLUMNS, records_response
+
+
+def raw_rows(count):
+    purchased = datetime(2026, 10, 1, 12, 0)
+    return [(i, i % 300, i % 5000, "active", f"QR-{i:08d}", purchased, None, "direct") for i in range(1, count + 1)]
+
+
+def to_dicts(rows):
+    columns = TICKET_COLUMNS
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def to_records(rows):
+    make = Ticket.from_row
+    return [make(row) for row in rows]
+
+
+def measure(build, rows):
+    gc.collect()
+    tracemalloc.start()
+    built = build(rows)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return built, current
+
+
+def best_of(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def fetch_compare(limit):
+    from database import get_db_connection
+    conn = get_db_connection()
+    if not conn:
+        sys.exit("Database connection failed")
+    sql = f"SELECT {', '.join(TICKET_COLUMNS)} FROM tickets ORDER BY ticket_id LIMIT %s"
+
+    def with_dicts():
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(sql, (limit,))
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def with_records():
+        cursor = conn.cursor()
+        cursor.execute(sql, (limit,))
+        make = Ticket.from_row
+        rows = [make(row) for row in cursor.fetchall()]
+        cursor.close()
+        return rows
+
+    fetched = len(with_records())
+    print(f"Fetching {fetched} TICKETS rows from MySQL")
+    for label, fn in (("dict cursor", with_dicts), ("records", with_records)):
+        elapsed = best_of(fn)
+        print(f"  {label:<14} {elapsed * 1000:8.1f}ms  {fetched / elapsed:10.0f} rows/s")
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--db", action="store_true", help="also fetch from the real TICKETS table")
+    args = parser.parse_args()
+
+    rows = raw_rows(args.rows)
+    print(f"{args.rows} TICKETS-shaped rows, {len(TICKET_COLUMNS)} columns")
+
+    print("Memory held by the row containers")
+    built = {}
+    for label, build in (("dict rows", to_dicts), ("Ticket records", to_records)):
+        built[label], used = measure(build, rows)
+        print(f"  {label:<15} {used / 2 ** 20:8.1f} MiB  {used / args.rows:6.0f} B/row  "
+              f"({used * 100000 / args.rows / 2 ** 20:.1f} MiB per 100k rows)")
+
+    dicts, records = built["dict rows"], built["Ticket records"]
+    print("Throughput")
+    for label, fn in (("build dict rows", lambda: to_dicts(rows)), ("build records", lambda: to_records(rows)),
+                      ("read dict['qr_code']", lambda: [r["qr_code"] for r in dicts]),
+                      ("read record.qr_code", lambda: [r.qr_code for r in records])):
+        elapsed = best_of(fn)
+        print(f"  {label:<22} {elapsed * 1000:8.1f}ms  {args.rows / elapsed:12.0f} rows/s")
+
+    from flask import Flask
+    app = Flask(__name__)
+    with app.app_context():
+        for label, fn in (("jsonify dict rows", lambda: app.json.response(dicts)),
+                          ("records_response", lambda: records_response(records))):
+            elapsed = best_of(fn)
+            print(f"  {label:<22} {elapsed * 1000:8.1f}ms  {args.rows / elapsed:12.0f} rows/s")
+
+    if args.db:
+        fetch_compare(args.rows)
+
+
+if __name__ == "__main__":
+    main()
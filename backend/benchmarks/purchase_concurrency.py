@@ -0,0 +1,108 @@
+"""
+Concurrency benchmark for the ticket purchase path
+
+Creates a throwaway event with a small max_attendees, then fires many
+concurrent buyers at POST /api/tickets (optionally going through
+POST /api/tickets/hold first) and checks that the number of tickets sold
+never exceeds capacity and that EVENTS.tickets_sold matches TICKETS.
+
+Needs a reachable MySQL configured through the usual DB_* variables.
+
+Usage:
+    python benchmarks/purchase_concurrency.py --buyers 2000 --capacity 500 --threads 64 [--holds]
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=2000)
+    parser.add_argument("--capacity", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--holds", action="store_true", help="Hold a seat before buying")
+    args = parser.parse_args()
+
+    # Size the pool for the worker threads before the app is imported
+    os.environ.setdefault("DB_POOL_SIZE", str(args.threads))
+    os.environ.setdefault("DB_POOL_MAX_OVERFLOW", "0")
+    os.environ.setdefault("DB_POOL_TIMEOUT", "30")
+
+    from app import create_app
+    from database import get_db_connection
+
+    run_id = uuid.uuid4().hex[:8]
+    conn = get_db_connection()
+    if not conn:
+        sys.exit("Database connection failed")
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO ORGANIZATIONS (org_name, email, password) VALUES (%s, %s, %s)",
+        (f"bench-{run_id}", f"bench-{run_id}@example.com", "bench")
+    )
+    org_id = cursor.lastrowid
+    cursor.execute(
+        "INSERT INTO EVENTS (org_id, event_name, event_date, location, max_attendees, ticket_price) VALUES (%s, %s, NOW() + INTERVAL 30 DAY, %s, %s, %s)",
+        (org_id, f"Bench on-sale {run_id}", "Bench Hall", args.capacity, 10)
+    )
+    event_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO USERS (user_name, email, password) VALUES (%s, %s, %s)",
+        [(f"buyer{i}", f"buyer{i}-{run_id}@example.com", "bench") for i in range(args.buyers)]
+    )
+    cursor.execute("SELECT user_id FROM USERS WHERE email LIKE %s", (f"%-{run_id}@example.com",))
+    user_ids = [row[0] for row in cursor.fetchall()]
+    conn.commit()
+
+    app = create_app()
+
+    def buy(user_id):
+        client = app.test_client()
+        body = {"event_id": event_id, "user_id": user_id, "qr_code": f"{run_id}-{user_id}"}
+        if args.holds:
+            held = client.post("/api/tickets/hold", json={"event_id": event_id, "user_id": user_id})
+            if held.status_code != 201:
+                return held.status_code
+            body["hold_id"] = held.get_json()["hold_id"]
+        return client.post("/api/tickets", json=body).status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        statuses = Counter(pool.map(buy, user_ids))
+    elapsed = time.perf_counter() - started
+
+    cursor.execute("SELECT COUNT(*) FROM TICKETS WHERE event_id = %s", (event_id,))
+    sold_rows = cursor.fetchone()[0]
+    cursor.execute("SELECT tickets_sold, tickets_held, max_attendees FROM EVENTS WHERE event_id = %s", (event_id,))
+    tickets_sold, tickets_held, max_attendees = cursor.fetchone()
+    conn.rollback()
+
+    print(f"{len(user_ids)} buyers, {args.threads} threads, capacity {max_attendees}, holds={args.holds}")
+    print(f"elapsed {elapsed:.2f}s, {len(user_ids) / elapsed:.0f} purchases/s")
+    print(f"status codes: {dict(statuses)}")
+    print(f"TICKETS rows: {sold_rows}, EVENTS.tickets_sold: {tickets_sold}, tickets_held: {tickets_held}")
+
+    # Clean up everything this run created
+    cursor.execute("DELETE FROM TICKETS WHERE event_id = %s", (event_id,))
+    cursor.execute("DELETE FROM TICKET_HOLDS WHERE event_id = %s", (event_id,))
+    cursor.execute("DELETE FROM EVENTS WHERE event_id = %s", (event_id,))
+    cursor.execute("DELETE FROM USERS WHERE email LIKE %s", (f"%-{run_id}@example.com",))
+    cursor.execute("DELETE FROM ORGANIZATIONS WHERE org_id = %s", (org_id,))
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    if sold_rows > max_attendees or tickets_sold != sold_rows:
+        sys.exit("FAIL: capacity violated or counter out of sync")
+    print("OK: sold count never exceeded max_attendees")
+
+
+if __name__ == "__main__":
+    main()
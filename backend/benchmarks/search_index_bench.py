@@ -0,0 +1,133 @@
+"""
+Benchmark the in-memory event search index against scan-based search
+
+Builds the index from synthetic events and times the query mix the chat
+assistant produces. The baseline is a linear scan with substring matching,
+which is what the LIKE '%kw%' SQL path does inside MySQL. With --sql the
+real SQL path (ai_service._query_events) is timed too, against whatever
+the DB_* variables point at.
+
+Usage:
+    python benchmarks/search_index_bench.py --events 100000 [--sql]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.search_index import EventSearchIndex
+
+CATEGORIES = ["music", "tech", "sports", "food", "art", "culture", "business", "education", "health", "other"]
+WORDS = ["festival", "concert", "summit", "workshop", "tasting", "gallery", "tournament", "meetup", "gala",
+         "showcase", "conference", "jazz", "startup", "coding", "marathon", "wine", "theater", "dance", "career"]
+PLACES = ["Downtown Hall", "Central Park", "Convention Center", "Riverside Garden", "Beach Pavilion", "Civic Arena"]
+
+QUERIES = [
+    {"keywords": ["music", "concert"], "max_price": None, "event_type": "music"},
+    {"keywords": ["tech", "technology"], "max_price": 20, "event_type": "tech"},
+    {"keywords": ["park"], "max_price": None, "event_type": None},
+    {"keywords": None, "max_price": 0, "event_type": None},
+    {"keywords": None, "max_price": None, "event_type": "food"},
+    {"keywords": ["jazz", "downtown"], "max_price": 50, "event_type": None},
+]
+
+
+def synthetic_events(count, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    for event_id in range(1, count + 1):
+        category = rng.choice(CATEGORIES)
+        name = " ".join(rng.sample(WORDS, 3)).title()
+        yield {
+            "event_id": event_id,
+            "org_id": rng.randint(1, 500),
+            "event_name": f"{name} {event_id}",
+            "event_date": start + timedelta(hours=rng.randint(0, 24 * 365)),
+            "location": rng.choice(PLACES),
+            "max_attendees": rng.choice([None, 100, 500, 5000]),
+            "ticket_price": Decimal(rng.choice([0, 10, 15, 25, 40, 75, 120])),
+            "event_category": category,
+            "event_status": "upcoming" if rng.random() < 0.8 else "completed",
+            "event_description": " ".join(rng.choices(WORDS, k=12))
+        }
+
+
+def scan_search(events, keywords=None, max_price=None, event_type=None, limit=10):
+    # Mirrors the SQL: status/price/category filters, OR of LIKE '%kw%' on the name, ORDER BY date
+    matches = []
+    for e in events:
+        if e["event_status"] != "upcoming":
+            continue
+        if max_price is not None and (e["ticket_price"] is None or e["ticket_price"] > max_price):
+            continue
+        if event_type and e["event_category"] != event_type:
+            continue
+        if keywords and not any(k in e["event_name"].lower() for k in keywords):
+            continue
+        matches.append(e)
+    matches.sort(key=lambda e: e["event_date"])
+    return matches[:limit]
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--sql", action="store_true", help="Also time the MySQL LIKE path")
+    args = parser.parse_args()
+
+    events = list(synthetic_events(args.events))
+    index = EventSearchIndex()
+    started = time.perf_counter()
+    index.build(events)
+    build_time = time.perf_counter() - started
+    tracemalloc.start()
+    EventSearchIndex().build(events[:10000])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"built index over {args.events} events in {build_time:.2f}s, {index.stats()['terms']} terms, "
+          f"~{peak / 10000:.0f} bytes of index per event")
+
+    # Posting lists are sorted lazily on first use; warm them so timings reflect steady state
+    for q in QUERIES:
+        index.search(**q)
+
+    gc.collect()
+    started = time.perf_counter()
+    for event in events[:100]:
+        index.upsert(dict(event, event_name="Updated Jazz Night"))
+    print(f"incremental upsert: {(time.perf_counter() - started) * 1e4:.0f} us per event")
+    # Touched posting lists are re-sorted on their next read
+    for q in QUERIES:
+        index.search(**q)
+
+    if args.sql:
+        from services.ai_service import _query_events
+
+    print(f"{'query':<60} {'index':>10} {'scan':>10}" + (f" {'sql':>10}" if args.sql else ""))
+    for q in QUERIES:
+        index_time = timed(lambda: index.search(**q), args.repeat)
+        scan_time = timed(lambda: scan_search(events, **q), max(1, args.repeat // 50))
+        line = f"{str(q):<60} {index_time * 1e6:>8.0f}us {scan_time * 1e3:>8.1f}ms"
+        if args.sql:
+            sql_time = timed(lambda: _query_events(q["keywords"], q["max_price"], q["event_type"]), 20)
+            line += f" {sql_time * 1e3:>8.1f}ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
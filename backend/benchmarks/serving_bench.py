@@ -0,0 +1,161 @@
+"""
+Requests/sec from the Flask dev server vs gunicorn
+
+Starts each server as a subprocess on its own port, waits for it to
+answer, then drives it with `--clients` keep-alive HTTP clients (spread
+over `--procs` load processes so the client side isn't capped by one GIL)
+for `--seconds`. "dev" is what `python app.py` used to run in Docker:
+app.run(debug=True), with the reloader and debugger on. The gunicorn runs
+use gunicorn.conf.py with the given worker classes.
+
+The default path, /api/users/auth/stats, goes through blueprint auth and
+JSON encoding but needs no database. Background jobs and the search index
+preload are switched off so a missing MySQL doesn't skew the numbers.
+
+Usage:
+    python benchmarks/serving_bench.py [--clients 32] [--seconds 10] [--classes sync,gthread]
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUIET_ENV = {
+    "SEARCH_INDEX_PRELOAD": "false",
+    "CHECKIN_PRELOAD_INTERVAL": "0",
+    "ATTENDANCE_RECONCILE_INTERVAL": "0",
+    "ROLLUP_INTERVAL": "0",
+    "AUTH_REVOCATION_POLL": "0",
+    "GUNICORN_ACCESS_LOG": "",
+}
+
+DEV_SERVER = "from app import create_app; create_app().run(host='127.0.0.1', port={port}, debug=True)"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def start_server(label, port):
+    env = dict(os.environ, **QUIET_ENV)
+    if label == "dev":
+        command = [sys.executable, "-c", DEV_SERVER.format(port=port)]
+    else:
+        env.update(GUNICORN_WORKER_CLASS=label, GUNICORN_BIND=f"127.0.0.1:{port}")
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"]
+    process = subprocess.Popen(command, cwd=BACKEND, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            conn.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{label} server did not come up on port {port}")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=35)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def client(port, path, clients, seconds, results):
+    # One load process: `clients` threads, each on its own keep-alive connection
+    import threading
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def loop():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        mine = []
+        failed = 0
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    failed += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                continue
+            mine.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=loop) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results.put((latencies, errors[0]))
+
+
+def drive(port, path, clients, seconds, procs):
+    results = multiprocessing.Queue()
+    per_proc = [clients // procs + (1 if i < clients % procs else 0) for i in range(procs)]
+    workers = [multiprocessing.Process(target=client, args=(port, path, n, seconds, results))
+               for n in per_proc if n]
+    for w in workers:
+        w.start()
+    latencies, errors = [], 0
+    for _ in workers:
+        part, failed = results.get()
+        latencies.extend(part)
+        errors += failed
+    for w in workers:
+        w.join()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32, help="concurrent keep-alive connections")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--procs", type=int, default=max(1, min(4, (os.cpu_count() or 1) // 2)),
+                        help="load generator processes")
+    parser.add_argument("--path", default="/api/users/auth/stats")
+    parser.add_argument("--classes", default="sync,gthread", help="gunicorn worker classes to compare")
+    parser.add_argument("--port", type=int, default=5071)
+    args = parser.parse_args()
+
+    print(f"GET {args.path}, {args.clients} clients for {args.seconds:.0f}s each, {os.cpu_count()} CPUs")
+    for offset, label in enumerate(["dev"] + [c for c in args.classes.split(",") if c]):
+        port = args.port + offset
+        process = start_server(label, port)
+        try:
+            latencies, errors = drive(port, args.path, args.clients, args.seconds, args.procs)
+        finally:
+            stop_server(process)
+        if not latencies:
+            print(f"  {label:<8} no successful requests ({errors} errors)")
+            continue
+        print(f"  {label:<8} {len(latencies) / args.seconds:8.1f} req/s  p50 {statistics.median(latencies) * 1000:7.2f}ms  "
+              f"p99 {percentile(latencies, 99) * 1000:7.2f}ms  errors {errors}")
+
+
+if __name__ == "__main__":
+    main()
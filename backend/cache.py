@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache whose entries also expire after `ttl` seconds
+
+    An entry may carry tags; discard_tag() drops the entries with a given tag
+    without scanning the rest of the cache.
+
+    Args:
+        maxsize: Entries kept before the least recently used one is evicted
+        ttl: Seconds an entry stays valid (0 means no expiry)
+        name: Label used in stats()
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, name="cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (entry[0] and entry[0] <= now):
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None, tags=()):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else 0
+        tags = frozenset(tags)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires_at, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for `key`, calling loader() and caching its result on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def pop(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def discard_where(self, predicate):
+        """Drop every entry whose key satisfies predicate(key)"""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                self._remove(key)
+
+    def discard_tag(self, tag):
+        """Drop every entry set with `tag`"""
+        with self._lock:
+            for key in self._tags.pop(tag, ()):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def _remove(self, key):
+        # Caller holds the lock; unlinks the entry from its tags too
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class FileInvalidationBus:
+    """
+    Cross-process invalidation channel backed by an append-only file
+
+    Every worker on the host appends invalidation messages to the same file
+    and tails it from its own offset, so a write handled by one gunicorn
+    worker evicts the entry everywhere within `poll_interval` seconds. When
+    the file grows past `max_bytes` it is truncated and every reader flushes
+    its whole cache once.
+
+    Args:
+        path: File shared by all workers
+        poll_interval: Minimum seconds between reads of the file
+        max_bytes: Size at which the log is truncated
+    """
+
+    def __init__(self, path, poll_interval=1.0, max_bytes=1024 * 1024):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._next_poll = 0
+        try:
+            self._offset = os.path.getsize(path)
+        except OSError:
+            self._offset = 0
+
+    def publish(self, message):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(message + "\n")
+                if f.tell() > self.max_bytes:
+                    f.truncate(0)
+        except OSError as e:
+            print(f"Cache invalidation publish failed: {e}")
+
+    def poll(self):
+        """
+        Read messages published since the last poll
+
+        Returns:
+            List of messages, or None if the log was truncated and the
+            caller should flush everything
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_poll:
+                return []
+            self._next_poll = now + self.poll_interval
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                return []
+            if size < self._offset:
+                self._offset = 0
+                return None
+            if size == self._offset:
+                return []
+            with open(self.path, "r", encoding="utf-8") as f:
+                f.seek(self._offset)
+                chunk = f.read()
+            # Leave a partially written last line for the next poll
+            complete = chunk[:chunk.rfind("\n") + 1]
+            self._offset += len(complete.encode("utf-8"))
+            return [line for line in complete.split("\n") if line]
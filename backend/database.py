@@ -1,18 +1,374 @@
 import mysql.connector
 import os
+import queue
+import threading
+import time
+from flask import g, has_app_context
 from dotenv import load_dotenv
 load_dotenv()
-def get_db_connection():
-    try:    
-        connection = mysql.connector.connect(
+
+# Pool settings (override through the environment)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out before the wait timeout"""
+
+
+def _connect():
+    return mysql.connector.connect(
         host=os.getenv("DB_HOST"),
         user=os.getenv("DB_USER"),
         password=os.getenv("DB_PASSWORD"),
         database=os.getenv("DB_NAME"),
-        connection_timeout=10
-        )
-        return connection
-    
-    except mysql.connector.Error as err:
+        connection_timeout=10,
+        # Routes often fetchone() and close; let the connector drain leftovers
+        # so a shared connection never trips over "Unread result found".
+        consume_results=True
+    )
+
+
+# Callables notified once per finished statement: observer(sql, params, seconds, rows)
+_query_observers = []
+
+
+def add_query_observer(callback):
+    """
+    Call callback(sql, params, seconds, rows) after every statement
+
+    `seconds` covers execute() plus every fetch of its result, and `rows` is
+    the number of rows fetched (or affected, for writes). A statement is
+    reported when its cursor runs the next statement or is closed, or when
+    finish_statements() is called on its connection.
+    """
+    _query_observers.append(callback)
+
+
+class TimedCursor:
+    """
+    Cursor proxy that times each statement and counts its rows
+
+    Handed out by PooledConnection.cursor() only while query observers are
+    registered; otherwise callers get the connector's cursor directly.
+    """
+
+    def __init__(self, raw, owner):
+        self._raw = raw
+        self._owner = owner
+        self._statement = None
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._run(self._raw.execute, operation, params, args, kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        return self._run(self._raw.executemany, operation, seq_params, args, kwargs)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._raw.fetchone()
+        self._account(time.perf_counter() - started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = self._raw.fetchmany(size) if size is not None else self._raw.fetchmany()
+        self._account(time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._raw.fetchall()
+        self._account(time.perf_counter() - started, len(rows))
+        return rows
+
+    def close(self):
+        self.finish()
+        self._owner._cursors.discard(self)
+        return self._raw.close()
+
+    def finish(self):
+        """Report the current statement to the observers"""
+        statement, self._statement = self._statement, None
+        if statement is None:
+            return
+        sql, params, seconds, rows = statement
+        for observer in _query_observers:
+            try:
+                observer(sql, params, seconds, rows)
+            except Exception as e:
+                print(f"Query observer failed: {e}")
+
+    def _run(self, method, operation, params, args, kwargs):
+        self.finish()
+        started = time.perf_counter()
+        try:
+            if params is None:
+                return method(operation, *args, **kwargs)
+            return method(operation, params, *args, **kwargs)
+        finally:
+            affected = self._raw.rowcount
+            # SELECTs report rows as they are fetched; writes report rows affected
+            rows = affected if affected and affected > 0 and not self._raw.description else 0
+            self._statement = [operation, params, time.perf_counter() - started, rows]
+
+    def _account(self, seconds, rows):
+        if self._statement is not None:
+            self._statement[2] += seconds
+            self._statement[3] += rows
+
+
+class PooledConnection:
+    """
+    Proxy around a raw MySQL connection checked out of a ConnectionPool.
+
+    Behaves like the connector's connection object. close() hands the
+    connection back to the pool instead of tearing down the socket; for
+    request-scoped checkouts close() is a no-op and the connection is
+    released on app-context teardown.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._request_scoped = False
+        self._released = False
+        self._cursors = set()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        raw = self._raw.cursor(*args, **kwargs)
+        if not _query_observers:
+            return raw
+        cursor = TimedCursor(raw, self)
+        self._cursors.add(cursor)
+        return cursor
+
+    def finish_statements(self):
+        """Report statements still pending on cursors that were never closed"""
+        for cursor in list(self._cursors):
+            cursor.finish()
+
+    def close(self):
+        if not self._request_scoped:
+            self.release()
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self.finish_statements()
+        self._cursors.clear()
+        self._pool.release(self._raw, self._created_at)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of MySQL connections
+
+    Args:
+        connect: Zero-argument callable returning a new raw connection
+        pool_size: Connections kept open between checkouts
+        max_overflow: Extra connections allowed under load, closed on release
+        timeout: Seconds to wait for a free connection before giving up
+        recycle: Max connection age in seconds (0 disables recycling)
+        pre_ping: Ping idle connections before handing them out
+    """
+
+    def __init__(self, connect, pool_size=DB_POOL_SIZE, max_overflow=DB_POOL_MAX_OVERFLOW,
+                 timeout=DB_POOL_TIMEOUT, recycle=DB_POOL_RECYCLE, pre_ping=DB_POOL_PRE_PING):
+        self._connect = connect
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        # LIFO so the most recently used (warmest) connection goes out first
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._total = 0
+        self._checked_out = 0
+
+    def acquire(self):
+        """Check out a connection, waiting up to `timeout` seconds if the pool is exhausted"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                raw, created_at = self._idle.get_nowait()
+            except queue.Empty:
+                raw = None
+                with self._lock:
+                    can_open = self._total < self.pool_size + self.max_overflow
+                    if can_open:
+                        self._total += 1
+                if can_open:
+                    return self._open()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"Timed out after {self.timeout}s waiting for a database connection")
+                try:
+                    raw, created_at = self._idle.get(timeout=remaining)
+                except queue.Empty:
+                    raise PoolTimeout(f"Timed out after {self.timeout}s waiting for a database connection")
+
+            if self._healthy(raw, created_at):
+                with self._lock:
+                    self._checked_out += 1
+                return PooledConnection(self, raw, created_at)
+            # Stale connection: drop it and open a replacement in its slot
+            self._discard(raw)
+            return self._open()
+
+    def release(self, raw, created_at):
+        """Return a connection to the pool, closing it if it is overflow or broken"""
+        with self._lock:
+            self._checked_out -= 1
+        try:
+            # End any transaction left open so the next checkout gets a fresh snapshot
+            raw.rollback()
+        except Exception:
+            self._forget(raw)
+            return
+        with self._lock:
+            overflow = self._total > self.pool_size
+        if overflow:
+            self._forget(raw)
+        else:
+            self._idle.put((raw, created_at))
+
+    def status(self):
+        """Snapshot of pool usage"""
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "open": self._total,
+                "checked_out": self._checked_out,
+                "idle": self._idle.qsize()
+            }
+
+    def dispose(self):
+        """Close every idle connection (checked-out ones are closed when released)"""
+        while True:
+            try:
+                raw, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._forget(raw)
+
+    def _open(self):
+        try:
+            raw = self._connect()
+        except Exception:
+            with self._lock:
+                self._total -= 1
+            raise
+        with self._lock:
+            self._checked_out += 1
+        return PooledConnection(self, raw, time.monotonic())
+
+    def _healthy(self, raw, created_at):
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            return False
+        if self.pre_ping:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def _discard(self, raw):
+        # Close a connection but keep its slot reserved for the replacement
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _forget(self, raw):
+        self._discard(raw)
+        with self._lock:
+            self._total -= 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(_connect)
+    return _pool
+
+
+def reset_pool(dispose=False):
+    """
+    Forget the process-wide pool so the next checkout builds a new one
+
+    A gunicorn master calls this with dispose=True after preloading the app,
+    so no open socket is inherited by the workers. A forked worker calls it
+    without dispose: closing inherited connections would send QUIT over
+    sockets that are still shared with the parent.
+    """
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if dispose and pool is not None:
+        pool.dispose()
+
+
+def get_db_connection():
+    """
+    Get a pooled database connection
+
+    Inside a Flask request every call returns the same checkout, which is
+    released when the app context tears down; calling close() on it is
+    harmless. Outside a request the caller owns the checkout and close()
+    returns it to the pool.
+
+    Returns:
+        Connection proxy, or None if no connection could be obtained
+    """
+    try:
+        if has_app_context():
+            conn = g.get("_db_conn")
+            if conn is None:
+                conn = get_pool().acquire()
+                conn._request_scoped = True
+                g._db_conn = conn
+            return conn
+        return get_pool().acquire()
+
+    except (mysql.connector.Error, PoolTimeout) as err:
         print(f"Connection Error: {err}")
-        return None
\ No newline at end of file
+        return None
+
+
+def release_db_connection(exception=None):
+    """Teardown hook: hand the request's connection back to the pool"""
+    conn = g.pop("_db_conn", None)
+    if conn is not None:
+        conn.release()
+
+
+def init_app(app):
+    app.teardown_appcontext(release_db_connection)
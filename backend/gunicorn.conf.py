@@ -0,0 +1,89 @@
+"""
+gunicorn settings for the TicketR API
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Everything is overridable through the environment. GUNICORN_WORKER_CLASS
+picks the concurrency model:
+
+- sync: one request at a time per process; 2 * CPUs + 1 processes
+- gthread (default): CPUs + 1 processes of GUNICORN_THREADS threads each;
+  routes spend most of their time waiting on MySQL, bcrypt and the LLM,
+  all of which release the GIL
+- gevent: CPUs processes of cooperative greenlets (pip install gevent);
+  the app can't be preloaded because gevent must patch the stdlib before
+  the app imports it
+
+Each process has its own DB pool (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW
+connections), so keep workers * that under MySQL's max_connections.
+"""
+import fcntl
+import glob
+import multiprocessing
+import os
+
+cpus = multiprocessing.cpu_count()
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+_default_workers = {"sync": 2 * cpus + 1, "gthread": cpus + 1}.get(worker_class, cpus)
+workers = int(os.getenv("GUNICORN_WORKERS", str(_default_workers)))
+threads = int(os.getenv("GUNICORN_THREADS", "8")) if worker_class == "gthread" else 1
+# Concurrent greenlets per gevent worker
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "500"))
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+preload_app = os.getenv("GUNICORN_PRELOAD", "false" if worker_class == "gevent" else "true").lower() in ("1", "true", "yes")
+
+# SIGTERM: stop accepting, let in-flight requests finish for up to graceful_timeout
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Recycle workers now and then so a slow leak can't grow without bound
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+# Empty GUNICORN_ACCESS_LOG turns the access log off
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+
+# Workers are separate processes, so event cache invalidations need the shared bus
+os.environ.setdefault("EVENT_CACHE_BUS_PATH", "/tmp/ticketr-event-invalidations")
+# ...and /metrics needs a directory where each worker leaves its series
+os.environ.setdefault("METRICS_DIR", "/tmp/ticketr-metrics")
+
+# One worker at a time holds this lock and runs the database-wide jobs; when
+# it exits the lock is released and its replacement picks the jobs up
+SINGLETON_LOCK_PATH = os.getenv("GUNICORN_SINGLETON_LOCK", "/tmp/ticketr-singleton-jobs.lock")
+_singleton_lock = None
+
+
+def _claim_singletons():
+    global _singleton_lock
+    handle = open(SINGLETON_LOCK_PATH, "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _singleton_lock = handle
+    return True
+
+
+def on_starting(server):
+    # Counters restart with the server; drop the previous run's worker files
+    for path in glob.glob(os.path.join(os.environ["METRICS_DIR"], "*.json")):
+        os.unlink(path)
+
+
+def post_worker_init(worker):
+    # Runs in the worker after the app is loaded (and after gevent has patched)
+    from wsgi import init_worker
+    singletons = _claim_singletons()
+    init_worker(singletons=singletons)
+    if singletons:
+        worker.log.info("Worker %s runs the attendance reconcile and revenue rollup jobs", worker.pid)
+
+
+def worker_exit(server, worker):
+    from wsgi import shutdown_worker
+    shutdown_worker()
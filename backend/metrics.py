@@ -0,0 +1,355 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from flask import Response, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+import database
+
+# Set to false to skip all request and query instrumentation
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Add a Server-Timing header (db / serialize / app / total) to every response
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+# Directory shared by every worker process: each writes its series to <pid>.json
+# there and /metrics serves the sum over all of them. Unset = this process only
+METRICS_DIR = os.getenv("METRICS_DIR")
+# Seconds between a worker's snapshot writes (the scraped worker writes its own first)
+METRICS_WRITE_INTERVAL = float(os.getenv("METRICS_WRITE_INTERVAL", "5"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+class Counter:
+    """Monotonic counter with labels, in Prometheus text format"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def snapshot(self):
+        """{label values: value}, a copy"""
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(total, label_values, value):
+        total[label_values] = total.get(label_values, 0) + value
+
+    def samples(self, values=None):
+        values = self.snapshot() if values is None else values
+        for label_values, value in sorted(values.items()):
+            yield self.name, _labels(self.labels, label_values), value
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with labels, in Prometheus text format
+
+    Args:
+        name: Metric name
+        help_text: HELP line
+        labels: Label names; observe() takes the values in the same order
+        buckets: Upper bounds, ascending (+Inf is implied)
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}    # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        """{label values: [per-bucket counts..., +Inf count, sum]}, a copy"""
+        with self._lock:
+            return {k: list(v) for k, v in self._series.items()}
+
+    @staticmethod
+    def merge(total, label_values, series):
+        current = total.get(label_values)
+        if current is None:
+            total[label_values] = list(series)
+        else:
+            for i, value in enumerate(series):
+                current[i] += value
+
+    def samples(self, series_by_labels=None):
+        series_by_labels = self.snapshot() if series_by_labels is None else series_by_labels
+        for label_values, series in sorted(series_by_labels.items()):
+            base = _labels(self.labels, label_values)
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                running += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", base + (("le", le),), running
+            yield f"{self.name}_sum", base, series[-1]
+            yield f"{self.name}_count", base, running
+
+
+class Gauge:
+    """
+    Value read from a callback at scrape time
+
+    Across workers the values of the live processes are summed (a dead
+    worker's pool no longer exists, so its last reading is dropped).
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self._read = read
+        self.labels = ()
+
+    def snapshot(self):
+        try:
+            return {(): self._read()}
+        except Exception:
+            return {}
+
+    merge = staticmethod(Counter.merge)
+
+    def samples(self, values=None):
+        values = self.snapshot() if values is None else values
+        for label_values, value in values.items():
+            yield self.name, (), value
+
+
+def _labels(names, values):
+    return tuple(zip(names, (str(v) for v in values)))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+ROUTE_LABELS = ("blueprint", "endpoint", "method", "status")
+
+request_seconds = Histogram("http_request_duration_seconds", "Time from request start to response headers", ROUTE_LABELS)
+request_db_seconds = Histogram("http_request_db_seconds", "Database time per request", ("endpoint",))
+request_queries = Histogram("http_request_queries", "SQL statements per request", ("endpoint",), COUNT_BUCKETS)
+request_rows = Counter("http_request_db_rows_total", "Rows fetched or written, by endpoint", ("endpoint",))
+query_seconds = Histogram("db_query_duration_seconds", "Time per SQL statement, execute plus fetch")
+queries_total = Counter("db_queries_total", "SQL statements run")
+rows_total = Counter("db_rows_total", "Rows fetched or written")
+
+REGISTRY = [request_seconds, request_db_seconds, request_queries, request_rows, query_seconds, queries_total, rows_total]
+
+
+def _pool_status(key):
+    return lambda: database.get_pool().status()[key]
+
+
+REGISTRY += [
+    Gauge("db_pool_open_connections", "Connections open in this process's pool", _pool_status("open")),
+    Gauge("db_pool_checked_out", "Connections currently checked out", _pool_status("checked_out")),
+    Gauge("db_pool_idle", "Idle connections waiting in the pool", _pool_status("idle")),
+]
+
+
+def write_snapshot():
+    """Write this process's series to METRICS_DIR/<pid>.json (atomically)"""
+    if not METRICS_DIR:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    state = {metric.name: [[list(k), v] for k, v in metric.snapshot().items()] for metric in REGISTRY}
+    fd, tmp_path = tempfile.mkstemp(dir=METRICS_DIR, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, os.path.join(METRICS_DIR, f"{os.getpid()}.json"))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merged():
+    """{metric: merged snapshot} summed over every worker's file in METRICS_DIR"""
+    totals = {metric: {} for metric in REGISTRY}
+    by_name = {metric.name: metric for metric in REGISTRY}
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+        try:
+            pid = int(os.path.basename(path)[:-5])
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (ValueError, OSError):
+            continue
+        live = _alive(pid)
+        for name, items in state.items():
+            metric = by_name.get(name)
+            if metric is None or (metric.kind == "gauge" and not live):
+                continue
+            for label_values, value in items:
+                metric.merge(totals[metric], tuple(label_values), value)
+    return totals
+
+
+def render():
+    """
+    Every registered metric in Prometheus text exposition format
+
+    With METRICS_DIR set, the sum over every worker that has written a
+    snapshot; otherwise this process's own series.
+    """
+    if METRICS_DIR:
+        write_snapshot()
+        snapshots = _merged()
+    else:
+        snapshots = {metric: metric.snapshot() for metric in REGISTRY}
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples(snapshots[metric]):
+            if labels:
+                name += "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, adding the time spent in dumps() to the request's serialize timer"""
+
+    def dumps(self, obj, **kwargs):
+        if not has_request_context() or "_metrics" not in g:
+            return super().dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            g._metrics["serialize"] += time.perf_counter() - started
+
+
+def _observe_query(sql, params, seconds, rows):
+    query_seconds.observe(seconds)
+    queries_total.inc()
+    rows_total.inc(rows)
+    if has_request_context():
+        timers = g.get("_metrics")
+        if timers is not None:
+            timers["db"] += seconds
+            timers["queries"] += 1
+            timers["rows"] += rows
+
+
+def _start_timer():
+    g._metrics = {"started": time.perf_counter(), "db": 0.0, "serialize": 0.0, "queries": 0, "rows": 0}
+
+
+def _record(response):
+    timers = g.pop("_metrics", None)
+    if timers is None:
+        return response
+    conn = g.get("_db_conn")
+    if conn is not None:
+        conn.finish_statements()
+    total = time.perf_counter() - timers["started"]
+    # Unmatched URLs share one label so 404 scans can't blow up the series count
+    endpoint = request.endpoint or "unmatched"
+    blueprint = request.blueprint or ""
+    request_seconds.observe(total, blueprint, endpoint, request.method, response.status_code)
+    request_db_seconds.observe(timers["db"], endpoint)
+    request_queries.observe(timers["queries"], endpoint)
+    request_rows.inc(timers["rows"], endpoint)
+    if METRICS_SERVER_TIMING:
+        # Streamed bodies (exports, chat streams) are produced after this point and not included
+        app_time = max(total - timers["db"] - timers["serialize"], 0.0)
+        response.headers["Server-Timing"] = (
+            f'db;dur={timers["db"] * 1000:.2f};desc="{timers["queries"]} queries", '
+            f'serialize;dur={timers["serialize"] * 1000:.2f}, app;dur={app_time * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}'
+        )
+        response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def start_snapshot_writer():
+    """Write this process's snapshot every METRICS_WRITE_INTERVAL seconds on a daemon thread"""
+    global _writer
+    if not METRICS_ENABLED or not METRICS_DIR or METRICS_WRITE_INTERVAL <= 0:
+        return
+    with _writer_lock:
+        if _writer is not None and _writer.is_alive():
+            return
+
+        def loop():
+            while True:
+                time.sleep(METRICS_WRITE_INTERVAL)
+                try:
+                    write_snapshot()
+                except Exception as e:
+                    print(f"Metrics snapshot failed: {e}")
+
+        _writer = threading.Thread(target=loop, name="metrics-writer", daemon=True)
+        _writer.start()
+
+
+_observer_added = False
+
+
+def init_app(app):
+    """
+    Instrument requests and queries and serve GET /metrics
+
+    Series live in each process. Under gunicorn, set METRICS_DIR (the
+    config defaults it) so every worker snapshots into it and whichever
+    worker answers /metrics serves the total, like prometheus_client's
+    multiprocess mode. Dead workers' counters and histograms stay in the
+    total; gunicorn.conf.py clears the directory when the server starts.
+    """
+    global _observer_added
+    if not METRICS_ENABLED:
+        return
+    if not _observer_added:
+        database.add_query_observer(_observe_query)
+        _observer_added = True
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_timer)
+    app.after_request(_record)
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,258 @@
+"""
+Versioned schema migrations and an EXPLAIN-based query audit
+
+Migrations are the numbered .sql files in backend/migrations/
+(NNNN_description.sql), applied in order and recorded in SCHEMA_MIGRATIONS.
+TicketR_data.sql is the version-0 schema; every change after it goes in a
+new migration file. MySQL commits DDL implicitly, so keep each migration
+small enough to finish or fix by hand if a statement fails halfway.
+
+Usage:
+    python migrate.py upgrade     # apply pending migrations
+    python migrate.py status      # list applied and pending migrations
+    python migrate.py audit       # EXPLAIN every blueprint query, flag full scans
+"""
+import argparse
+import ast
+import os
+import re
+import sys
+from database import get_db_connection
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(BASE_DIR, "migrations")
+# Modules whose cursor.execute() strings the audit checks
+AUDIT_SOURCES = ("routes", "services")
+# Named lock so only one worker applies migrations at startup
+MIGRATION_LOCK = "ticketr_schema_migrations"
+
+# SQL the AST scan can't see because it is assembled at runtime
+DYNAMIC_QUERY_SAMPLES = [
+    ("pagination.fetch_page", "SELECT event_id, event_name FROM EVENTS WHERE event_id > %s ORDER BY event_id ASC LIMIT %s"),
+    ("pagination.fetch_page", "SELECT event_id, event_date FROM EVENTS WHERE (event_date > %s OR (event_date = %s AND event_id > %s)) ORDER BY event_date ASC, event_id ASC LIMIT %s"),
+    ("pagination.fetch_page", "SELECT event_id FROM EVENTS WHERE org_id = %s ORDER BY event_id ASC LIMIT %s"),
+    ("pagination.fetch_page", "SELECT ticket_id FROM tickets WHERE event_id = %s ORDER BY ticket_id ASC LIMIT %s"),
+    ("pagination.fetch_page", "SELECT ticket_id FROM tickets WHERE user_id = %s ORDER BY ticket_id ASC LIMIT %s"),
+    ("pagination.fetch_page", "SELECT payment_id FROM PAYMENTS WHERE user_id = %s ORDER BY payment_id ASC LIMIT %s"),
+    ("pagination.fetch_page", "SELECT chat_id FROM CHAT_HISTORY WHERE user_id = %s ORDER BY chat_id ASC LIMIT %s"),
+    ("pagination.fetch_page", "SELECT chat_id FROM CHAT_HISTORY WHERE recommended_event_id = %s ORDER BY chat_id ASC LIMIT %s"),
+    ("pagination.fetch_page", "SELECT ad_id FROM ADVERTISEMENTS WHERE event_id = %s ORDER BY ad_id ASC LIMIT %s"),
+    ("ai_service._query_events", "SELECT * FROM EVENTS WHERE event_status = 'upcoming' AND ticket_price <= %s AND event_category = %s ORDER BY event_date ASC LIMIT 10"),
+    ("ai_service._query_events", "SELECT * FROM EVENTS WHERE event_status = 'upcoming' AND ticket_price <= %s ORDER BY event_date ASC LIMIT 10"),
+    ("ai_service._query_events", "SELECT * FROM EVENTS WHERE event_status = 'upcoming' AND event_date >= %s AND event_date < %s ORDER BY event_date ASC LIMIT 10"),
+    ("services.ticket_service.reserve_seats", "UPDATE EVENTS SET tickets_sold = tickets_sold + %s WHERE event_id = %s AND (max_attendees IS NULL OR tickets_sold + tickets_held + %s <= max_attendees)"),
+]
+
+
+def load_migrations():
+    """
+    Find migration files
+
+    Returns:
+        List of (version, name, path) sorted by version
+    """
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = re.match(r"^(\d+)_(\w+)\.sql$", filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    migrations.sort()
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Duplicate migration version numbers")
+    return migrations
+
+
+def split_statements(sql):
+    """Split a migration file into statements (no stored procedures, so ';' is enough)"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def _ensure_table(cursor):
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS SCHEMA_MIGRATIONS ("
+        "version INT PRIMARY KEY, "
+        "name VARCHAR(256) NOT NULL, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+
+
+def _applied_versions(cursor):
+    cursor.execute("SELECT version FROM SCHEMA_MIGRATIONS")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def run_migrations():
+    """
+    Apply every pending migration in version order
+
+    Returns:
+        List of (version, name) applied by this call
+
+    Raises:
+        RuntimeError: If the database is unreachable or another process holds the lock
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    cursor = conn.cursor()
+    applied = []
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 60)", (MIGRATION_LOCK,))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("Timed out waiting for the migration lock")
+        try:
+            _ensure_table(cursor)
+            done = _applied_versions(cursor)
+            for version, name, path in load_migrations():
+                if version in done:
+                    continue
+                print(f"Applying migration {version:04d}_{name}")
+                with open(path, encoding="utf-8") as f:
+                    statements = split_statements(f.read())
+                for statement in statements:
+                    cursor.execute(statement)
+                cursor.execute("INSERT INTO SCHEMA_MIGRATIONS (version, name) VALUES (%s, %s)", (version, name))
+                conn.commit()
+                applied.append((version, name))
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+    return applied
+
+
+def migration_status():
+    """
+    Returns:
+        List of dicts with version, name and applied flag
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    cursor = conn.cursor()
+    _ensure_table(cursor)
+    done = _applied_versions(cursor)
+    cursor.close()
+    conn.close()
+    return [{"version": v, "name": n, "applied": v in done} for v, n, _ in load_migrations()]
+
+
+def _module_constants(tree):
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    constants[target.id] = node.value.value
+    return constants
+
+
+def collect_queries():
+    """
+    Statically collect the SQL passed to cursor.execute()/executemany()
+
+    Literal strings and module-level string constants are picked up;
+    runtime-built SQL is covered by DYNAMIC_QUERY_SAMPLES.
+
+    Returns:
+        List of (location, sql) for SELECT, UPDATE and DELETE statements
+    """
+    queries = []
+    for package in AUDIT_SOURCES:
+        folder = os.path.join(BASE_DIR, package)
+        for filename in sorted(os.listdir(folder)):
+            if not filename.endswith(".py"):
+                continue
+            path = os.path.join(folder, filename)
+            with open(path, encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=path)
+            constants = _module_constants(tree)
+            for node in ast.walk(tree):
+                if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                        and node.func.attr in ("execute", "executemany") and node.args):
+                    continue
+                arg = node.args[0]
+                if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                    sql = arg.value
+                elif isinstance(arg, ast.Name) and arg.id in constants:
+                    sql = constants[arg.id]
+                else:
+                    continue
+                # Only statements that read or modify table rows have a plan worth checking
+                if re.match(r"^\s*UPDATE\b", sql, re.I) or re.match(r"^\s*(SELECT|DELETE)\b.*\bFROM\b", sql, re.I | re.S):
+                    queries.append((package, filename, node.lineno, sql))
+    queries.sort()
+    return [(f"{p}/{f}:{line}", sql) for p, f, line, sql in queries] + DYNAMIC_QUERY_SAMPLES
+
+
+def _bind_placeholders(sql):
+    # EXPLAIN needs literal values; LIMIT/INTERVAL need numbers, everything
+    # else gets a string so VARCHAR comparisons can still use their indexes
+    sql = re.sub(r"(LIMIT|INTERVAL)\s+%s", r"\1 1", sql, flags=re.I)
+    return sql.replace("%s", "'1'")
+
+
+def audit_queries():
+    """
+    EXPLAIN every collected query
+
+    Returns:
+        List of findings: dicts with location, sql, table, access type and problem
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    cursor = conn.cursor(dictionary=True)
+    findings = []
+    for location, sql in collect_queries():
+        try:
+            cursor.execute("EXPLAIN " + _bind_placeholders(sql))
+            plan = cursor.fetchall()
+        except Exception as e:
+            findings.append({"location": location, "sql": sql, "table": None, "type": None, "problem": f"EXPLAIN failed: {e}"})
+            continue
+        for row in plan:
+            access = row.get("type")
+            extra = row.get("Extra") or ""
+            problem = None
+            if access == "ALL":
+                problem = "full table scan"
+            elif access == "index":
+                problem = "full index scan"
+            elif "Using filesort" in extra and "LIMIT" in sql.upper():
+                problem = "filesort before LIMIT"
+            if problem:
+                findings.append({"location": location, "sql": sql, "table": row.get("table"), "type": access, "problem": problem})
+    conn.rollback()
+    cursor.close()
+    conn.close()
+    return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["upgrade", "status", "audit"])
+    parser.add_argument("--strict", action="store_true", help="audit: exit non-zero if anything is flagged")
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        applied = run_migrations()
+        print(f"Applied {len(applied)} migration(s)" if applied else "Schema is up to date")
+    elif args.command == "status":
+        for m in migration_status():
+            print(f"{m['version']:04d}_{m['name']:<40} {'applied' if m['applied'] else 'pending'}")
+    else:
+        findings = audit_queries()
+        for f in findings:
+            print(f"[{f['problem']}] {f['location']} table={f['table']} type={f['type']}\n    {f['sql']}")
+        print(f"{len(findings)} finding(s)")
+        if findings and args.strict:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
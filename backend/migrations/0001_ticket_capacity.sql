@@ -0,0 +1,21 @@
+-- Per-event capacity counters and checkout holds used by the purchase path
+-- (services/ticket_service.py). Counters are backfilled from TICKETS.
+
+ALTER TABLE EVENTS
+    ADD COLUMN tickets_sold INT NOT NULL DEFAULT 0,   -- maintained by the purchase path
+    ADD COLUMN tickets_held INT NOT NULL DEFAULT 0;   -- seats in active checkout holds
+
+UPDATE EVENTS e
+SET e.tickets_sold = (SELECT COUNT(*) FROM TICKETS t WHERE t.event_id = e.event_id);
+
+CREATE TABLE TICKET_HOLDS (
+    hold_id INT PRIMARY KEY AUTO_INCREMENT,
+    event_id INT NOT NULL,
+    user_id INT NOT NULL,
+    status VARCHAR(50) DEFAULT 'active',
+    expires_at DATETIME NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+    FOREIGN KEY (user_id) REFERENCES USERS(user_id),
+    INDEX idx_holds_event_status_expiry (event_id, status, expires_at)
+);
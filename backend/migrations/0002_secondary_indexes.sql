@@ -0,0 +1,16 @@
+-- Secondary indexes for the hottest access paths.
+-- CHAT_HISTORY.recommended_event_id, TICKETS.user_id and the other foreign
+-- keys are already indexed by their FOREIGN KEY constraints.
+
+-- Upcoming events in date order (AI helpers, event browsing)
+CREATE INDEX idx_events_status_date ON EVENTS (event_status, event_date);
+
+-- Category browsing and chat search by category
+CREATE INDEX idx_events_category_status_date ON EVENTS (event_category, event_status, event_date);
+
+-- Price ceilings ("free", "under $20") within upcoming events
+CREATE INDEX idx_events_status_price ON EVENTS (event_status, ticket_price);
+
+-- Active ad windows, globally and per event
+CREATE INDEX idx_ads_status_window ON ADVERTISEMENTS (status, start_date, end_date);
+CREATE INDEX idx_ads_event_window ON ADVERTISEMENTS (event_id, start_date, end_date);
@@ -0,0 +1,7 @@
+-- Door check-in (POST /api/tickets/check_in) resolves tickets by QR code,
+-- and the preloader finds events whose doors open soon.
+
+CREATE INDEX idx_tickets_qr_code ON TICKETS (qr_code);
+
+CREATE INDEX idx_events_status_vip_access ON EVENTS (event_status, vip_access_time);
+CREATE INDEX idx_events_status_general_access ON EVENTS (event_status, general_access_time);
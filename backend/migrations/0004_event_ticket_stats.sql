@@ -0,0 +1,38 @@
+-- Per-event ticket counters for the attendance endpoint
+-- (services/attendance_service.py), kept current by the ticket routes and
+-- rebuilt from TICKETS by the reconcile job. Backfilled here.
+
+-- One row per (event, dimension, bucket): dimension 'status' buckets by
+-- ticket_status, 'source' by purchase_source, 'checked_in' has the single
+-- bucket 'all'.
+CREATE TABLE EVENT_TICKET_STATS (
+    event_id INT NOT NULL,
+    dimension VARCHAR(20) NOT NULL,
+    bucket VARCHAR(50) NOT NULL,
+    ticket_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_id, dimension, bucket),
+    FOREIGN KEY (event_id) REFERENCES EVENTS(event_id)
+);
+
+-- Check-ins per minute of check_in_time
+CREATE TABLE EVENT_CHECKIN_MINUTES (
+    event_id INT NOT NULL,
+    minute DATETIME NOT NULL,
+    ticket_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_id, minute),
+    FOREIGN KEY (event_id) REFERENCES EVENTS(event_id)
+);
+
+INSERT INTO EVENT_TICKET_STATS (event_id, dimension, bucket, ticket_count)
+SELECT event_id, 'status', COALESCE(ticket_status, ''), COUNT(*) FROM TICKETS GROUP BY event_id, ticket_status;
+
+INSERT INTO EVENT_TICKET_STATS (event_id, dimension, bucket, ticket_count)
+SELECT event_id, 'source', COALESCE(purchase_source, ''), COUNT(*) FROM TICKETS GROUP BY event_id, purchase_source;
+
+INSERT INTO EVENT_TICKET_STATS (event_id, dimension, bucket, ticket_count)
+SELECT event_id, 'checked_in', 'all', COUNT(*) FROM TICKETS WHERE check_in_time IS NOT NULL GROUP BY event_id;
+
+INSERT INTO EVENT_CHECKIN_MINUTES (event_id, minute, ticket_count)
+SELECT event_id, DATE_FORMAT(check_in_time, '%Y-%m-%d %H:%i:00'), COUNT(*)
+FROM TICKETS WHERE check_in_time IS NOT NULL
+GROUP BY event_id, DATE_FORMAT(check_in_time, '%Y-%m-%d %H:%i:00');
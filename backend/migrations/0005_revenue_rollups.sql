@@ -0,0 +1,34 @@
+-- Hourly and daily PAYMENTS aggregates for finance reporting
+-- (services/payment_service.py). Filled by `python rollup.py backfill` and
+-- kept current from a high-water mark; nothing is backfilled here.
+
+CREATE TABLE REVENUE_ROLLUPS (
+    granularity CHAR(1) NOT NULL,            -- 'h' hourly, 'd' daily
+    bucket_start DATETIME NOT NULL,
+    payment_method VARCHAR(50) NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    is_vip BOOLEAN NOT NULL,
+    payments INT NOT NULL DEFAULT 0,
+    amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+    platform_fee DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, payment_method, status, is_vip)
+);
+
+-- High-water mark: every payment up to last_payment_id is in the rollups
+CREATE TABLE ROLLUP_STATE (
+    name VARCHAR(64) PRIMARY KEY,
+    last_payment_id INT NOT NULL DEFAULT 0,
+    last_payment_date DATETIME NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT INTO ROLLUP_STATE (name) VALUES ('revenue');
+
+-- Hours whose already rolled-up payments were edited or deleted; recomputed by the next pass
+CREATE TABLE REVENUE_ROLLUP_DIRTY (
+    bucket_start DATETIME PRIMARY KEY,
+    marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Range scans for dirty-hour recomputes and the consistency check
+CREATE INDEX idx_payments_date ON PAYMENTS (payment_date);
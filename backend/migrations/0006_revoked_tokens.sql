@@ -0,0 +1,12 @@
+-- Revoked bearer tokens (logout), checked by the auth middleware
+-- (services/auth_service.py). Rows are only needed until the token would
+-- have expired anyway; workers pick up new rows by revocation_id.
+
+CREATE TABLE REVOKED_TOKENS (
+    revocation_id INT PRIMARY KEY AUTO_INCREMENT,
+    token_digest CHAR(64) NOT NULL UNIQUE,    -- SHA-256 of the token, hex
+    principal VARCHAR(64),                    -- e.g. 'user:12', for auditing
+    expires_at DATETIME NOT NULL,             -- the token's own exp (UTC)
+    revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_revoked_tokens_expiry (expires_at)
+);
@@ -0,0 +1,5 @@
+-- Workers poll REVOKED_TOKENS by revoked_at over a trailing window rather
+-- than by revocation_id: ids are assigned at INSERT, so a logout that
+-- commits after a later one would be skipped by an id high-water mark.
+
+CREATE INDEX idx_revoked_tokens_revoked_at ON REVOKED_TOKENS (revoked_at);
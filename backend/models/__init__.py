@@ -0,0 +1,14 @@
+"""
+Tuple-backed row records and one repository per table
+
+    from models import event_repo, Event
+    cursor = conn.cursor()                # plain cursor: rows are tuples
+    event = event_repo.get(cursor, 42)    # Event or None
+    event.event_name, event.to_dict()
+"""
+from models.base import Record, Repository, projection, record_response, records_response
+from models.event import Event, EVENT_COLUMNS, event_repo
+from models.organization import Organization, ORG_COLUMNS, org_repo
+from models.payment import Payment, PAYMENT_COLUMNS, payment_repo
+from models.ticket import Ticket, TICKET_COLUMNS, ticket_repo
+from models.user import User, USER_COLUMNS, user_repo
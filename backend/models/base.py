@@ -0,0 +1,152 @@
+from functools import lru_cache
+from operator import itemgetter
+from flask import current_app
+
+
+class Record(tuple):
+    """
+    Immutable row backed by a plain tuple
+
+    Subclasses set `columns`; each column becomes a read-only attribute
+    (an itemgetter, like namedtuple) and `index` maps names to positions.
+    A record costs what its tuple costs, where a dictionary-cursor row
+    carries a dict with its own hash table for the same keys on every row.
+    """
+
+    __slots__ = ()
+    columns = ()
+    index = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.index = {name: i for i, name in enumerate(cls.columns)}
+        for i, name in enumerate(cls.columns):
+            setattr(cls, name, property(itemgetter(i)))
+
+    @classmethod
+    def from_row(cls, row):
+        return None if row is None else tuple.__new__(cls, row)
+
+    def get(self, name, default=None):
+        i = self.index.get(name)
+        return default if i is None else tuple.__getitem__(self, i)
+
+    def to_dict(self):
+        return dict(zip(self.columns, self))
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={value!r}" for name, value in zip(self.columns, self))
+        return f"{type(self).__name__}({values})"
+
+
+@lru_cache(maxsize=256)
+def projection(record, columns):
+    """
+    Record type for a subset of `record`'s columns, e.g. a ?fields= selection
+
+    The full column list returns `record` itself; any other selection gets a
+    Record subclass built once per (record, columns) and reused.
+    """
+    columns = tuple(columns)
+    if columns == record.columns:
+        return record
+    return type(record.__name__, (Record,), {"__slots__": (), "columns": columns})
+
+
+class Repository:
+    """
+    SQL for one table, built once and reused
+
+    Reads select an explicit column list on a plain (tuple) cursor and wrap
+    rows in `record`. Every statement string is generated on first use and
+    cached on the instance, so routes stop re-typing the same SQL and each
+    call only formats its parameters.
+
+    Args:
+        table: Table name as routes write it
+        record: Record subclass; its columns are what reads select
+        pk: Primary key column
+    """
+
+    def __init__(self, table, record, pk):
+        self.table = table
+        self.record = record
+        self.pk = pk
+        self.select_list = ", ".join(record.columns)
+        self._statements = {}
+
+    def statement(self, key, build):
+        """Cached SQL for `key`, built by build() the first time"""
+        sql = self._statements.get(key)
+        if sql is None:
+            sql = self._statements[key] = build()
+        return sql
+
+    def get(self, cursor, pk_value):
+        """The row with this primary key, or None"""
+        return self.find_one(cursor, self.pk, pk_value)
+
+    def find_one(self, cursor, column, value):
+        sql = self.statement(("one", column), lambda: (
+            f"SELECT {self.select_list} FROM {self.table} WHERE {self._column(column)} = %s LIMIT 1"
+        ))
+        cursor.execute(sql, (value,))
+        return self.record.from_row(cursor.fetchone())
+
+    def find(self, cursor, column, value, limit=None):
+        """Rows where column = value, in primary key order"""
+        sql = self.statement(("by", column), lambda: (
+            f"SELECT {self.select_list} FROM {self.table} WHERE {self._column(column)} = %s "
+            f"ORDER BY {self.pk} LIMIT %s"
+        ))
+        cursor.execute(sql, (value, limit if limit is not None else 2 ** 31 - 1))
+        make = self.record.from_row
+        return [make(row) for row in cursor.fetchall()]
+
+    def insert(self, cursor, values):
+        """INSERT the given {column: value} and return the new primary key"""
+        columns = tuple(values)
+        sql = self.statement(("insert", columns), lambda: (
+            f"INSERT INTO {self.table} ({', '.join(self._column(c) for c in columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})"
+        ))
+        cursor.execute(sql, tuple(values.values()))
+        return cursor.lastrowid
+
+    def update(self, cursor, pk_value, values):
+        """UPDATE the given {column: value} on one row; returns rows matched"""
+        columns = tuple(values)
+        sql = self.statement(("update", columns), lambda: (
+            f"UPDATE {self.table} SET {', '.join(f'{self._column(c)} = %s' for c in columns)} WHERE {self.pk} = %s"
+        ))
+        cursor.execute(sql, (*values.values(), pk_value))
+        return cursor.rowcount
+
+    def delete(self, cursor, pk_value):
+        sql = self.statement(("delete",), lambda: f"DELETE FROM {self.table} WHERE {self.pk} = %s")
+        cursor.execute(sql, (pk_value,))
+        return cursor.rowcount
+
+    def _column(self, name):
+        # Column names end up in SQL text, so only known ones are allowed
+        if name not in self.record.index:
+            raise ValueError(f"Unknown column '{name}' for {self.table}")
+        return name
+
+
+def record_response(record):
+    """JSON response for one record, shaped like the dictionary-cursor row it replaces"""
+    return current_app.json.response(record.to_dict())
+
+
+def records_response(records):
+    """
+    JSON array response for a list of records
+
+    Dicts are built only here, at serialization time; until then (in the
+    event cache, in service code) the rows stay tuples.
+    """
+    if not records:
+        return current_app.json.response([])
+    columns = records[0].columns
+    return current_app.json.response([dict(zip(columns, row)) for row in records])
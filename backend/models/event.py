@@ -0,0 +1,11 @@
+from models.base import Record, Repository
+
+EVENT_COLUMNS = ("event_id", "org_id", "event_name", "event_date", "location", "max_attendees", "ticket_price", "event_category", "event_status", "is_sponsored", "sponsor_name", "vip_access_time", "general_access_time", "event_description", "tickets_sold", "tickets_held")
+
+
+class Event(Record):
+    __slots__ = ()
+    columns = EVENT_COLUMNS
+
+
+event_repo = Repository("EVENTS", Event, "event_id")
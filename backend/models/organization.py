@@ -0,0 +1,11 @@
+from models.base import Record, Repository
+
+ORG_COLUMNS = ("org_id", "org_name", "address", "email", "is_premium")
+
+
+class Organization(Record):
+    __slots__ = ()
+    columns = ORG_COLUMNS
+
+
+org_repo = Repository("ORGANIZATIONS", Organization, "org_id")
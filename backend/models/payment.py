@@ -0,0 +1,11 @@
+from models.base import Record, Repository
+
+PAYMENT_COLUMNS = ("payment_id", "user_id", "amount", "platform_fee", "payment_method", "payment_date", "status")
+
+
+class Payment(Record):
+    __slots__ = ()
+    columns = PAYMENT_COLUMNS
+
+
+payment_repo = Repository("PAYMENTS", Payment, "payment_id")
@@ -0,0 +1,11 @@
+from models.base import Record, Repository
+
+TICKET_COLUMNS = ("ticket_id", "event_id", "user_id", "ticket_status", "qr_code", "purchase_date", "check_in_time", "purchase_source")
+
+
+class Ticket(Record):
+    __slots__ = ()
+    columns = TICKET_COLUMNS
+
+
+ticket_repo = Repository("tickets", Ticket, "ticket_id")
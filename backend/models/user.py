@@ -0,0 +1,11 @@
+from models.base import Record, Repository
+
+USER_COLUMNS = ("user_id", "user_name", "email", "is_vip", "created_at")
+
+
+class User(Record):
+    __slots__ = ()
+    columns = USER_COLUMNS
+
+
+user_repo = Repository("USERS", User, "user_id")
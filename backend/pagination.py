@@ -0,0 +1,191 @@
+import base64
+import json
+import os
+from datetime import date, datetime
+from urllib.parse import urlencode
+from flask import request
+from models import Record, projection, records_response
+
+# Page size used when the client does not pass ?limit=; clients that want
+# the whole list follow X-Next-Cursor
+DEFAULT_PAGE_LIMIT = int(os.getenv("DEFAULT_PAGE_LIMIT", "500"))
+# Hard ceiling so no single call can pull a whole table into memory
+MAX_PAGE_LIMIT = int(os.getenv("MAX_PAGE_LIMIT", "1000"))
+
+
+class PageRequest:
+    """Parsed ?limit=&after=&fields=&sort= arguments for a list endpoint"""
+
+    def __init__(self, columns, pk, limit, after, sort_column, descending):
+        self.columns = columns
+        self.pk = pk
+        self.limit = limit
+        self.after = after
+        self.sort_column = sort_column
+        self.descending = descending
+
+
+def encode_cursor(values):
+    """Encode keyset values as an opaque URL-safe cursor"""
+    def _plain(value):
+        if isinstance(value, datetime):
+            return value.isoformat(sep=' ')
+        if isinstance(value, date):
+            return value.isoformat()
+        return value
+    raw = json.dumps([_plain(v) for v in values], separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_fields(columns, required=()):
+    """
+    Read the ?fields=a,b projection from the current request
+
+    Args:
+        columns: Columns the endpoint may return (also the default projection)
+        required: Columns that are always selected
+
+    Returns:
+        List of column names to select
+
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    fields = request.args.get("fields")
+    if fields:
+        selected = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in selected if f not in columns]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    else:
+        selected = list(columns)
+    for column in required:
+        if column not in selected:
+            selected.append(column)
+    return selected
+
+
+def parse_page_args(columns, pk, sortable=()):
+    """
+    Read pagination arguments from the current request
+
+    Args:
+        columns: Columns the endpoint may return (also the default projection)
+        pk: Primary key column, always selected and used as the keyset tie-breaker
+        sortable: Extra NOT NULL columns clients may sort by (prefix '-' for descending)
+
+    Returns:
+        PageRequest
+
+    Raises:
+        ValueError: If limit, after, fields or sort is malformed
+    """
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_LIMIT))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    limit = min(limit, MAX_PAGE_LIMIT)
+
+    sort = request.args.get("sort", pk)
+    descending = sort.startswith('-')
+    sort_column = sort.lstrip('-')
+    if sort_column != pk and sort_column not in sortable:
+        raise ValueError(f"Cannot sort by '{sort_column}'")
+
+    # The keyset columns must come back so the next cursor can be built
+    selected = parse_fields(columns, required=(pk, sort_column))
+
+    after = request.args.get("after")
+    if after:
+        after = decode_cursor(after)
+        expected = 1 if sort_column == pk else 2
+        if len(after) != expected:
+            raise ValueError("Invalid cursor")
+
+    return PageRequest(selected, pk, limit, after, sort_column, descending)
+
+
+def fetch_page(cursor, table, page, where=None, params=(), record=Record):
+    """
+    Run one keyset-paginated SELECT
+
+    Args:
+        cursor: Plain (tuple) cursor to execute on
+        table: Table name
+        page: PageRequest from parse_page_args
+        where: Optional extra filter, e.g. "user_id = %s"
+        params: Parameters for `where`
+        record: Model Record for the table; rows come back as it, or as a
+            projection of it when ?fields= narrowed the columns
+
+    Returns:
+        (rows, next_cursor) where rows are records and next_cursor is None
+        on the last page
+    """
+    conditions = [where] if where else []
+    params = list(params)
+    op = '<' if page.descending else '>'
+    direction = 'DESC' if page.descending else 'ASC'
+
+    if page.sort_column == page.pk:
+        order_by = f"{page.pk} {direction}"
+        if page.after:
+            conditions.append(f"{page.pk} {op} %s")
+            params.append(page.after[0])
+    else:
+        order_by = f"{page.sort_column} {direction}, {page.pk} {direction}"
+        if page.after:
+            conditions.append(f"({page.sort_column} {op} %s OR ({page.sort_column} = %s AND {page.pk} {op} %s))")
+            params.extend([page.after[0], page.after[0], page.after[1]])
+
+    query = f"SELECT {', '.join(page.columns)} FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    # Fetch one extra row to learn whether another page exists
+    query += f" ORDER BY {order_by} LIMIT %s"
+    params.append(page.limit + 1)
+
+    cursor.execute(query, params)
+    make = projection(record, tuple(page.columns)).from_row
+    rows = [make(row) for row in cursor.fetchall()]
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        if page.sort_column == page.pk:
+            next_cursor = encode_cursor([last.get(page.pk)])
+        else:
+            next_cursor = encode_cursor([last.get(page.sort_column), last.get(page.pk)])
+    return rows, next_cursor
+
+
+def page_response(rows, next_cursor):
+    """
+    JSON list response carrying the next cursor in headers
+
+    `rows` are the records fetch_page returned. The body stays a plain
+    array so existing clients keep working; the cursor is sent as
+    X-Next-Cursor and as an RFC 8288 Link header.
+    """
+    response = records_response(rows)
+    if next_cursor:
+        args = request.args.to_dict()
+        args["after"] = next_cursor
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return response
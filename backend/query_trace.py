@@ -0,0 +1,184 @@
+import hashlib
+import os
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from flask import g, has_request_context, jsonify, request
+import database
+
+# Opt-in: trace every statement (fingerprint stats, slow log, N+1 warnings)
+SQL_TRACE = os.getenv("SQL_TRACE", "false").lower() in ("1", "true", "yes")
+# Statements at or above this many milliseconds are logged
+SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "200"))
+# Warn when one request runs the same fingerprint more than this many times
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10"))
+# Distinct fingerprints kept in memory; the least costly one is dropped past this
+SQL_TRACE_MAX_FINGERPRINTS = int(os.getenv("SQL_TRACE_MAX_FINGERPRINTS", "1000"))
+
+# String literals and comments in one left-to-right pass: whichever starts
+# first wins, so "--" or "#" inside a string isn't taken for a comment
+_STRING_OR_COMMENT = re.compile(
+    r"(?P<string>'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\")|/\*.*?\*/|--[^\n]*|#[^\n]*", re.S
+)
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_IN_LIST = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_VALUES_LIST = re.compile(r"\bvalues\s*(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*", re.I)
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def normalize(sql):
+    """
+    SQL with literals and placeholders replaced by ?, so statements that
+    differ only in their values (or IN-list / multi-row VALUES length) match
+
+    >>> normalize("SELECT * FROM TICKETS WHERE event_id IN (%s, %s) AND status = 'active'")
+    'SELECT * FROM TICKETS WHERE event_id IN (...) AND status = ?'
+    """
+    text = _STRING_OR_COMMENT.sub(lambda m: "?" if m.group("string") else " ", sql)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("IN (...)", text)
+    text = _VALUES_LIST.sub(r"VALUES \1 ...", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+def fingerprint(sql):
+    """(short id, normalized SQL) for a statement"""
+    if isinstance(sql, (bytes, bytearray)):
+        sql = sql.decode("utf-8", "replace")
+    text = normalize(sql)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12], text
+
+
+def redact(params):
+    """Parameter types without their values, e.g. (<int>, <str>)"""
+    if params is None:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: <{type(v).__name__}>" for k, v in params.items()) + "}"
+    if isinstance(params, (list, tuple)) and params and isinstance(params[0], (list, tuple, dict)):
+        # executemany: one parameter set per row
+        return f"{len(params)} x {redact(params[0])}"
+    if isinstance(params, (list, tuple)):
+        return "(" + ", ".join(f"<{type(v).__name__}>" for v in params) + ")"
+    return f"<{type(params).__name__}>"
+
+
+class QueryTracer:
+    """
+    Per-fingerprint statement stats, a slow-query log and N+1 detection
+
+    Registered as a database query observer, so it sees each statement
+    once with its total execute + fetch time and row count. Inside a
+    request it also counts fingerprints for that request and warns the
+    first time one passes `n_plus_one_threshold`.
+
+    Args:
+        slow_ms: Log statements taking at least this long
+        n_plus_one_threshold: Same-fingerprint executions per request before warning
+        max_fingerprints: Distinct fingerprints kept
+    """
+
+    def __init__(self, slow_ms=SQL_SLOW_MS, n_plus_one_threshold=SQL_N_PLUS_ONE_THRESHOLD,
+                 max_fingerprints=SQL_TRACE_MAX_FINGERPRINTS):
+        self.slow_ms = slow_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def observe(self, sql, params, seconds, rows):
+        fp, text = fingerprint(sql)
+        endpoint = request.endpoint if has_request_context() else None
+        slow = seconds * 1000 >= self.slow_ms
+        repeated = self._count_in_request(fp) if endpoint else 0
+
+        with self._lock:
+            entry = self._stats.get(fp)
+            if entry is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    cheapest = min(self._stats, key=lambda k: self._stats[k]["total_seconds"])
+                    del self._stats[cheapest]
+                entry = self._stats[fp] = {
+                    "fingerprint": fp, "sql": text, "count": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                    "rows": 0, "slow": 0, "n_plus_one": 0, "endpoints": Counter()
+                }
+            entry["count"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["rows"] += rows
+            entry["endpoints"][endpoint or "(background)"] += 1
+            if slow:
+                entry["slow"] += 1
+            if repeated == self.n_plus_one_threshold + 1:
+                entry["n_plus_one"] += 1
+
+        if slow:
+            print(f"Slow query {seconds * 1000:.1f}ms rows={rows} fp={fp} endpoint={endpoint or '-'}: "
+                  f"{text} params={redact(params)}")
+        if repeated == self.n_plus_one_threshold + 1:
+            print(f"Possible N+1 in {endpoint} {request.method} {request.path}: fp={fp} ran more than "
+                  f"{self.n_plus_one_threshold} times in one request: {text}")
+
+    def top(self, limit=20, sort="total_seconds"):
+        with self._lock:
+            entries = [dict(e, endpoints=dict(e["endpoints"].most_common(5))) for e in self._stats.values()]
+        entries.sort(key=lambda e: e[sort], reverse=True)
+        for entry in entries[:limit]:
+            entry["avg_ms"] = round(entry["total_seconds"] / entry["count"] * 1000, 3)
+            entry["max_ms"] = round(entry.pop("max_seconds") * 1000, 3)
+            entry["total_ms"] = round(entry.pop("total_seconds") * 1000, 3)
+        return entries[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def _count_in_request(self, fp):
+        counts = g.get("_sql_trace")
+        if counts is None:
+            counts = g._sql_trace = Counter()
+        counts[fp] += 1
+        return counts[fp]
+
+
+query_tracer = QueryTracer()
+
+SORT_KEYS = {"total": "total_seconds", "count": "count", "max": "max_seconds", "rows": "rows",
+             "slow": "slow", "n_plus_one": "n_plus_one"}
+
+_observer_added = False
+
+
+def init_app(app):
+    """Register the tracer and GET/DELETE /debug/sql when SQL_TRACE is on"""
+    global _observer_added
+    if not SQL_TRACE:
+        return
+    if not _observer_added:
+        database.add_query_observer(query_tracer.observe)
+        _observer_added = True
+
+    @app.get("/debug/sql")
+    def sql_offenders():
+        # Top fingerprints: ?sort=total|count|max|rows|slow|n_plus_one&limit=20
+        sort = request.args.get("sort", "total")
+        if sort not in SORT_KEYS:
+            return jsonify({"error": f"sort must be one of {', '.join(SORT_KEYS)}"}), 400
+        try:
+            limit = max(1, min(int(request.args.get("limit", "20")), 200))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        return jsonify({
+            "slow_ms": query_tracer.slow_ms,
+            "n_plus_one_threshold": query_tracer.n_plus_one_threshold,
+            "fingerprints": query_tracer.top(limit, SORT_KEYS[sort])
+        })
+
+    @app.delete("/debug/sql")
+    def reset_sql_offenders():
+        query_tracer.reset()
+        return jsonify({"message": "SQL trace stats cleared"})
@@ -0,0 +1,64 @@
+"""
+Revenue rollup maintenance (REVENUE_ROLLUPS, see services/payment_service.py)
+
+The API workers keep the rollups current on their own (ROLLUP_INTERVAL);
+these commands are for first setup, repairs and audits.
+
+Usage:
+    python rollup.py update                                    # roll up new payments and dirty hours now
+    python rollup.py backfill                                  # rebuild every rollup from PAYMENTS
+    python rollup.py status                                    # high-water mark and backlog
+    python rollup.py check --start 2026-01-01 --end 2026-02-01 [--repair]
+"""
+import argparse
+import sys
+from datetime import datetime
+from database import get_db_connection
+from services.payment_service import backfill, check_consistency, rollup_status, update_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["update", "backfill", "status", "check"])
+    parser.add_argument("--start", type=datetime.fromisoformat, help="check: first day (inclusive)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="check: last day (exclusive)")
+    parser.add_argument("--repair", action="store_true", help="check: queue mismatched hours and recompute them")
+    args = parser.parse_args()
+
+    if args.command in ("update", "backfill"):
+        result = update_rollups() if args.command == "update" else backfill()
+        print(f"Rolled up {result['payments']} payment(s), recomputed {result['dirty_hours']} hour(s); "
+              f"high-water mark {result['last_payment_id']}")
+        return
+
+    conn = get_db_connection()
+    if not conn:
+        sys.exit("Database connection failed")
+    cursor = conn.cursor()
+    try:
+        if args.command == "status":
+            for key, value in rollup_status(cursor).items():
+                print(f"{key:<20} {value}")
+            return
+        if not args.start or not args.end:
+            parser.error("check needs --start and --end")
+        result = check_consistency(cursor, args.start, args.end, repair=args.repair)
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+    print(f"{result['start']} .. {result['end']} (payments up to {result['last_payment_id']}): "
+          f"{'consistent' if result['consistent'] else 'MISMATCH'}")
+    for hour in result["mismatched_hours"]:
+        print(f"  hour {hour}")
+    for day in result["mismatched_days"]:
+        print(f"  day  {day}")
+    if result["repair_queued"]:
+        print(f"Recomputed {update_rollups()['dirty_hours']} hour(s)")
+    if not result["consistent"] and not args.repair:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
 from database import get_db_connection
+from pagination import parse_page_args, fetch_page, page_response
 
 advertisements_bp = Blueprint('advertisements', __name__)
 
+# Real column names (ad_id, ad_type), so list rows keep the keys SELECT * gave them
+ADVERTISEMENT_COLUMNS = ("ad_id", "advertiser_name", "ad_type", "event_id", "start_date", "end_date", "cost", "status")
+
 @advertisements_bp.post("/", strict_slashes=False)
 def create_advertisements():
     try:
@@ -24,14 +28,17 @@ def create_advertisements():
 
 @advertisements_bp.get("/", strict_slashes=False)
 def get_all_advertisements():
+    try:
+        page = parse_page_args(ADVERTISEMENT_COLUMNS, "ad_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM ADVERTISEMENTS")
-        advertisements = cursor.fetchall()
+        cursor = conn.cursor()
+        advertisements, next_cursor = fetch_page(cursor, "ADVERTISEMENTS", page)
         cursor.close()
         conn.close()
-        return jsonify(advertisements)
+        return page_response(advertisements, next_cursor)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -84,13 +91,16 @@ def delete_advertisement(advertisement_id):
 
 @advertisements_bp.get("/by_event/<int:event_id>", strict_slashes=False)
 def get_advertisements_by_event(event_id):
+    try:
+        page = parse_page_args(ADVERTISEMENT_COLUMNS, "ad_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM ADVERTISEMENTS WHERE event_id = %s", (event_id,))
-        advertisements = cursor.fetchall()
+        cursor = conn.cursor()
+        advertisements, next_cursor = fetch_page(cursor, "ADVERTISEMENTS", page, "event_id = %s", (event_id,))
         cursor.close()
         conn.close()
-        return jsonify(advertisements)
+        return page_response(advertisements, next_cursor)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
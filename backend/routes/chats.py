@@ -1,9 +1,14 @@
 from flask import Blueprint, request, jsonify
 from database import get_db_connection
-from services.ai_service import generate_ai_response
+from pagination import parse_page_args, fetch_page, page_response
+from streaming import export_response, sse_response
+from services.ai_service import generate_ai_response, stream_ai_response, response_cache_stats, llm_client
+from services.chat_history import chat_writer
 
 chats_bp = Blueprint('chats', __name__)
 
+CHAT_COLUMNS = ("chat_id", "user_id", "message", "response", "recommended_event_id", "timestamp")
+
 @chats_bp.post("/", strict_slashes=False)
 def create_chat():
     try:
@@ -17,29 +22,15 @@ def create_chat():
         # Generate AI response
         ai_response = generate_ai_response(message)
         
-        # Try to store chat in database (optional - don't fail if DB is down)
-        try:
-            conn = get_db_connection()
-            if conn:
-                cursor = conn.cursor()
-                try:
-                    # Only store if user_id is provided (optional)
-                    if user_id:
-                        cursor.execute (
-                            "INSERT INTO CHAT_HISTORY (user_id, message, response) VALUES (%s, %s, %s)",
-                            (user_id, message, ai_response.get("response"))
-                        )
-                    else:
-                        # Skip database insertion if no user_id
-                        print(f"Skipping database insert - no user_id provided")
-                    conn.commit()
-                except Exception as db_error:
-                    print(f"Database insert error: {db_error}")
-                finally:
-                    cursor.close()
-                    conn.close()
-        except Exception as db_conn_error:
-            print(f"Database connection error: {db_conn_error}")
+        # Log the exchange in the background; the user doesn't wait on the write
+        if user_id:
+            recommended = ai_response.get("recommended_events") or []
+            chat_writer.submit(
+                user_id,
+                message,
+                ai_response.get("response"),
+                recommended[0]["id"] if recommended else None
+            )
         
         # Always return AI response regardless of database status
         return jsonify({
@@ -55,21 +46,71 @@ def create_chat():
             "error": str(e)
         }), 500
 
+@chats_bp.post("/stream", strict_slashes=False)
+def stream_chat():
+    # Same as POST /api/chats, sent as Server-Sent Events: the recommended
+    # events first, then the reply text piece by piece
+    data = request.json or {}
+    message = data.get("message")
+    user_id = data.get("user_id")
+    
+    if not message:
+        return jsonify({"error": "Message is required"}), 400
+    
+    def events():
+        recommended = []
+        for event, payload in stream_ai_response(message):
+            if event == "events":
+                recommended = payload["recommended_events"]
+            yield event, payload
+            # Only complete replies are logged; a cut-off one ends with "error"
+            if event == "done" and user_id:
+                chat_writer.submit(
+                    user_id,
+                    message,
+                    payload["response"],
+                    recommended[0]["id"] if recommended else None
+                )
+    
+    return sse_response(events())
+
 @chats_bp.get("/", strict_slashes=False)
 def get_all_chats():
+    try:
+        page = parse_page_args(CHAT_COLUMNS, "chat_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
         if not conn:
             return jsonify({"error": "Database connection failed"}), 500
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM CHAT_HISTORY")
-        chats = cursor.fetchall()
+        cursor = conn.cursor()
+        chats, next_cursor = fetch_page(cursor, "CHAT_HISTORY", page)
         cursor.close()
         conn.close()
-        return jsonify(chats)
+        return page_response(chats, next_cursor)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
+@chats_bp.get("/cache/stats", strict_slashes=False)
+def chat_cache_stats():
+    return jsonify(response_cache_stats())
+
+@chats_bp.get("/llm/stats", strict_slashes=False)
+def chat_llm_stats():
+    if llm_client is None:
+        return jsonify({"backend": None})
+    return jsonify(llm_client.stats())
+
+@chats_bp.get("/writer/stats", strict_slashes=False)
+def chat_writer_stats():
+    return jsonify(chat_writer.stats())
+
+@chats_bp.get("/export", strict_slashes=False)
+def export_chats():
+    # Full dump for reporting tools, streamed as NDJSON or a chunked JSON array
+    return export_response("CHAT_HISTORY", CHAT_COLUMNS, "chat_id")
+
 @chats_bp.get("/<int:chat_id>", strict_slashes=False)
 def get_chat(chat_id):
     try:
@@ -123,28 +164,34 @@ def delete_chat(chat_id):
 
 @chats_bp.get("/recommended/<int:event_id>", strict_slashes=False)
 def get_chats_by_recommended_event(event_id):
+    try:
+        page = parse_page_args(CHAT_COLUMNS, "chat_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM CHAT_HISTORY WHERE recommended_event_id = %s", (event_id,))
-        chats = cursor.fetchall()
+        cursor = conn.cursor()
+        chats, next_cursor = fetch_page(cursor, "CHAT_HISTORY", page, "recommended_event_id = %s", (event_id,))
         cursor.close()
         conn.close()
-        return jsonify(chats)
+        return page_response(chats, next_cursor)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @chats_bp.get("/by_user/<int:user_id>", strict_slashes=False)
 def get_chats_by_user(user_id):
+    try:
+        page = parse_page_args(CHAT_COLUMNS, "chat_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM CHAT_HISTORY WHERE user_id = %s", (user_id,))
-        chats = cursor.fetchall()
+        cursor = conn.cursor()
+        chats, next_cursor = fetch_page(cursor, "CHAT_HISTORY", page, "user_id = %s", (user_id,))
         cursor.close()
         conn.close()
-        return jsonify(chats)
+        return page_response(chats, next_cursor)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
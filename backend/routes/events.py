@@ -1,8 +1,17 @@
 from flask import Blueprint, request, jsonify
 from database import get_db_connection
+from pagination import parse_page_args, fetch_page, page_response
+from services.event_service import get_cached, invalidate_events, cache_stats, EVENT_KEY
+from models import Event, event_repo, record_response, EVENT_COLUMNS
 
 events_bp = Blueprint('events', __name__)
 
+
+def _page_event_ids(result):
+    # fetch_page result: (records, next_cursor); event_id is always selected
+    return [event.event_id for event in result[0]]
+
+
 @events_bp.post("/", strict_slashes=False)
 def create_event():
     try:
@@ -17,6 +26,7 @@ def create_event():
         cursor.close()
         event_id = cursor.lastrowid
         conn.close()
+        invalidate_events(event_id)
         return jsonify({"message": "Event created successfully", "event_id": event_id}), 201
     
     except Exception as e:
@@ -26,31 +36,42 @@ def create_event():
 @events_bp.get("/", strict_slashes=False)
 def get_all_events():
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({"error": "Database connection failed"}), 500
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM EVENTS")
-        events = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify(events)
+        page = parse_page_args(EVENT_COLUMNS, "event_id", sortable=("event_date",))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        def load():
+            conn = get_db_connection()
+            if not conn:
+                raise ConnectionError("Database connection failed")
+            cursor = conn.cursor()
+            result = fetch_page(cursor, "EVENTS", page, record=Event)
+            cursor.close()
+            conn.close()
+            return result
+
+        events, next_cursor = get_cached(("list", tuple(sorted(request.args.items(multi=True)))), load, _page_event_ids)
+        return page_response(events, next_cursor)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
 @events_bp.get("/<int:event_id>", strict_slashes=False)
 def get_event(event_id):
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({"error": "Database connection failed"}), 500
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM EVENTS WHERE event_id = %s", (event_id,))
-        event = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        def load():
+            conn = get_db_connection()
+            if not conn:
+                raise ConnectionError("Database connection failed")
+            cursor = conn.cursor()
+            event = event_repo.get(cursor, event_id)
+            cursor.close()
+            conn.close()
+            return event
+
+        # Cached as an Event record (a tuple), not a dict per entry
+        event = get_cached((EVENT_KEY, event_id), load)
         if event:
-            return jsonify(event)
+            return record_response(event)
         else:
             return jsonify({"error": "Event not found"}), 404
     
@@ -72,6 +93,7 @@ def update_event(event_id):
         conn.commit()
         cursor.close()
         conn.close()
+        invalidate_events(event_id)
         return jsonify({"message": "Event updated successfully"})
     
     except Exception as e:
@@ -85,8 +107,11 @@ def delete_event(event_id):
             return jsonify({"error": "Database connection failed"}), 500
         cursor = conn.cursor()
         
-        # First, delete all tickets associated with this event
+        # First, delete all tickets, checkout holds and ticket counters associated with this event
         cursor.execute("DELETE FROM tickets WHERE event_id = %s", (event_id,))
+        cursor.execute("DELETE FROM TICKET_HOLDS WHERE event_id = %s", (event_id,))
+        cursor.execute("DELETE FROM EVENT_TICKET_STATS WHERE event_id = %s", (event_id,))
+        cursor.execute("DELETE FROM EVENT_CHECKIN_MINUTES WHERE event_id = %s", (event_id,))
         
         # Then delete the event
         cursor.execute("DELETE FROM EVENTS WHERE event_id = %s", (event_id,))
@@ -100,6 +125,7 @@ def delete_event(event_id):
         
         cursor.close()
         conn.close()
+        invalidate_events(event_id)
         return jsonify({"message": "Event deleted successfully", "event_id": event_id}), 200
     
     except Exception as e:
@@ -108,15 +134,26 @@ def delete_event(event_id):
 @events_bp.get("/by_org/<int:org_id>", strict_slashes=False)
 def get_events_by_org(org_id):
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({"error": "Database connection failed"}), 500
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM EVENTS WHERE org_id = %s", (org_id,))
-        events = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify(events)
+        page = parse_page_args(EVENT_COLUMNS, "event_id", sortable=("event_date",))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        def load():
+            conn = get_db_connection()
+            if not conn:
+                raise ConnectionError("Database connection failed")
+            cursor = conn.cursor()
+            result = fetch_page(cursor, "EVENTS", page, "org_id = %s", (org_id,), record=Event)
+            cursor.close()
+            conn.close()
+            return result
+
+        events, next_cursor = get_cached(("by_org", org_id, tuple(sorted(request.args.items(multi=True)))), load, _page_event_ids)
+        return page_response(events, next_cursor)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@events_bp.get("/cache/stats", strict_slashes=False)
+def get_event_cache_stats():
+    return jsonify(cache_stats())
@@ -1,22 +1,30 @@
 from flask import Blueprint, request, jsonify
-from database import get_db_connection
+from database import get_db_connection, release_db_connection
+from pagination import parse_page_args, fetch_page, page_response
 import jwt
 from datetime import datetime, timedelta
 import config
+from auth import bearer_token
+from services.auth_service import token_verifier, password_hasher, check_password_login, HasherBusy
+from services.dashboard_service import build_dashboard, get_snapshot, snapshot_stats
+from models import Organization, ORG_COLUMNS
 
 orgs_bp = Blueprint('organizations', __name__)
 
+
 @orgs_bp.post("/", strict_slashes=False)
 def create_org():
     try:
         data = request.json
+        # Hash before checking out a connection so the pool isn't held during bcrypt
+        password = password_hasher.hash(data["password"])
         conn = get_db_connection()
         if not conn:
             return jsonify({"error": "Database connection failed"}), 500
         cursor = conn.cursor()
         cursor.execute (
             "INSERT INTO ORGANIZATIONS (org_name, address, email, is_premium, password) VALUES (%s, %s, %s, %s, %s)",
-            (data["org_name"], data.get("address"), data["email"], data.get("is_premium", False), data["password"])
+            (data["org_name"], data.get("address"), data["email"], data.get("is_premium", False), password)
         )
         conn.commit()
         org_id = cursor.lastrowid
@@ -24,24 +32,42 @@ def create_org():
         conn.close()
 
         return jsonify({"message": "Organization created successfully", "org_id": org_id}), 201
+    except HasherBusy:
+        return jsonify({"error": "Too many sign-ins right now, please retry"}), 503, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @orgs_bp.get("/", strict_slashes=False)
 def get_all_orgs():
+    try:
+        page = parse_page_args(ORG_COLUMNS, "org_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
         if not conn:
             return jsonify({"error": "Database connection failed"}), 500
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM ORGANIZATIONS")
-        orgs = cursor.fetchall()
+        cursor = conn.cursor()
+        orgs, next_cursor = fetch_page(cursor, "ORGANIZATIONS", page, record=Organization)
         cursor.close()
         conn.close()
-        return jsonify(orgs)
+        return page_response(orgs, next_cursor)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
+@orgs_bp.post("/logout", strict_slashes=False)
+def logout_org():
+    # Revoke the presented token everywhere until it would have expired
+    token = bearer_token()
+    if not token:
+        return jsonify({"error": "Bearer token required"}), 401
+    try:
+        if token_verifier.revoke(token) is None:
+            return jsonify({"error": "Invalid or expired token"}), 401
+        return jsonify({"message": "Logged out"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @orgs_bp.post("/login", strict_slashes=False)
 def login_org():
     try:
@@ -62,8 +88,10 @@ def login_org():
         org = cursor.fetchone()
         cursor.close()
         conn.close()
+        # Give the connection back before the password check waits on the hashing pool
+        release_db_connection()
         
-        if org and org["password"] == password:
+        if org and check_password_login("ORGANIZATIONS", "org_id", org, password):
             # Remove password from response
             org_data = {k: v for k, v in org.items() if k != "password"}
             # Generate JWT token
@@ -76,6 +104,8 @@ def login_org():
         else:
             return jsonify({"error": "Invalid email or password"}), 401
     
+    except HasherBusy:
+        return jsonify({"error": "Too many sign-ins right now, please retry"}), 503, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -97,6 +127,39 @@ def update_org(org_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
+@orgs_bp.get("/<int:org_id>/dashboard", strict_slashes=False)
+def get_org_dashboard(org_id):
+    """
+    Everything the org dashboard shows, in one request
+
+    Replaces by_org + per-event tickets + per-event ads calls. With
+    ?snapshot=true the result may be up to DASHBOARD_SNAPSHOT_TTL seconds
+    old (see snapshot_age), which is what dashboards for orgs with hundreds
+    of events should ask for.
+    """
+    def load():
+        conn = get_db_connection()
+        if not conn:
+            raise ConnectionError("Database connection failed")
+        cursor = conn.cursor(dictionary=True)
+        try:
+            return build_dashboard(cursor, org_id)
+        finally:
+            cursor.close()
+            conn.close()
+
+    try:
+        if request.args.get("snapshot", "false").lower() in ("1", "true", "yes"):
+            dashboard, age = get_snapshot(org_id, load)
+            return jsonify({**dashboard, "snapshot": True, "snapshot_age": age})
+        return jsonify({**load(), "snapshot": False})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@orgs_bp.get("/dashboard/stats", strict_slashes=False)
+def dashboard_stats():
+    return jsonify(snapshot_stats())
+
 @orgs_bp.delete("/<int:org_id>", strict_slashes=False)
 def delete_org(org_id):
     try:
@@ -1,8 +1,17 @@
 from flask import Blueprint, request, jsonify
 from database import get_db_connection
+from pagination import parse_page_args, fetch_page, page_response
+from streaming import export_response
+from models import Payment, payment_repo, record_response, PAYMENT_COLUMNS
+from services.payment_service import (mark_dirty, query_rollups, check_consistency, rollup_status,
+                                      GRANULARITIES, DIMENSIONS)
+from datetime import datetime, timedelta
 
 payments_bp = Blueprint('payments', __name__)
 
+# Widest range one rollup query may cover, per granularity
+ROLLUP_MAX_RANGE = {"hour": timedelta(days=93), "day": timedelta(days=3660)}
+
 @payments_bp.post("/", strict_slashes=False)
 def create_payment():
     try:
@@ -24,28 +33,118 @@ def create_payment():
 
 @payments_bp.get("/", strict_slashes=False)
 def get_payments():
+    try:
+        page = parse_page_args(PAYMENT_COLUMNS, "payment_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM PAYMENTS")
-        payments = cursor.fetchall()
+        cursor = conn.cursor()
+        payments, next_cursor = fetch_page(cursor, "PAYMENTS", page, record=Payment)
         cursor.close()
         conn.close()
-        return jsonify(payments)
+        return page_response(payments, next_cursor)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
+@payments_bp.get("/export", strict_slashes=False)
+def export_payments():
+    # Full dump for reporting tools, streamed as NDJSON or a chunked JSON array
+    return export_response("PAYMENTS", PAYMENT_COLUMNS, "payment_id")
+
+@payments_bp.get("/rollups", strict_slashes=False)
+def get_revenue_rollups():
+    """
+    Revenue per hour or day from REVENUE_ROLLUPS, never from raw PAYMENTS
+
+    Query args: granularity (hour|day, default day), start and end (ISO
+    dates or datetimes, end exclusive) and group_by (comma-separated subset
+    of payment_method,status,is_vip; empty sums each bucket into one row).
+    """
+    granularity = request.args.get("granularity", "day")
+    if granularity not in GRANULARITIES:
+        return jsonify({"error": "granularity must be 'hour' or 'day'"}), 400
+    try:
+        start, end = _rollup_range()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if end - start > ROLLUP_MAX_RANGE[granularity]:
+        return jsonify({"error": f"Range too wide for {granularity} buckets (max {ROLLUP_MAX_RANGE[granularity].days} days)"}), 400
+    group_by = [d for d in request.args.get("group_by", ",".join(DIMENSIONS)).split(",") if d]
+    if any(d not in DIMENSIONS for d in group_by):
+        return jsonify({"error": f"group_by must be a subset of {', '.join(DIMENSIONS)}"}), 400
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+        buckets, totals = query_rollups(cursor, granularity, start, end, tuple(group_by))
+        cursor.close()
+        conn.close()
+        return jsonify({"granularity": granularity, "group_by": group_by, "buckets": buckets, "totals": totals})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@payments_bp.get("/rollups/status", strict_slashes=False)
+def get_rollup_status():
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+        status = rollup_status(cursor)
+        cursor.close()
+        conn.close()
+        return jsonify(status)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@payments_bp.post("/rollups/check", strict_slashes=False)
+def check_revenue_rollups():
+    # Compare rollups with raw PAYMENTS over a range of days; ?repair=true queues mismatches for recomputation
+    try:
+        start, end = _rollup_range()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    repair = request.args.get("repair", "false").lower() in ("1", "true", "yes")
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+        try:
+            result = check_consistency(cursor, start, end, repair=repair)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _rollup_range():
+    start = request.args.get("start")
+    end = request.args.get("end")
+    if not start or not end:
+        raise ValueError("start and end are required")
+    start, end = datetime.fromisoformat(start), datetime.fromisoformat(end)
+    if end <= start:
+        raise ValueError("end must be after start")
+    return start, end
+
 @payments_bp.get("/<int:payment_id>", strict_slashes=False)
 def get_payment(payment_id):
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM PAYMENTS WHERE payment_id = %s", (payment_id,))
-        payment = cursor.fetchone()
+        cursor = conn.cursor()
+        payment = payment_repo.get(cursor, payment_id)
         cursor.close()
         conn.close()
         if payment:
-            return jsonify(payment)
+            return record_response(payment)
         else:
             return jsonify({"error": "Payment not found"}), 404
     
@@ -58,6 +157,11 @@ def update_payment(payment_id):
         data = request.json
         conn = get_db_connection()
         cursor = conn.cursor()
+        cursor.execute("SELECT payment_date FROM PAYMENTS WHERE payment_id = %s FOR UPDATE", (payment_id,))
+        payment = cursor.fetchone()
+        if payment:
+            # The rollups already counted this payment under its old values
+            mark_dirty(cursor, payment[0])
         cursor.execute (
             "UPDATE PAYMENTS SET user_id = %s, amount = %s, platform_fee = %s, payment_method = %s WHERE payment_id = %s",
             (data["user_id"], data["amount"], data["platform_fee"], data["payment_method"], payment_id)
@@ -75,6 +179,10 @@ def delete_payment(payment_id):
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        cursor.execute("SELECT payment_date FROM PAYMENTS WHERE payment_id = %s FOR UPDATE", (payment_id,))
+        payment = cursor.fetchone()
+        if payment:
+            mark_dirty(cursor, payment[0])
         cursor.execute("DELETE FROM PAYMENTS WHERE payment_id = %s", (payment_id,))
         conn.commit()
         cursor.close()
@@ -86,14 +194,17 @@ def delete_payment(payment_id):
 
 @payments_bp.get("/by_user/<int:user_id>", strict_slashes=False)
 def get_payments_by_user(user_id):
+    try:
+        page = parse_page_args(PAYMENT_COLUMNS, "payment_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM PAYMENTS WHERE user_id = %s", (user_id,))
-        payments = cursor.fetchall()
+        cursor = conn.cursor()
+        payments, next_cursor = fetch_page(cursor, "PAYMENTS", page, "user_id = %s", (user_id,), record=Payment)
         cursor.close()
         conn.close()
-        return jsonify(payments)
+        return page_response(payments, next_cursor)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
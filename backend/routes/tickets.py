@@ -1,66 +1,518 @@
 from flask import Blueprint, request, jsonify
 from database import get_db_connection
-from datetime import datetime
+from pagination import parse_page_args, fetch_page, page_response
+from streaming import export_response
+from models import Ticket, ticket_repo, record_response, TICKET_COLUMNS
+from services.ticket_service import (reserve_seats, release_seats, lock_events, event_exists, create_hold,
+                                     convert_hold, release_hold, TICKET_HOLD_SECONDS)
+from services.event_service import invalidate_seats
+from services.checkin_service import door_hot_set, resolve_qr, check_in_ticket, ticket_state, sync_scans
+from services.attendance_service import ticket_changes, apply_changes, get_attendance, reconcile_event, ATTENDANCE_MINUTES
+from collections import Counter
+from mysql.connector import errorcode, IntegrityError
+from datetime import datetime, timedelta
+import os
 
 tickets_bp = Blueprint('tickets', __name__)
 
+
+INSERT_TICKET_SQL = "INSERT INTO tickets (event_id, user_id, ticket_status, qr_code, purchase_date, check_in_time, purchase_source) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+
+# Rows per executemany() statement in POST /bulk
+BULK_CHUNK_SIZE = int(os.getenv("BULK_TICKET_CHUNK_SIZE", "500"))
+# Largest array POST /bulk accepts in one request
+BULK_MAX_TICKETS = int(os.getenv("BULK_TICKET_MAX", "10000"))
+# Largest number of scans POST /check_in/sync accepts in one request
+SYNC_MAX_SCANS = int(os.getenv("CHECKIN_SYNC_MAX_SCANS", "20000"))
+
+def _to_mysql_datetime(value):
+    """Convert an ISO 8601 datetime string to MySQL DATETIME format (YYYY-MM-DD HH:MM:SS)"""
+    if not value:
+        return value
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
 @tickets_bp.post("/", strict_slashes=False)
 def create_ticket():
     data = request.json
 
     try:
-        # Convert ISO 8601 datetime to MySQL DATETIME format
-        purchase_date = data.get("purchase_date")
-        if purchase_date:
-            # Parse ISO format and convert to MySQL format (YYYY-MM-DD HH:MM:SS)
-            dt = datetime.fromisoformat(purchase_date.replace('Z', '+00:00'))
-            purchase_date = dt.strftime('%Y-%m-%d %H:%M:%S')
-        
-        check_in_time = data.get("check_in_time")
-        if check_in_time:
-            dt = datetime.fromisoformat(check_in_time.replace('Z', '+00:00'))
-            check_in_time = dt.strftime('%Y-%m-%d %H:%M:%S')
+        purchase_date = _to_mysql_datetime(data.get("purchase_date"))
+        check_in_time = _to_mysql_datetime(data.get("check_in_time"))
         
         conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
         cursor = conn.cursor()
-        cursor.execute (
-            "INSERT INTO tickets (event_id, user_id, ticket_status, qr_code, purchase_date, check_in_time, purchase_source) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-            (data["event_id"], data["user_id"], data.get("ticket_status", "active"), data["qr_code"], purchase_date, check_in_time, data.get("purchase_source", "direct"))
-        )
-        conn.commit()
+
+        # Claim capacity first: either convert the buyer's checkout hold or
+        # take a seat directly. Both are single-row conditional updates.
+        hold_id = data.get("hold_id")
+        if hold_id:
+            if not convert_hold(cursor, hold_id, data["event_id"], data["user_id"]):
+                conn.rollback()
+                cursor.close()
+                conn.close()
+                return jsonify({"error": "Hold not found or expired"}), 409
+        elif not reserve_seats(cursor, data["event_id"]):
+            found = event_exists(cursor, data["event_id"])
+            conn.rollback()
+            cursor.close()
+            conn.close()
+            if not found:
+                return jsonify({"error": "Event not found"}), 404
+            return jsonify({"error": "Event is sold out"}), 409
+
+        try:
+            cursor.execute (
+                INSERT_TICKET_SQL,
+                (data["event_id"], data["user_id"], data.get("ticket_status", "active"), data["qr_code"], purchase_date, check_in_time, data.get("purchase_source", "direct"))
+            )
+        except IntegrityError as e:
+            # Undo the seat claim along with the failed insert
+            conn.rollback()
+            cursor.close()
+            conn.close()
+            if e.errno == errorcode.ER_DUP_ENTRY:
+                return jsonify({"error": "User already has a ticket for this event"}), 409
+            return jsonify({"error": str(e)}), 400
+        # Read the new id now: the counter upsert below resets lastrowid to 0
         ticket_id = cursor.lastrowid
+        apply_changes(cursor, ticket_changes(None, {
+            "event_id": data["event_id"],
+            "ticket_status": data.get("ticket_status", "active"),
+            "purchase_source": data.get("purchase_source", "direct"),
+            "check_in_time": check_in_time
+        }))
+        conn.commit()
         cursor.close()
         conn.close()
+        invalidate_seats(data["event_id"])
+        # Scanners at an event whose doors are open should know the new ticket
+        door_hot_set.remember(data["qr_code"], ticket_id, data["event_id"], data.get("ticket_status", "active"), check_in_time)
         return jsonify({"message": "Ticket created successfully", "ticket_id": ticket_id}), 201
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@tickets_bp.post("/hold", strict_slashes=False)
+def hold_ticket():
+    """Reserve one seat for TICKET_HOLD_SECONDS while the buyer completes checkout"""
+    try:
+        data = request.json
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+        hold_id = create_hold(cursor, data["event_id"], data["user_id"])
+        if hold_id is None:
+            found = event_exists(cursor, data["event_id"])
+            conn.rollback()
+            cursor.close()
+            conn.close()
+            if not found:
+                return jsonify({"error": "Event not found"}), 404
+            return jsonify({"error": "Event is sold out"}), 409
+        conn.commit()
+        cursor.close()
+        conn.close()
+        invalidate_seats(data["event_id"])
+        return jsonify({"message": "Seat held", "hold_id": hold_id, "expires_in": TICKET_HOLD_SECONDS}), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@tickets_bp.delete("/hold/<int:hold_id>", strict_slashes=False)
+def cancel_hold(hold_id):
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+        event_id = release_hold(cursor, hold_id)
+        if event_id is None:
+            conn.rollback()
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "Hold not found or no longer active"}), 404
+        conn.commit()
+        cursor.close()
+        conn.close()
+        invalidate_seats(event_id)
+        return jsonify({"message": "Hold released"})
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@tickets_bp.post("/bulk", strict_slashes=False)
+def create_tickets_bulk():
+    """
+    Issue many tickets in one transaction
+
+    Body is a JSON array of ticket objects (or {"tickets": [...]}) with the
+    same fields as POST /. Valid rows are inserted with executemany() in
+    chunks of BULK_CHUNK_SIZE; rows that break UNIQUE(event_id, user_id),
+    exceed event capacity or fail validation are reported per item instead
+    of failing the batch.
+    """
+    data = request.json
+    items = data.get("tickets") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Expected a non-empty array of tickets"}), 400
+    if len(items) > BULK_MAX_TICKETS:
+        return jsonify({"error": f"At most {BULK_MAX_TICKETS} tickets per request"}), 400
+
+    # Validate and normalize in one pass before touching the database
+    rows = []
+    errors = []
+    seen = set()
+    for index, item in enumerate(items):
+        try:
+            key = (int(item["event_id"]), int(item["user_id"]))
+            row = (key[0], key[1], item.get("ticket_status", "active"), item["qr_code"],
+                   _to_mysql_datetime(item.get("purchase_date")), _to_mysql_datetime(item.get("check_in_time")),
+                   item.get("purchase_source", "direct"))
+        except KeyError as e:
+            errors.append({"index": index, "error": f"Missing field {e}"})
+            continue
+        except (TypeError, ValueError, AttributeError) as e:
+            errors.append({"index": index, "error": f"Invalid ticket: {e}"})
+            continue
+        if key in seen:
+            errors.append({"index": index, "error": "Duplicate event_id/user_id in request"})
+            continue
+        seen.add(key)
+        rows.append((index, key, row))
+
+    created = []
+    seat_events = set()
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+        for start in range(0, len(rows), BULK_CHUNK_SIZE):
+            chunk = rows[start:start + BULK_CHUNK_SIZE]
+            pairs = " OR ".join(["(event_id = %s AND user_id = %s)"] * len(chunk))
+            pair_params = [v for _, key, _ in chunk for v in key]
+
+            # Weed out rows that would hit the unique key so the batch insert can't fail on them
+            cursor.execute(f"SELECT event_id, user_id FROM tickets WHERE {pairs}", pair_params)
+            existing = set(cursor.fetchall())
+            pending = []
+            for index, key, row in chunk:
+                if key in existing:
+                    errors.append({"index": index, "error": "User already has a ticket for this event"})
+                else:
+                    pending.append((index, key, row))
+            # Claim capacity per event, in ascending id order so concurrent bulk loads can't deadlock
+            by_event = {}
+            for item in pending:
+                by_event.setdefault(item[1][0], []).append(item)
+            pending = []
+            for event_id in sorted(by_event):
+                if reserve_seats(cursor, event_id, len(by_event[event_id])):
+                    pending.extend(by_event[event_id])
+                    seat_events.add(event_id)
+                else:
+                    errors.extend({"index": index, "error": "Not enough capacity left for this event"}
+                                  for index, _, _ in by_event[event_id])
+            if not pending:
+                continue
+
+            cursor.execute("SAVEPOINT bulk_chunk")
+            try:
+                cursor.executemany(INSERT_TICKET_SQL, [row for _, _, row in pending])
+                inserted = pending
+            except IntegrityError:
+                # A concurrent purchase or bad foreign key; isolate the offending rows
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_chunk")
+                inserted = []
+                for index, key, row in pending:
+                    cursor.execute("SAVEPOINT bulk_row")
+                    try:
+                        cursor.execute(INSERT_TICKET_SQL, row)
+                        inserted.append((index, key, row))
+                    except IntegrityError as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT bulk_row")
+                        if e.errno == errorcode.ER_DUP_ENTRY:
+                            errors.append({"index": index, "error": "User already has a ticket for this event"})
+                        else:
+                            errors.append({"index": index, "error": str(e)})
+                # Return the seats claimed for rows that didn't make it in
+                shortfall = {}
+                for _, key, _ in pending:
+                    shortfall[key[0]] = shortfall.get(key[0], 0) + 1
+                for _, key, _ in inserted:
+                    shortfall[key[0]] -= 1
+                for event_id in sorted(shortfall):
+                    if shortfall[event_id]:
+                        release_seats(cursor, event_id, shortfall[event_id])
+            if not inserted:
+                continue
+            changes = Counter()
+            for _, _, row in inserted:
+                changes.update(ticket_changes(None, {
+                    "event_id": row[0], "ticket_status": row[2], "check_in_time": row[5], "purchase_source": row[6]
+                }))
+            apply_changes(cursor, changes)
+
+            # Multi-row inserts don't report every auto-increment id; read them back by unique key
+            pairs = " OR ".join(["(event_id = %s AND user_id = %s)"] * len(inserted))
+            cursor.execute(f"SELECT ticket_id, event_id, user_id FROM tickets WHERE {pairs}",
+                           [v for _, key, _ in inserted for v in key])
+            ids = {(event_id, user_id): ticket_id for ticket_id, event_id, user_id in cursor.fetchall()}
+            created.extend({"index": index, "ticket_id": ids[key]} for index, key, _ in inserted)
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+        for event_id in sorted(seat_events):
+            invalidate_seats(event_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    created.sort(key=lambda item: item["index"])
+    errors.sort(key=lambda item: item["index"])
+    return jsonify({
+        "message": f"Created {len(created)} of {len(items)} tickets",
+        "created": created,
+        "errors": errors
+    }), 201 if created else 400
+
+@tickets_bp.post("/check_in", strict_slashes=False)
+def check_in():
+    # Door scan: resolve the QR code and admit the ticket at most once
+    data = request.json or {}
+    qr_code = data.get("qr_code")
+    event_id = data.get("event_id")
+    if not qr_code:
+        return jsonify({"error": "qr_code is required"}), 400
+    try:
+        event_id = int(event_id) if event_id is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "event_id must be an integer"}), 400
+
+    # Repeats of a ticket this worker admitted are answered without a query;
+    # any other preloaded entry only saves the lookup and still goes through the UPDATE
+    ticket = door_hot_set.get(qr_code)
+    if ticket and ticket["admitted_here"]:
+        rejection = _check_in_rejection(ticket, event_id)
+        if rejection:
+            return rejection
+
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+        if ticket is None:
+            ticket = resolve_qr(cursor, qr_code, event_id)
+            if ticket is None and event_id is not None:
+                # Not at this event; a ticket for another one gets the same 409 as a preloaded one
+                ticket = resolve_qr(cursor, qr_code)
+            if ticket is None:
+                cursor.close()
+                conn.close()
+                return jsonify({"error": "Ticket not found"}), 404
+            door_hot_set.remember(qr_code, ticket["ticket_id"], ticket["event_id"], ticket["status"], ticket["check_in_time"])
+            rejection = _check_in_rejection(ticket, event_id)
+            if rejection:
+                cursor.close()
+                conn.close()
+                return rejection
+
+        if check_in_ticket(cursor, ticket["ticket_id"], event_id):
+            checked_in_at = datetime.now()
+            apply_changes(cursor, ticket_changes(
+                {"event_id": ticket["event_id"], "check_in_time": None},
+                {"event_id": ticket["event_id"], "check_in_time": checked_in_at}
+            ))
+            conn.commit()
+            cursor.close()
+            conn.close()
+            door_hot_set.mark_checked_in(qr_code, checked_in_at)
+            return jsonify({
+                "message": "Checked in",
+                "ticket_id": ticket["ticket_id"],
+                "event_id": ticket["event_id"],
+                "check_in_time": checked_in_at.strftime('%Y-%m-%d %H:%M:%S')
+            }), 200
+
+        # Lost a race with another scanner, or the ticket changed since it was cached
+        state = ticket_state(cursor, ticket["ticket_id"])
+        conn.rollback()
+        cursor.close()
+        conn.close()
+        if state is None:
+            door_hot_set.discard_ticket(ticket["ticket_id"])
+            return jsonify({"error": "Ticket not found"}), 404
+        ticket["event_id"], ticket["status"], ticket["check_in_time"] = state
+        door_hot_set.remember(qr_code, ticket["ticket_id"], ticket["event_id"], ticket["status"], ticket["check_in_time"])
+        return _check_in_rejection(ticket, event_id) or (jsonify({"error": "Check-in failed"}), 409)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _check_in_rejection(ticket, event_id):
+    if event_id is not None and ticket["event_id"] != event_id:
+        return jsonify({"error": "Ticket is for a different event", "ticket_id": ticket["ticket_id"], "event_id": ticket["event_id"]}), 409
+    if ticket["check_in_time"]:
+        door_hot_set.count_duplicate()
+        check_in_time = ticket["check_in_time"]
+        if hasattr(check_in_time, "strftime"):
+            check_in_time = check_in_time.strftime('%Y-%m-%d %H:%M:%S')
+        return jsonify({"error": "Ticket already checked in", "duplicate": True, "ticket_id": ticket["ticket_id"], "check_in_time": check_in_time}), 409
+    if ticket["status"] != "active":
+        return jsonify({"error": f"Ticket is {ticket['status']}", "ticket_id": ticket["ticket_id"]}), 409
+    return None
+
+@tickets_bp.post("/check_in/preload", strict_slashes=False)
+def preload_check_in():
+    # Load an event's tickets into this worker's door hot set now, ahead of the schedule
+    data = request.json or {}
+    event_id = data.get("event_id")
+    if not event_id:
+        return jsonify({"error": "event_id is required"}), 400
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+        count = door_hot_set.load_event(cursor, event_id)
+        conn.rollback()
+        cursor.close()
+        conn.close()
+        return jsonify({"event_id": event_id, "tickets": count})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@tickets_bp.post("/check_in/sync", strict_slashes=False)
+def sync_check_ins():
+    """
+    Upload scans recorded by door scanners while they were offline
+
+    Body is {"device_id": ..., "scans": [...]} or {"batches": [{"device_id": ..., "scans": [...]}, ...]};
+    each scan has qr_code (or ticket_id), event_id and scanned_at. All
+    batches are applied in one transaction: a ticket scanned several times
+    is checked in at its earliest scan, and scans that can't be applied
+    come back as conflicts. Uploading the same batch again is safe.
+    """
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    batches = data.get("batches")
+    if batches is None:
+        batches = [data]
+    if not isinstance(batches, list) or not batches:
+        return jsonify({"error": "Expected a non-empty array of batches"}), 400
+
+    scans = []
+    errors = []
+    latest = datetime.now() + timedelta(minutes=5)
+    for batch in batches:
+        device_id = batch.get("device_id") if isinstance(batch, dict) else None
+        items = batch.get("scans") if isinstance(batch, dict) else None
+        if not isinstance(items, list):
+            return jsonify({"error": "Each batch needs a scans array"}), 400
+        for index, item in enumerate(items):
+            try:
+                scanned_at = datetime.strptime(_to_mysql_datetime(item["scanned_at"]), '%Y-%m-%d %H:%M:%S')
+                scan = {
+                    "index": index,
+                    "device_id": device_id,
+                    "qr_code": item.get("qr_code"),
+                    "ticket_id": int(item["ticket_id"]) if item.get("ticket_id") is not None else None,
+                    "event_id": int(item["event_id"]) if item.get("event_id") is not None else None,
+                    "scanned_at": scanned_at
+                }
+            except KeyError as e:
+                errors.append({"index": index, "device_id": device_id, "error": f"Missing field {e}"})
+                continue
+            except (TypeError, ValueError, AttributeError) as e:
+                errors.append({"index": index, "device_id": device_id, "error": f"Invalid scan: {e}"})
+                continue
+            if not scan["qr_code"] and scan["ticket_id"] is None:
+                errors.append({"index": index, "device_id": device_id, "error": "qr_code or ticket_id is required"})
+            elif scanned_at > latest:
+                errors.append({"index": index, "device_id": device_id, "error": "scanned_at is in the future"})
+            else:
+                scans.append(scan)
+    if len(scans) + len(errors) > SYNC_MAX_SCANS:
+        return jsonify({"error": f"At most {SYNC_MAX_SCANS} scans per request"}), 400
+
+    results = []
+    conflicts = []
+    if scans:
+        try:
+            conn = get_db_connection()
+            if not conn:
+                return jsonify({"error": "Database connection failed"}), 500
+            cursor = conn.cursor()
+            try:
+                results, conflicts = sync_scans(cursor, scans)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+                conn.close()
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+        for scan in scans:
+            ticket = scan.get("ticket")
+            if ticket is not None and ticket["qr_code"]:
+                door_hot_set.remember(ticket["qr_code"], ticket["ticket_id"], ticket["event_id"], ticket["status"], ticket["check_in_time"])
+
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return jsonify({
+        "received": len(scans) + len(errors),
+        "counts": counts,
+        "results": results,
+        "conflicts": conflicts,
+        "errors": errors
+    }), 200
+
+@tickets_bp.get("/check_in/stats", strict_slashes=False)
+def check_in_stats():
+    return jsonify(door_hot_set.stats())
+
 @tickets_bp.get("/", strict_slashes=False)
 def get_tickets():
+    try:
+        page = parse_page_args(TICKET_COLUMNS, "ticket_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT ticket_id, event_id, user_id, ticket_status, qr_code, purchase_date, check_in_time, purchase_source FROM tickets")
-        tickets = cursor.fetchall()
+        cursor = conn.cursor()
+        tickets, next_cursor = fetch_page(cursor, "tickets", page, record=Ticket)
         cursor.close()
         conn.close()
-        return jsonify(tickets)
+        return page_response(tickets, next_cursor)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
+@tickets_bp.get("/export", strict_slashes=False)
+def export_tickets():
+    # Full dump for reporting tools, streamed as NDJSON or a chunked JSON array
+    return export_response("tickets", TICKET_COLUMNS, "ticket_id")
+
 @tickets_bp.get("/<int:ticket_id>", strict_slashes=False)
 def get_ticket(ticket_id):
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM tickets WHERE ticket_id = %s", (ticket_id,))
-        ticket = cursor.fetchone()
+        cursor = conn.cursor()
+        ticket = ticket_repo.get(cursor, ticket_id)
         cursor.close()
         conn.close()
         if ticket:
-            return jsonify(ticket)
+            return record_response(ticket)
         else:
             return jsonify({"error": "Ticket not found"}), 404
     
@@ -72,26 +524,56 @@ def update_ticket(ticket_id):
     try:
         data = request.json
         
-        # Convert ISO 8601 datetime to MySQL DATETIME format
-        purchase_date = data.get("purchase_date")
-        if purchase_date:
-            dt = datetime.fromisoformat(purchase_date.replace('Z', '+00:00'))
-            purchase_date = dt.strftime('%Y-%m-%d %H:%M:%S')
-        
-        check_in_time = data.get("check_in_time")
-        if check_in_time:
-            dt = datetime.fromisoformat(check_in_time.replace('Z', '+00:00'))
-            check_in_time = dt.strftime('%Y-%m-%d %H:%M:%S')
+        purchase_date = _to_mysql_datetime(data.get("purchase_date"))
+        check_in_time = _to_mysql_datetime(data.get("check_in_time"))
         
         conn = get_db_connection()
         cursor = conn.cursor()
+        new_event_id = int(data["event_id"])
+        cursor.execute("SELECT event_id FROM tickets WHERE ticket_id = %s", (ticket_id,))
+        current = cursor.fetchone()
+        if current and current[0] != new_event_id:
+            # Moving to another event: lock both EVENTS rows before the ticket row
+            lock_events(cursor, (current[0], new_event_id))
+        cursor.execute(
+            "SELECT event_id, ticket_status, purchase_source, check_in_time FROM tickets WHERE ticket_id = %s FOR UPDATE",
+            (ticket_id,)
+        )
+        before = cursor.fetchone()
+        if before and before[0] != new_event_id:
+            if current is None or before[0] != current[0]:
+                # Moved by someone else between the two reads, so the wrong event is locked
+                conn.rollback()
+                cursor.close()
+                conn.close()
+                return jsonify({"error": "Ticket was changed by another request, try again"}), 409
+            # The seat moves with the ticket: claim one on the new event, give the old one back
+            if not reserve_seats(cursor, new_event_id):
+                found = event_exists(cursor, new_event_id)
+                conn.rollback()
+                cursor.close()
+                conn.close()
+                if not found:
+                    return jsonify({"error": "Event not found"}), 404
+                return jsonify({"error": "Event is sold out"}), 409
+            release_seats(cursor, before[0])
         cursor.execute (
             "UPDATE tickets SET event_id = %s, user_id = %s, ticket_status = %s, qr_code = %s, purchase_date = %s, check_in_time = %s, purchase_source = %s WHERE ticket_id = %s",
             (data["event_id"], data["user_id"], data["ticket_status"], data["qr_code"], purchase_date, check_in_time, data["purchase_source"], ticket_id)
         )
+        if before:
+            apply_changes(cursor, ticket_changes(
+                dict(zip(("event_id", "ticket_status", "purchase_source", "check_in_time"), before)),
+                {"event_id": data["event_id"], "ticket_status": data["ticket_status"],
+                 "purchase_source": data["purchase_source"], "check_in_time": check_in_time}
+            ))
         conn.commit()
         cursor.close()
         conn.close()
+        if before and before[0] != new_event_id:
+            invalidate_seats(before[0])
+            invalidate_seats(new_event_id)
+        door_hot_set.discard_ticket(ticket_id)
         return jsonify({"message": "Ticket updated successfully"})
     
     except Exception as e:
@@ -102,10 +584,23 @@ def delete_ticket(ticket_id):
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM tickets WHERE ticket_id = %s", (ticket_id,))
-        conn.commit()
+        cursor.execute("SELECT event_id, ticket_status, purchase_source, check_in_time FROM tickets WHERE ticket_id = %s", (ticket_id,))
+        ticket = cursor.fetchone()
+        if ticket:
+            # Give the seat back, locking the event row before the ticket row
+            release_seats(cursor, ticket[0])
+            cursor.execute("DELETE FROM tickets WHERE ticket_id = %s", (ticket_id,))
+            if cursor.rowcount == 0:
+                conn.rollback()
+            else:
+                apply_changes(cursor, ticket_changes(
+                    dict(zip(("event_id", "ticket_status", "purchase_source", "check_in_time"), ticket)), None
+                ))
+                conn.commit()
+                invalidate_seats(ticket[0])
         cursor.close()
         conn.close()
+        door_hot_set.discard_ticket(ticket_id)
         return jsonify({"message": "Ticket deleted successfully"})
     
     except Exception as e:
@@ -113,28 +608,73 @@ def delete_ticket(ticket_id):
     
 @tickets_bp.get("/event/<int:event_id>", strict_slashes=False)
 def get_tickets_by_event(event_id):
+    try:
+        page = parse_page_args(TICKET_COLUMNS, "ticket_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM tickets WHERE event_id = %s", (event_id,))
-        tickets = cursor.fetchall()
+        cursor = conn.cursor()
+        tickets, next_cursor = fetch_page(cursor, "tickets", page, "event_id = %s", (event_id,), record=Ticket)
         cursor.close()
         conn.close()
-        return jsonify(tickets)
+        return page_response(tickets, next_cursor)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
+@tickets_bp.get("/event/<int:event_id>/attendance", strict_slashes=False)
+def get_event_attendance(event_id):
+    # Counters maintained by the ticket writes; ?minutes= sets how many per-minute buckets come back
+    minutes = request.args.get("minutes", ATTENDANCE_MINUTES, type=int)
+    if minutes < 0 or minutes > 1440:
+        return jsonify({"error": "minutes must be between 0 and 1440"}), 400
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+        attendance = get_attendance(cursor, event_id, minutes)
+        cursor.close()
+        conn.close()
+        return jsonify(attendance)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@tickets_bp.post("/event/<int:event_id>/attendance/reconcile", strict_slashes=False)
+def reconcile_event_attendance(event_id):
+    # Recount an event's counters from its tickets now instead of waiting for the background job
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor()
+        try:
+            corrected = reconcile_event(cursor, event_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        return jsonify({"event_id": event_id, "corrected": corrected})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @tickets_bp.get("/by_user/<int:user_id>", strict_slashes=False)
 def get_tickets_by_user(user_id):
+    try:
+        page = parse_page_args(TICKET_COLUMNS, "ticket_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM tickets WHERE user_id = %s", (user_id,))
-        tickets = cursor.fetchall()
+        cursor = conn.cursor()
+        tickets, next_cursor = fetch_page(cursor, "tickets", page, "user_id = %s", (user_id,), record=Ticket)
         cursor.close()
         conn.close()
-        return jsonify(tickets)
+        return page_response(tickets, next_cursor)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
-from database import get_db_connection
+from database import get_db_connection, release_db_connection
+from pagination import parse_page_args, fetch_page, page_response
 import jwt
 from datetime import datetime, timedelta
 import config
+from auth import bearer_token
+from services.auth_service import token_verifier, password_hasher, check_password_login, HasherBusy
+from models import User, user_repo, record_response, USER_COLUMNS
 
 users_bp = Blueprint('users', __name__)
 
@@ -10,13 +14,15 @@ users_bp = Blueprint('users', __name__)
 def create_user():
     try:
         data = request.json
+        # Hash before checking out a connection so the pool isn't held during bcrypt
+        password = password_hasher.hash(data["password"])
         conn = get_db_connection()
         if not conn:
             return jsonify({"error": "Database connection failed"}), 500
         cursor = conn.cursor()
         cursor.execute (
             "INSERT INTO USERS (user_name, email, password, is_vip) VALUES (%s, %s, %s, %s)",
-            (data["user_name"], data["email"], data["password"], data.get("is_vip", False))
+            (data["user_name"], data["email"], password, data.get("is_vip", False))
         )
         conn.commit()
         user_id = cursor.lastrowid
@@ -31,22 +37,27 @@ def create_user():
         }, config.SECRET_KEY, algorithm='HS256')
 
         return jsonify({"message": "User created successfully", "user_id": user_id, "token": token}), 201
+    except HasherBusy:
+        return jsonify({"error": "Too many sign-ins right now, please retry"}), 503, {"Retry-After": "1"}
     except Exception as e:
         print(f"Error creating user: {e}")  # Add logging
         return jsonify({"error": str(e)}), 500
 
 @users_bp.get("/", strict_slashes=False)
 def get_users():
+    try:
+        page = parse_page_args(USER_COLUMNS, "user_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         conn = get_db_connection()
         if not conn:
             return jsonify({"error": "Database connection failed"}), 500
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM USERS")
-        users = cursor.fetchall()
+        cursor = conn.cursor()
+        users, next_cursor = fetch_page(cursor, "USERS", page, record=User)
         cursor.close()
         conn.close()
-        return jsonify(users)
+        return page_response(users, next_cursor)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -55,13 +66,12 @@ def get_users():
 def get_user(user_id):
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM USERS WHERE user_id = %s", (user_id,))
-        user = cursor.fetchone()
+        cursor = conn.cursor()
+        user = user_repo.get(cursor, user_id)
         cursor.close()
         conn.close()
         if user:
-            return jsonify(user)
+            return record_response(user)
         else:
             return jsonify({"error": "User not found"}), 404
     
@@ -73,13 +83,12 @@ def get_user_by_email():
     email = request.args.get("email")
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM USERS WHERE email = %s", (email,))
-        user = cursor.fetchone()
+        cursor = conn.cursor()
+        user = user_repo.find_one(cursor, "email", email)
         cursor.close()
         conn.close()
         if user:
-            return jsonify(user)
+            return record_response(user)
         else:
             return jsonify({"error": "User not found"}), 404
     
@@ -90,20 +99,40 @@ def get_user_by_email():
 def update_user(user_id):
     try:
         data = request.json
+        password = password_hasher.hash(data["password"])
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute (
             "UPDATE USERS SET user_name = %s, email = %s, password = %s, is_vip = %s WHERE user_id = %s",
-            (data["user_name"], data["email"], data["password"], data.get("is_vip", False), user_id)
+            (data["user_name"], data["email"], password, data.get("is_vip", False), user_id)
         )
         conn.commit()
         cursor.close()
         conn.close()
         return jsonify({"message": "User updated successfully"})
     
+    except HasherBusy:
+        return jsonify({"error": "Too many sign-ins right now, please retry"}), 503, {"Retry-After": "1"}
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@users_bp.post("/logout", strict_slashes=False)
+def logout_user():
+    # Revoke the presented token everywhere until it would have expired
+    token = bearer_token()
+    if not token:
+        return jsonify({"error": "Bearer token required"}), 401
+    try:
+        if token_verifier.revoke(token) is None:
+            return jsonify({"error": "Invalid or expired token"}), 401
+        return jsonify({"message": "Logged out"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@users_bp.get("/auth/stats", strict_slashes=False)
+def auth_stats():
+    return jsonify({"tokens": token_verifier.stats(), "passwords": password_hasher.stats()})
+
 @users_bp.post("/login", strict_slashes=False)
 def login_user():
     try:
@@ -124,8 +153,10 @@ def login_user():
         user = cursor.fetchone()
         cursor.close()
         conn.close()
+        # Give the connection back before the password check waits on the hashing pool
+        release_db_connection()
         
-        if user and user["password"] == password:
+        if user and check_password_login("USERS", "user_id", user, password):
             # Remove password from response
             user_data = {k: v for k, v in user.items() if k != "password"}
             # Generate JWT token
@@ -140,6 +171,8 @@ def login_user():
             print(f"Login failed for {email}: invalid credentials")
             return jsonify({"error": "Invalid email or password"}), 401
     
+    except HasherBusy:
+        return jsonify({"error": "Too many sign-ins right now, please retry"}), 503, {"Retry-After": "1"}
     except Exception as e:
         print(f"Error logging in: {e}")
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -1,6 +1,14 @@
 import os
+import re
+import threading
+import time
 from dotenv import load_dotenv
 from database import get_db_connection
+from cache import TTLCache
+from services.event_service import get_cached, sync_invalidations, add_invalidation_listener
+from services.search_index import event_index
+from services.intent_parser import parse_intent
+from services.llm_client import build_client
 from datetime import datetime, timedelta
 
 # Load environment variables
@@ -18,61 +26,116 @@ except ImportError:
     print("WARNING: google-generativeai not installed. Install with: pip install google-generativeai")
     HAS_GEMINI = False
 
-def search_events_in_database(keywords=None, max_price=None, event_type=None):
+# Finished chat replies keyed by normalized search parameters, not raw text
+AI_RESPONSE_CACHE_SIZE = int(os.getenv("AI_RESPONSE_CACHE_SIZE", "512"))
+AI_RESPONSE_CACHE_TTL = int(os.getenv("AI_RESPONSE_CACHE_TTL", "60"))
+# Shorter life for "nothing found" replies, which may just mean the DB hiccuped
+AI_RESPONSE_EMPTY_TTL = int(os.getenv("AI_RESPONSE_EMPTY_TTL", "5"))
+
+response_cache = TTLCache(maxsize=AI_RESPONSE_CACHE_SIZE, ttl=AI_RESPONSE_CACHE_TTL, name="ai_responses")
+# Any EVENTS write can change any answer, so drop them all
+add_invalidation_listener(lambda event_id: response_cache.clear())
+
+# Bounded LLM client for reply text; None keeps the templated replies
+llm_client = build_client()
+
+# Words per "delta" when streaming a reply that is already complete
+STREAM_WORDS_PER_CHUNK = int(os.getenv("STREAM_WORDS_PER_CHUNK", "6"))
+
+_saved_lock = threading.Lock()
+_saved = {"seconds": 0.0, "miss_seconds": 0.0, "misses": 0}
+
+# "index" answers chat searches from the in-memory inverted index; "sql" uses LIKE queries
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "index")
+
+def _index_ready():
+    """Bring the search index up to date; False if it has never been built"""
+    sync_invalidations()
+    try:
+        event_index.refresh()
+    except Exception as e:
+        print(f"Search index refresh failed, serving last snapshot: {e}")
+    return event_index.ready
+
+def search_events_in_database(keywords=None, max_price=None, event_type=None, min_price=None, date_from=None, date_to=None):
     """
     Search for events in the database based on criteria
     
     Args:
-        keywords: List of keywords to search in event names
+        keywords: List of keywords to search in event names (the index backend
+                  also matches description, location and category)
         max_price: Maximum ticket price
         event_type: Type of event (music, tech, sports, food, etc.)
+        min_price: Minimum ticket price
+        date_from: Earliest event date (inclusive)
+        date_to: Latest event date (exclusive)
     
     Returns:
         List of matching events
     """
     try:
-        conn = get_db_connection()
-        if not conn:
-            return []
+        if SEARCH_BACKEND == "index" and _index_ready():
+            return event_index.search(keywords=keywords, max_price=max_price, event_type=event_type, limit=10,
+                                      min_price=min_price, date_from=date_from, date_to=date_to)
         
-        cursor = conn.cursor(dictionary=True)
-        
-        # Build query
-        query = "SELECT * FROM EVENTS WHERE event_status = 'upcoming'"
-        params = []
-        
-        # Filter by price
-        if max_price is not None:
-            query += " AND ticket_price <= %s"
-            params.append(max_price)
-        
-        # Filter by event category (primary filter)
-        if event_type:
-            query += " AND event_category = %s"
-            params.append(event_type)
-        
-        # Filter by keywords in event name (secondary filter)
-        if keywords:
-            keyword_conditions = []
-            for keyword in keywords:
-                keyword_conditions.append(f"event_name LIKE %s")
-                params.append(f"%{keyword}%")
-            if keyword_conditions:
-                query += " AND (" + " OR ".join(keyword_conditions) + ")"
-        
-        query += " ORDER BY event_date ASC LIMIT 10"
-        
-        cursor.execute(query, params)
-        events = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        return events if events else []
+        key = ("search", tuple(keywords or ()), max_price, event_type, min_price, date_from, date_to)
+        return get_cached(key, lambda: _query_events(keywords, max_price, event_type, min_price, date_from, date_to),
+                          _row_event_ids)
     
     except Exception as e:
         print(f"Error searching events: {e}")
         return []
 
+def _query_events(keywords, max_price, event_type, min_price=None, date_from=None, date_to=None):
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError("Database connection failed")
+    
+    cursor = conn.cursor(dictionary=True)
+    
+    # Build query
+    query = "SELECT * FROM EVENTS WHERE event_status = 'upcoming'"
+    params = []
+    
+    # Filter by price
+    if max_price is not None:
+        query += " AND ticket_price <= %s"
+        params.append(max_price)
+    if min_price is not None:
+        query += " AND ticket_price >= %s"
+        params.append(min_price)
+    
+    # Filter by date window
+    if date_from is not None:
+        query += " AND event_date >= %s"
+        params.append(date_from)
+    if date_to is not None:
+        query += " AND event_date < %s"
+        params.append(date_to)
+    
+    # Filter by event category (primary filter)
+    if event_type:
+        query += " AND event_category = %s"
+        params.append(event_type)
+    
+    # Filter by keywords in event name (secondary filter)
+    if keywords:
+        keyword_conditions = []
+        for keyword in keywords:
+            keyword_conditions.append(f"event_name LIKE %s")
+            params.append(f"%{keyword}%")
+        if keyword_conditions:
+            query += " AND (" + " OR ".join(keyword_conditions) + ")"
+    
+    query += " ORDER BY event_date ASC LIMIT 10"
+    
+    cursor.execute(query, params)
+    events = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    
+    return events if events else []
+
 def get_all_upcoming_events(limit=5):
     """
     Get all upcoming events from the database
@@ -84,25 +147,35 @@ def get_all_upcoming_events(limit=5):
         List of upcoming events
     """
     try:
-        conn = get_db_connection()
-        if not conn:
-            return []
+        if SEARCH_BACKEND == "index" and _index_ready():
+            return event_index.search(limit=limit)
         
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            "SELECT * FROM EVENTS WHERE event_status = 'upcoming' ORDER BY event_date ASC LIMIT %s",
-            (limit,)
-        )
-        events = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        return events if events else []
+        return get_cached(("upcoming", limit), lambda: _query_upcoming_events(limit), _row_event_ids)
     
     except Exception as e:
         print(f"Error fetching events: {e}")
         return []
 
+def _query_upcoming_events(limit):
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError("Database connection failed")
+    
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        "SELECT * FROM EVENTS WHERE event_status = 'upcoming' ORDER BY event_date ASC LIMIT %s",
+        (limit,)
+    )
+    events = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    
+    return events if events else []
+
+def _row_event_ids(events):
+    # Tags cached event lists so a seat change only drops the lists showing that event
+    return [event['event_id'] for event in events]
+
 def format_event_for_response(event):
     """Format event data for user-friendly display"""
     if isinstance(event['event_date'], str):
@@ -127,54 +200,90 @@ def analyze_user_request(message):
     Analyze user request to determine search criteria
     
     Returns:
-        dict with search parameters
+        dict with search parameters (see intent_parser.parse_intent)
     """
-    message_lower = message.lower()
-    
-    search_params = {
-        'keywords': [],
-        'max_price': None,
-        'event_type': None
-    }
-    
-    # Detect price constraints FIRST (before event types)
-    # This prevents words like "show" from interfering with price detection
-    if any(word in message_lower for word in ['free', 'no cost', 'zero price']):
-        search_params['max_price'] = 0
-    elif any(word in message_lower for word in ['cheap', 'affordable', 'budget', 'under $20', 'under 20']):
-        search_params['max_price'] = 20
-    elif any(word in message_lower for word in ['under $50', 'under 50']):
-        search_params['max_price'] = 50
-    
-    # Detect event types
-    event_types = {
-        'music': ['music', 'concert', 'festival', 'band', 'dj', 'song'],
-        'tech': ['tech', 'technology', 'coding', 'developer', 'startup', 'ai', 'programming', 'conference'],
-        'sports': ['sport', 'game', 'match', 'football', 'basketball', 'soccer', 'baseball', 'tournament'],
-        'food': ['food', 'cooking', 'dinner', 'restaurant', 'cooking', 'cuisine', 'taste', 'culinary', 'chef'],
-        'art': ['art', 'painting', 'gallery', 'exhibition', 'artist', 'craft'],
-        'culture': ['cultural', 'culture', 'performance', 'theater', 'dance', 'musical'],
-        'business': ['business', 'workshop', 'seminar', 'training', 'career', 'networking'],
-    }
-    
-    for event_type, keywords in event_types.items():
-        if any(keyword in message_lower for keyword in keywords):
-            search_params['event_type'] = event_type
-            search_params['keywords'].extend(keywords[:2])  # Add first 2 keywords
-            break
+    return parse_intent(message)
+
+def _response_key(search_params):
+    """Cache key for a parsed request: word order, duplicates and phrasing don't matter"""
+    return (
+        search_params['event_type'],
+        tuple(sorted(set(search_params['keywords']))),
+        search_params['max_price'],
+        search_params['min_price'],
+        search_params['date_label'],
+        # "today"/"this week" windows start at the current time; the end pins the day
+        search_params['date_to']
+    )
+
+def response_cache_stats():
+    """Hit/miss counts for the reply cache plus the time hits saved"""
+    stats = response_cache.stats()
+    with _saved_lock:
+        avg_miss = _saved["miss_seconds"] / _saved["misses"] if _saved["misses"] else 0.0
+        stats["latency_saved_ms"] = round(_saved["seconds"] * 1000, 3)
+        stats["avg_miss_ms"] = round(avg_miss * 1000, 3)
+    return stats
+
+def _lookup(message):
+    """Parse the message and check the reply cache; returns (search_params, key, cached result or None)"""
+    # Analyze the request to understand what the user wants
+    search_params = analyze_user_request(message)
     
-    # Add keywords for location/venue if mentioned
-    locations = ['downtown', 'park', 'center', 'hall', 'garden', 'beach']
-    for location in locations:
-        if location in message_lower:
-            search_params['keywords'].append(location)
+    # Pick up invalidations from other workers before trusting the cache
+    sync_invalidations()
+    key = _response_key(search_params)
+    cached = response_cache.get(key)
+    if cached is None:
+        return search_params, key, None
+    result, cost = cached
+    with _saved_lock:
+        _saved["seconds"] += cost
+    return search_params, key, result
+
+def _find_events(search_params):
+    """Run the search for a parsed request and format the rows for the reply"""
+    # Search for events based on the request
+    if (search_params['event_type'] or search_params['keywords'] or search_params['max_price'] is not None
+            or search_params['min_price'] is not None or search_params['date_from'] is not None):
+        recommended_events = search_events_in_database(
+            keywords=search_params['keywords'] if search_params['keywords'] else None,
+            max_price=search_params['max_price'],
+            event_type=search_params['event_type'],
+            min_price=search_params['min_price'],
+            date_from=search_params['date_from'],
+            date_to=search_params['date_to']
+        )
+    else:
+        # If no specific criteria, get all upcoming events
+        recommended_events = get_all_upcoming_events(limit=5)
     
-    return search_params
+    # Format events for response
+    return [format_event_for_response(event) for event in recommended_events]
+
+def _store(key, result, started, used_llm):
+    cost = time.perf_counter() - started
+    with _saved_lock:
+        _saved["miss_seconds"] += cost
+        _saved["misses"] += 1
+    # Empty results and template fallbacks may be transient; keep them briefly
+    ttl = None if result["recommended_events"] and used_llm else AI_RESPONSE_EMPTY_TTL
+    response_cache.set(key, (result, cost), ttl=ttl)
+
+def _text_chunks(text):
+    """Split a finished reply into a few words per chunk for streaming"""
+    words = re.findall(r"\S+\s*", text)
+    for i in range(0, len(words), STREAM_WORDS_PER_CHUNK):
+        yield "".join(words[i:i + STREAM_WORDS_PER_CHUNK])
 
 def generate_ai_response(message, context=""):
     """
     Generate a response using AI for event recommendations
     
+    Replies are cached on the normalized search parameters, so "cheap music"
+    and "any music that's cheap?" share one entry. The cache is cleared
+    whenever EVENTS rows change.
+    
     Args:
         message: User's message/question
         context: Additional context (user preferences, etc.)
@@ -183,30 +292,30 @@ def generate_ai_response(message, context=""):
         dict: Contains 'response' and 'recommended_events'
     """
     try:
-        # Analyze the request to understand what the user wants
-        search_params = analyze_user_request(message)
-        recommended_events = []
-        
-        # Search for events based on the request
-        if search_params['event_type'] or search_params['keywords'] or search_params['max_price'] is not None:
-            recommended_events = search_events_in_database(
-                keywords=search_params['keywords'] if search_params['keywords'] else None,
-                max_price=search_params['max_price'],
-                event_type=search_params['event_type']
-            )
-        else:
-            # If no specific criteria, get all upcoming events
-            recommended_events = get_all_upcoming_events(limit=5)
+        search_params, key, cached = _lookup(message)
+        if cached is not None:
+            return {
+                "response": cached["response"],
+                "recommended_events": list(cached["recommended_events"])
+            }
         
-        # Format events for response
-        formatted_events = [format_event_for_response(event) for event in recommended_events]
+        started = time.perf_counter()
+        formatted_events = _find_events(search_params)
         
         # Generate response message
         response_message = generate_response_message(message, formatted_events, search_params)
+        used_llm = True
+        if llm_client is not None and formatted_events:
+            # The template reply is the fallback when the model is slow, failing or saturated
+            templated = response_message
+            response_message, used_llm = llm_client.generate(
+                _llm_prompt(search_params, formatted_events), lambda: templated
+            )
         
+        _store(key, {"response": response_message, "recommended_events": formatted_events}, started, used_llm)
         return {
             "response": response_message,
-            "recommended_events": formatted_events
+            "recommended_events": list(formatted_events)
         }
     
     except Exception as e:
@@ -217,6 +326,89 @@ def generate_ai_response(message, context=""):
             "error": str(e)
         }
 
+def stream_ai_response(message):
+    """
+    Same pipeline as generate_ai_response, delivered in pieces
+    
+    Yields (event, data) pairs as soon as each part is ready:
+        ("events", {"recommended_events": [...]}) right after the search,
+        ("delta", {"text": ...}) for each piece of the reply text,
+        ("done", {"response": full text, "cached": bool}) at the end, or
+        ("error", {"response": apology, "error": ...}) if something failed.
+    A reply the LLM cut off part way ends with ("error", {"response": the
+    text sent so far, "error": ..., "partial": True}) and is not cached.
+    """
+    try:
+        search_params, key, cached = _lookup(message)
+        if cached is not None:
+            yield "events", {"recommended_events": list(cached["recommended_events"])}
+            for chunk in _text_chunks(cached["response"]):
+                yield "delta", {"text": chunk}
+            yield "done", {"response": cached["response"], "cached": True}
+            return
+        
+        started = time.perf_counter()
+        formatted_events = _find_events(search_params)
+        yield "events", {"recommended_events": list(formatted_events)}
+        
+        templated = generate_response_message(message, formatted_events, search_params)
+        used_llm = True
+        if llm_client is not None and formatted_events:
+            pieces = llm_client.stream(_llm_prompt(search_params, formatted_events), lambda: templated, _text_chunks)
+        else:
+            pieces = ((chunk, True) for chunk in _text_chunks(templated))
+        text = []
+        cut_off = False
+        for chunk, used_llm in pieces:
+            if not chunk and not used_llm:
+                # llm_client's marker for a reply that failed part way
+                cut_off = True
+                continue
+            text.append(chunk)
+            yield "delta", {"text": chunk}
+        response_message = "".join(text)
+        if cut_off:
+            yield "error", {"response": response_message, "error": "The reply was cut off", "partial": True}
+            return
+        
+        _store(key, {"response": response_message, "recommended_events": formatted_events}, started, used_llm)
+        yield "done", {"response": response_message, "cached": False}
+    
+    except Exception as e:
+        print(f"Error streaming AI response: {e}")
+        yield "error", {
+            "response": "I'm having trouble finding events right now. Please try again in a moment!",
+            "error": str(e)
+        }
+
+def _llm_prompt(search_params, events):
+    """
+    Prompt for the LLM reply
+
+    Built from the parsed request rather than the raw message, so it is
+    identical for every phrasing of the same request: identical in-flight
+    prompts share one provider call and the reply can be cached.
+    """
+    wanted = []
+    if search_params['event_type']:
+        wanted.append(f"category: {search_params['event_type']}")
+    if search_params['min_price'] is not None:
+        wanted.append(f"min price: ${search_params['min_price']}")
+    if search_params['max_price'] is not None:
+        wanted.append(f"max price: ${search_params['max_price']}")
+    if search_params['date_label']:
+        wanted.append(f"when: {search_params['date_label']}")
+    if search_params['locations']:
+        wanted.append(f"near: {', '.join(search_params['locations'])}")
+    lines = [
+        "You are TicketR's event assistant. In at most 80 words, write a friendly reply recommending",
+        "the events below to someone who asked for them. Only mention events from the list.",
+        "Request: " + ("; ".join(wanted) if wanted else "anything upcoming"),
+        "Events:"
+    ]
+    lines.extend(f"- {e['name']} | {e['date']} | {e['location']} | {e['price']}" for e in events[:5])
+    return "\n".join(lines)
+
 def generate_response_message(user_message, events, search_params):
     """
     Generate a natural language response based on search results
@@ -240,12 +432,17 @@ def generate_response_message(user_message, events, search_params):
         return f"Great! I found a perfect event for you: **{event['name']}** on {event['date']} at {event['location']}. Price: {event['price']}. Would you like to register for it?"
     else:
         price_info = ""
-        if search_params['max_price'] is not None:
+        if search_params['max_price'] is not None and search_params.get('min_price') is not None:
+            price_info = f" between ${search_params['min_price']} and ${search_params['max_price']}"
+        elif search_params['max_price'] is not None:
             price_info = f" under ${search_params['max_price']}" if search_params['max_price'] > 0 else " for free"
+        elif search_params.get('min_price') is not None:
+            price_info = f" over ${search_params['min_price']}"
         
         type_info = f"{search_params['event_type']} " if search_params['event_type'] else ""
+        date_info = f" {search_params['date_label']}" if search_params.get('date_label') else ""
         
-        return f"Awesome! I found {event_count} {type_info}events{price_info} that match your interests! Here are the top recommendations:\n" + \
+        return f"Awesome! I found {event_count} {type_info}events{price_info}{date_info} that match your interests! Here are the top recommendations:\n" + \
                "\n".join([f"• **{e['name']}** - {e['date']} @ {e['location']} ({e['price']})" for e in events[:3]]) + \
                "\n\nClick on any event to register or get more details!"
 
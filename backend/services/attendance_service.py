@@ -0,0 +1,214 @@
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from database import get_db_connection
+
+# Seconds between reconcile passes over every event; 0 disables the background job
+ATTENDANCE_RECONCILE_INTERVAL = int(os.getenv("ATTENDANCE_RECONCILE_INTERVAL", "3600"))
+# Per-minute check-in buckets returned by default (the most recent ones)
+ATTENDANCE_MINUTES = int(os.getenv("ATTENDANCE_MINUTES", "60"))
+# Counter rows per multi-row upsert
+ATTENDANCE_UPSERT_CHUNK = 500
+
+# Counters live in EVENT_TICKET_STATS / EVENT_CHECKIN_MINUTES (migration 0004).
+# Every ticket write adjusts them in its own transaction, after its TICKETS
+# row is locked and with the counter rows in sorted order, so two writers
+# never wait on each other's counters in opposite order.
+
+
+def ticket_changes(before, after):
+    """
+    Counter deltas for one ticket going from `before` to `after`
+
+    Either side may be None (ticket created or deleted). Tickets are dicts
+    with event_id and any of ticket_status, purchase_source and
+    check_in_time; a field left out is treated as unchanged, so a check-in
+    can pass just event_id and check_in_time.
+
+    Returns:
+        Counter keyed by ("stat", event_id, dimension, bucket) or
+        ("minute", event_id, minute)
+    """
+    changes = Counter()
+    for ticket, sign in ((before, -1), (after, 1)):
+        if ticket is None:
+            continue
+        event_id = ticket["event_id"]
+        if "ticket_status" in ticket:
+            changes[("stat", event_id, "status", ticket["ticket_status"] or "")] += sign
+        if "purchase_source" in ticket:
+            changes[("stat", event_id, "source", ticket["purchase_source"] or "")] += sign
+        if "check_in_time" in ticket and ticket["check_in_time"]:
+            changes[("stat", event_id, "checked_in", "all")] += sign
+            changes[("minute", event_id, _minute(ticket["check_in_time"]))] += sign
+    return changes
+
+
+def apply_changes(cursor, changes):
+    """Write counter deltas from ticket_changes() (summed with +) in the caller's transaction"""
+    stats = sorted((key[1:], delta) for key, delta in changes.items() if delta and key[0] == "stat")
+    minutes = sorted((key[1:], delta) for key, delta in changes.items() if delta and key[0] == "minute")
+    _upsert(cursor, "EVENT_TICKET_STATS (event_id, dimension, bucket, ticket_count)", "(%s, %s, %s, %s)",
+            stats, "ticket_count = GREATEST(ticket_count + VALUES(ticket_count), 0)")
+    _upsert(cursor, "EVENT_CHECKIN_MINUTES (event_id, minute, ticket_count)", "(%s, %s, %s)",
+            minutes, "ticket_count = GREATEST(ticket_count + VALUES(ticket_count), 0)")
+
+
+def get_attendance(cursor, event_id, minutes=ATTENDANCE_MINUTES):
+    """
+    Sold / status / source / checked-in counts for an event, plus its latest per-minute check-ins
+
+    Returns:
+        dict ready for jsonify()
+    """
+    cursor.execute(
+        "SELECT dimension, bucket, ticket_count FROM EVENT_TICKET_STATS WHERE event_id = %s",
+        (event_id,)
+    )
+    by_status = {}
+    by_source = {}
+    checked_in = 0
+    for dimension, bucket, count in cursor.fetchall():
+        if count <= 0:
+            continue
+        if dimension == "status":
+            by_status[bucket] = count
+        elif dimension == "source":
+            by_source[bucket] = count
+        elif dimension == "checked_in":
+            checked_in = count
+    cursor.execute(
+        "SELECT minute, ticket_count FROM EVENT_CHECKIN_MINUTES WHERE event_id = %s AND ticket_count > 0 "
+        "ORDER BY minute DESC LIMIT %s",
+        (event_id, minutes)
+    )
+    per_minute = [{"minute": minute.strftime('%Y-%m-%d %H:%M'), "count": count}
+                  for minute, count in reversed(cursor.fetchall())]
+    return {
+        "event_id": event_id,
+        "sold": sum(by_status.values()),
+        "by_status": by_status,
+        "by_source": by_source,
+        "checked_in": checked_in,
+        "check_ins_per_minute": per_minute
+    }
+
+
+def reconcile_event(cursor, event_id):
+    """
+    Recompute an event's counters from TICKETS and fix any that drifted
+
+    Takes the EVENTS row lock first, like the purchase path, then share-locks
+    the event's tickets, so no ticket write can land between the recount
+    and the correction. Runs in the caller's transaction.
+
+    Returns:
+        Number of counter rows corrected (0 when everything matched)
+    """
+    cursor.execute("SELECT event_id FROM EVENTS WHERE event_id = %s FOR UPDATE", (event_id,))
+    if cursor.fetchone() is None:
+        return 0
+    cursor.execute(
+        "SELECT ticket_status, purchase_source, check_in_time FROM tickets WHERE event_id = %s LOCK IN SHARE MODE",
+        (event_id,)
+    )
+    truth = Counter()
+    for status, source, check_in_time in cursor.fetchall():
+        truth.update(ticket_changes(None, {
+            "event_id": event_id, "ticket_status": status, "purchase_source": source, "check_in_time": check_in_time
+        }))
+
+    stored = Counter()
+    cursor.execute(
+        "SELECT dimension, bucket, ticket_count FROM EVENT_TICKET_STATS WHERE event_id = %s FOR UPDATE",
+        (event_id,)
+    )
+    for dimension, bucket, count in cursor.fetchall():
+        stored[("stat", event_id, dimension, bucket)] = count
+    cursor.execute(
+        "SELECT minute, ticket_count FROM EVENT_CHECKIN_MINUTES WHERE event_id = %s FOR UPDATE",
+        (event_id,)
+    )
+    for minute, count in cursor.fetchall():
+        stored[("minute", event_id, minute)] = count
+
+    drift = Counter({key: truth[key] - stored[key] for key in set(truth) | set(stored)
+                     if truth[key] != stored[key]})
+    if drift:
+        apply_changes(cursor, drift)
+    return len(drift)
+
+
+def reconcile_all():
+    """
+    Reconcile every event, one short transaction per event
+
+    Returns:
+        {event_id: rows corrected} for the events that had drifted
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError("Database connection failed")
+    cursor = conn.cursor()
+    corrected = {}
+    try:
+        cursor.execute("SELECT event_id FROM EVENTS ORDER BY event_id")
+        event_ids = [row[0] for row in cursor.fetchall()]
+        conn.rollback()
+        for event_id in event_ids:
+            try:
+                fixed = reconcile_event(cursor, event_id)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            if fixed:
+                corrected[event_id] = fixed
+    finally:
+        cursor.close()
+        conn.close()
+    return corrected
+
+
+_reconciler = None
+_reconciler_lock = threading.Lock()
+
+
+def start_reconciler():
+    """Run reconcile_all() every ATTENDANCE_RECONCILE_INTERVAL seconds on a daemon thread"""
+    global _reconciler
+    if ATTENDANCE_RECONCILE_INTERVAL <= 0:
+        return
+    with _reconciler_lock:
+        if _reconciler is not None and _reconciler.is_alive():
+            return
+
+        def loop():
+            while True:
+                time.sleep(ATTENDANCE_RECONCILE_INTERVAL)
+                try:
+                    corrected = reconcile_all()
+                    if corrected:
+                        print(f"Attendance counters corrected for events {corrected}")
+                except Exception as e:
+                    print(f"Attendance reconcile failed: {e}")
+
+        _reconciler = threading.Thread(target=loop, name="attendance-reconciler", daemon=True)
+        _reconciler.start()
+
+
+def _minute(value):
+    if isinstance(value, str):
+        value = datetime.strptime(value[:16], '%Y-%m-%d %H:%M')
+    return value.replace(second=0, microsecond=0)
+
+
+def _upsert(cursor, target, placeholders, rows, on_duplicate):
+    for start in range(0, len(rows), ATTENDANCE_UPSERT_CHUNK):
+        chunk = rows[start:start + ATTENDANCE_UPSERT_CHUNK]
+        cursor.execute(
+            f"INSERT INTO {target} VALUES {', '.join([placeholders] * len(chunk))} ON DUPLICATE KEY UPDATE {on_duplicate}",
+            [v for key, delta in chunk for v in (*key, delta)]
+        )
@@ -1,15 +1,48 @@
-import bcrypt
+import hashlib
+import os
+import threading
+import time
+import hmac
 import jwt
-from datetime import datetime, timedelta
-from config import Config
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import config
+from cache import TTLCache
+from database import get_db_connection
+
+try:
+    import bcrypt
+    HAS_BCRYPT = True
+except ImportError:
+    print("WARNING: bcrypt not installed. Install with: pip install bcrypt")
+    HAS_BCRYPT = False
+
+# Verified tokens kept per process, keyed by the token's SHA-256
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+# Longest a verified token is trusted before its signature is checked again
+AUTH_TOKEN_CACHE_TTL = int(os.getenv("AUTH_TOKEN_CACHE_TTL", "900"))
+# Seconds between reads of REVOKED_TOKENS for logouts handled by other workers
+AUTH_REVOCATION_POLL = float(os.getenv("AUTH_REVOCATION_POLL", "5"))
+# Each poll re-reads revocations this many seconds older than the previous
+# poll, to catch logouts whose transaction committed after a later one
+AUTH_REVOCATION_OVERLAP = int(os.getenv("AUTH_REVOCATION_OVERLAP", "60"))
+JWT_ALGORITHM = "HS256"
+# bcrypt cost factor for new hashes; stored hashes below it are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads running bcrypt (it releases the GIL, so they hash in parallel)
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash jobs running or queued at once; past this, logins are turned away
+AUTH_HASH_MAX_PENDING = int(os.getenv("AUTH_HASH_MAX_PENDING", str(AUTH_HASH_WORKERS * 4)))
+# Longest a login waits for room in the queue before getting a 503
+AUTH_HASH_QUEUE_TIMEOUT = float(os.getenv("AUTH_HASH_QUEUE_TIMEOUT", "0.5"))
 
 def hash_password(password):
-    """Hash a password"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    """Hash a password with bcrypt on the hashing pool (raises HasherBusy when it is full)"""
+    return password_hasher.hash(password)
 
 def verify_password(password, hashed):
-    """Verify a password against a hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    """Verify a password against a stored hash (or a legacy plaintext password)"""
+    return password_hasher.check(password, hashed)[0]
 
 def generate_token(user_id, user_type='user'):
     """Generate JWT token"""
@@ -18,14 +51,372 @@ def generate_token(user_id, user_type='user'):
         'user_type': user_type,
         'exp': datetime.utcnow() + timedelta(days=7)
     }
-    return jwt.encode(payload, Config.JWT_SECRET_KEY, algorithm='HS256')
+    return jwt.encode(payload, config.SECRET_KEY, algorithm=JWT_ALGORITHM)
 
 def verify_token(token):
-    """Verify JWT token"""
+    """Verify JWT token; returns the principal dict (see TokenVerifier) or None"""
+    return token_verifier.verify(token)
+
+
+class TokenVerifier:
+    """
+    JWT verification with a cache of tokens that already passed
+
+    A token's signature and expiry are checked once; after that its
+    principal is served from a bounded LRU keyed by the token's SHA-256
+    until the token expires (or AUTH_TOKEN_CACHE_TTL passes, whichever is
+    first). Invalid tokens are never cached, so garbage can't push valid
+    entries out.
+
+    Revoked tokens are kept, by digest, in a local set that is topped up
+    from REVOKED_TOKENS every `revocation_poll` seconds; a logout on this
+    worker takes effect at once, on the others within the poll interval.
+    Each poll reads rows revoked since the previous poll's database time
+    minus AUTH_REVOCATION_OVERLAP, so a row that committed late (its
+    revoked_at is its INSERT time) is still seen.
+
+    Args:
+        secret: HMAC key
+        cache_size: Verified tokens kept
+        cache_ttl: Upper bound in seconds on a cached verification
+        revocation_poll: Seconds between REVOKED_TOKENS reads (0 disables them)
+    """
+
+    def __init__(self, secret=None, cache_size=AUTH_TOKEN_CACHE_SIZE, cache_ttl=AUTH_TOKEN_CACHE_TTL,
+                 revocation_poll=AUTH_REVOCATION_POLL):
+        self.secret = secret
+        self.cache_ttl = cache_ttl
+        self.revocation_poll = revocation_poll
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl, name="verified_tokens")
+        self._lock = threading.Lock()
+        self._revoked = {}  # digest -> token exp (epoch seconds)
+        self._revoked_since = None  # database time to read revocations from; None = all
+        self._next_poll = 0
+        self.verified = 0
+        self.rejected = 0
+        self.revoked_hits = 0
+        self.poll_failures = 0
+
+    def verify(self, token):
+        """
+        Returns:
+            {"type": "user"|"org", "id", "email", "exp"} for a valid,
+            unrevoked token, otherwise None
+        """
+        if not token:
+            return None
+        digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        self._sync_revocations()
+        if digest in self._revoked:
+            with self._lock:
+                self.revoked_hits += 1
+            return None
+        principal = self.cache.get(digest)
+        if principal is not None:
+            if principal["exp"] > time.time():
+                return principal
+            self.cache.pop(digest)
+
+        try:
+            payload = jwt.decode(token, self.secret or config.SECRET_KEY, algorithms=[JWT_ALGORITHM],
+                                 options={"require": ["exp"]})
+        except jwt.InvalidTokenError:
+            with self._lock:
+                self.rejected += 1
+            return None
+        principal = _principal(payload)
+        if principal is None:
+            with self._lock:
+                self.rejected += 1
+            return None
+        with self._lock:
+            self.verified += 1
+        remaining = principal["exp"] - time.time()
+        if remaining > 0:
+            self.cache.set(digest, principal, ttl=max(1, min(self.cache_ttl, int(remaining))))
+        return principal
+
+    def revoke(self, token):
+        """
+        Revoke a token until it expires
+
+        Returns:
+            The principal the token belonged to, or None if it was already
+            invalid (nothing to revoke)
+        """
+        principal = self.verify(token)
+        if principal is None:
+            return None
+        digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        conn = get_db_connection()
+        if not conn:
+            raise ConnectionError("Database connection failed")
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT IGNORE INTO REVOKED_TOKENS (token_digest, principal, expires_at) VALUES (%s, %s, %s)",
+                (digest, f"{principal['type']}:{principal['id']}",
+                 datetime.fromtimestamp(principal["exp"], timezone.utc).replace(tzinfo=None))
+            )
+            cursor.execute("DELETE FROM REVOKED_TOKENS WHERE expires_at < UTC_TIMESTAMP() LIMIT 1000")
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+        with self._lock:
+            self._revoked[digest] = principal["exp"]
+        self.cache.pop(digest)
+        return principal
+
+    def stats(self):
+        stats = self.cache.stats()
+        with self._lock:
+            stats.update(
+                verified=self.verified,
+                rejected=self.rejected,
+                revoked=len(self._revoked),
+                revoked_hits=self.revoked_hits,
+                revocation_poll_failures=self.poll_failures
+            )
+        return stats
+
+    def reset(self):
+        """Forget cached verifications and revocations (they are re-read from REVOKED_TOKENS)"""
+        self.cache.clear()
+        with self._lock:
+            self._revoked.clear()
+            self._revoked_since = None
+            self._next_poll = 0
+
+    def _sync_revocations(self):
+        if self.revocation_poll <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_poll:
+                return
+            self._next_poll = now + self.revocation_poll
+            since = self._revoked_since
+        try:
+            conn = get_db_connection()
+            if not conn:
+                raise ConnectionError("Database connection failed")
+            cursor = conn.cursor()
+            try:
+                # Read on the database's clock, before the rows, so nothing revoked in between is missed
+                cursor.execute("SELECT CURRENT_TIMESTAMP")
+                polled_at = cursor.fetchone()[0]
+                if since is None:
+                    cursor.execute(
+                        "SELECT token_digest, expires_at FROM REVOKED_TOKENS WHERE expires_at > UTC_TIMESTAMP()"
+                    )
+                else:
+                    cursor.execute(
+                        "SELECT token_digest, expires_at FROM REVOKED_TOKENS "
+                        "WHERE revoked_at >= %s - INTERVAL %s SECOND AND expires_at > UTC_TIMESTAMP()",
+                        (since, AUTH_REVOCATION_OVERLAP)
+                    )
+                rows = cursor.fetchall()
+                # Inside a request this is the request's connection; don't leave a snapshot open on it
+                conn.rollback()
+            finally:
+                cursor.close()
+                conn.close()
+        except Exception:
+            # Keep serving with the revocations we have; the next poll retries
+            with self._lock:
+                self.poll_failures += 1
+            return
+        wall = time.time()
+        with self._lock:
+            for digest, expires_at in rows:
+                self._revoked[digest] = expires_at.replace(tzinfo=timezone.utc).timestamp()
+            if self._revoked_since is None or polled_at > self._revoked_since:
+                self._revoked_since = polled_at
+            for digest in [d for d, exp in self._revoked.items() if exp <= wall]:
+                del self._revoked[digest]
+        for digest, _ in rows:
+            self.cache.pop(digest)
+
+
+class HasherBusy(Exception):
+    """The hashing pool is full; the caller should answer 503 and let the client retry"""
+
+
+class PasswordHasher:
+    """
+    bcrypt on a small dedicated pool instead of the request thread
+
+    At most `max_pending` hash jobs are running or queued; a request that
+    can't get a place within `queue_timeout` seconds gets HasherBusy rather
+    than waiting behind an on-sale login storm. check() also recognizes
+    legacy plaintext passwords and hashes with fewer than `rounds` rounds
+    and reports that they need rehashing.
+
+    Args:
+        workers: Hashing threads
+        max_pending: Jobs running or queued at once
+        queue_timeout: Seconds to wait for a free place
+        rounds: bcrypt cost factor for new hashes
+    """
+
+    def __init__(self, workers=AUTH_HASH_WORKERS, max_pending=AUTH_HASH_MAX_PENDING,
+                 queue_timeout=AUTH_HASH_QUEUE_TIMEOUT, rounds=BCRYPT_ROUNDS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._counters = {"hashes": 0, "checks": 0, "rehashes": 0, "rejected_busy": 0, "rehash_skipped": 0}
+
+    def hash(self, password):
+        """bcrypt hash of `password` at the configured cost"""
+        self._count("hashes")
+        return self._run(_bcrypt_hash, password, self.rounds)
+
+    def check(self, password, stored):
+        """
+        Check a password against what is stored for the account
+
+        Returns:
+            (matches, needs_rehash); needs_rehash is only True on a match
+        """
+        self._count("checks")
+        if not stored:
+            return False, False
+        if not stored.startswith("$2"):
+            # Legacy plaintext row: compare in constant time, then upgrade it
+            matches = hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+            return matches, matches
+        matches = self._run(_bcrypt_check, password, stored)
+        return matches, matches and _bcrypt_rounds(stored) < self.rounds
+
+    def rehash_later(self, password, on_hash):
+        """
+        Hash `password` in the background and pass the result to on_hash(hashed)
+
+        Never waits: if the pool is full the rehash is skipped (the next
+        login tries again). Returns True if the job was queued.
+        """
+        if not HAS_BCRYPT or not self._slots.acquire(blocking=False):
+            self._count("rehash_skipped")
+            return False
+        self._count("rehashes")
+
+        def job():
+            try:
+                on_hash(_bcrypt_hash(password, self.rounds))
+            except Exception as e:
+                print(f"Password rehash failed: {e}")
+            finally:
+                self._slots.release()
+
+        self._executor.submit(job)
+        return True
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update(workers=self.workers, max_pending=self.max_pending, rounds=self.rounds)
+        return stats
+
+    def reset(self):
+        """New pool for a forked worker (the parent's threads don't survive fork)"""
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _run(self, fn, *args):
+        if not HAS_BCRYPT:
+            raise RuntimeError("bcrypt is not installed")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count("rejected_busy")
+            raise HasherBusy("password hashing is at capacity")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+
+def schedule_rehash(table, id_column, row_id, password, old_hash):
+    """
+    Replace a legacy or low-cost password hash after a successful login
+
+    The UPDATE only applies if the row still holds `old_hash`, so a password
+    change that lands first is never overwritten.
+    """
+    def save(new_hash):
+        conn = get_db_connection()
+        if not conn:
+            raise ConnectionError("Database connection failed")
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"UPDATE {table} SET password = %s WHERE {id_column} = %s AND password = %s",
+                (new_hash, row_id, old_hash)
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+    return password_hasher.rehash_later(password, save)
+
+
+def check_password_login(table, id_column, row, password):
+    """
+    Check a login against the account row and upgrade its hash if it is stale
+
+    Returns:
+        True if the password matches (raises HasherBusy when the pool is full)
+    """
+    matches, stale = password_hasher.check(password, row["password"])
+    if matches and stale:
+        schedule_rehash(table, id_column, row[id_column], password, row["password"])
+    return matches
+
+
+def _bcrypt_hash(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _bcrypt_check(password, stored):
     try:
-        payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
-        return payload
-    except jwt.ExpiredSignatureError:
+        return bcrypt.checkpw(password.encode("utf-8"), stored.encode("utf-8"))
+    except ValueError:
+        # Malformed hash in the column: treat as a failed login, not a 500
+        return False
+
+
+def _bcrypt_rounds(stored):
+    # "$2b$12$..." -> 12
+    try:
+        return int(stored.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def _principal(payload):
+    # Tokens minted by users.create_user/login_user carry user_id, organizations.login_org carries org_id
+    if "user_id" in payload:
+        kind, principal_id = payload.get("user_type", "user"), payload["user_id"]
+    elif "org_id" in payload:
+        kind, principal_id = "org", payload["org_id"]
+    else:
         return None
-    except jwt.InvalidTokenError:
-        return None
\ No newline at end of file
+    return {"type": kind, "id": principal_id, "email": payload.get("email"), "exp": payload["exp"]}
+
+
+token_verifier = TokenVerifier()
+password_hasher = PasswordHasher()
@@ -0,0 +1,345 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from mysql.connector import errorcode
+from database import get_db_connection
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process, so the thread lock is enough
+    fcntl = None
+
+# Messages waiting to be written; past this, submit() applies the overflow policy
+CHAT_LOG_QUEUE_SIZE = int(os.getenv("CHAT_LOG_QUEUE_SIZE", "10000"))
+# Rows per multi-row INSERT, and the longest a row waits before its batch is flushed
+CHAT_LOG_BATCH_SIZE = int(os.getenv("CHAT_LOG_BATCH_SIZE", "200"))
+CHAT_LOG_FLUSH_INTERVAL = float(os.getenv("CHAT_LOG_FLUSH_INTERVAL", "1.0"))
+# How long a request may block on a full queue before the row is spilled or dropped
+CHAT_LOG_PUT_TIMEOUT = float(os.getenv("CHAT_LOG_PUT_TIMEOUT", "0.05"))
+# JSON-lines file for rows MySQL couldn't take; unset means those rows are dropped.
+# Shared by every worker: appends and replays are serialized with flock
+CHAT_LOG_SPILL_PATH = os.getenv("CHAT_LOG_SPILL_PATH")
+# Seconds to wait before retrying after a failed flush
+CHAT_LOG_RETRY_SECONDS = float(os.getenv("CHAT_LOG_RETRY_SECONDS", "5"))
+# Upper bound on the final flush at shutdown
+CHAT_LOG_SHUTDOWN_TIMEOUT = float(os.getenv("CHAT_LOG_SHUTDOWN_TIMEOUT", "10"))
+
+INSERT_CHAT_SQL = (
+    "INSERT INTO CHAT_HISTORY (user_id, message, response, recommended_event_id) "
+    "VALUES (%s, %s, %s, %s)"
+)
+
+# A foreign key that points nowhere (e.g. the user was deleted) fails the statement
+_BAD_REFERENCE = (errorcode.ER_NO_REFERENCED_ROW, errorcode.ER_NO_REFERENCED_ROW_2)
+
+_STOP = object()
+
+
+class ChatHistoryWriter:
+    """
+    Background writer for CHAT_HISTORY rows
+
+    POST /api/chats hands its row to submit() and returns right away; one
+    daemon thread per process drains the queue and writes batches with a
+    single multi-row INSERT when CHAT_LOG_BATCH_SIZE rows are waiting or
+    CHAT_LOG_FLUSH_INTERVAL has passed, whichever comes first.
+
+    Backpressure: the queue is bounded. A full queue blocks the request for
+    at most CHAT_LOG_PUT_TIMEOUT, then the row goes to the spill file (or is
+    dropped when no spill file is configured). Batches that fail because
+    MySQL is down are spilled the same way and replayed after the next
+    successful flush. close() (registered with atexit) drains what is left.
+
+    Every worker process spills to the same file. Appends hold an flock on
+    it; a replay takes `<spill>.lock`, first re-sends any `<spill>.replay.*`
+    files a crashed worker left behind, then renames the spill file to
+    `<spill>.replay.<pid>` and sends that.
+    """
+
+    def __init__(self, batch_size=CHAT_LOG_BATCH_SIZE, flush_interval=CHAT_LOG_FLUSH_INTERVAL,
+                 maxsize=CHAT_LOG_QUEUE_SIZE, spill_path=CHAT_LOG_SPILL_PATH):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._retry_at = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.failed_flushes = 0
+        self.last_error = None
+
+    def submit(self, user_id, message, response, recommended_event_id=None):
+        """
+        Queue one chat exchange for writing
+
+        Returns:
+            True if queued, False if it was spilled or dropped instead
+        """
+        row = (user_id, message, response, recommended_event_id)
+        if self._closed:
+            self._overflow([row])
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=CHAT_LOG_PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            self._overflow([row])
+            return False
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written (or spilled)"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self, timeout=CHAT_LOG_SHUTDOWN_TIMEOUT):
+        """Stop accepting rows, write out the queue and stop the thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+
+    def reset(self):
+        """
+        Forget the writer thread without joining it
+
+        For a forked child process: the parent's thread doesn't exist there,
+        so the next submit() starts a fresh one with an empty queue.
+        """
+        with self._lock:
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._thread = None
+            self._closed = False
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "maxsize": self._queue.maxsize,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "rejected": self.rejected,
+            "failed_flushes": self.failed_flushes,
+            "last_error": self.last_error,
+            "running": self._thread is not None and self._thread.is_alive()
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="chat-history-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        batch = []
+        waiters = []
+        deadline = None
+        stopping = False
+        while not stopping:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                    # Take whatever else is already waiting without blocking
+                    while len(batch) < self.batch_size:
+                        item = self._queue.get_nowait()
+                        if item is _STOP:
+                            stopping = True
+                            break
+                        if isinstance(item, threading.Event):
+                            waiters.append(item)
+                            break
+                        batch.append(item)
+            except queue.Empty:
+                pass
+
+            due = deadline is not None and time.monotonic() >= deadline
+            if batch and (len(batch) >= self.batch_size or due or waiters or stopping):
+                self._write(batch)
+                batch = []
+                deadline = None
+            for waiter in waiters:
+                waiter.set()
+            waiters = []
+
+        # Rows that raced in behind the stop marker
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._write(leftovers)
+
+    def _write(self, batch):
+        if time.monotonic() < self._retry_at:
+            # MySQL failed recently; don't hammer it, park the rows on disk
+            self._overflow(batch)
+            return
+        try:
+            self._insert(batch)
+        except Exception as e:
+            self.failed_flushes += 1
+            self.last_error = str(e)
+            self._retry_at = time.monotonic() + CHAT_LOG_RETRY_SECONDS
+            print(f"Chat history flush failed, {len(batch)} row(s) set aside: {e}")
+            self._overflow(batch)
+            return
+        self._replay_spill()
+
+    def _insert(self, rows):
+        conn = get_db_connection()
+        if not conn:
+            raise ConnectionError("Database connection failed")
+        cursor = conn.cursor()
+        try:
+            try:
+                # mysql-connector rewrites executemany() of an INSERT into one multi-row statement
+                cursor.executemany(INSERT_CHAT_SQL, rows)
+                conn.commit()
+                self.written += len(rows)
+            except Exception as e:
+                # A bad foreign key fails the whole statement; keep the good rows
+                if getattr(e, "errno", None) not in _BAD_REFERENCE:
+                    raise
+                conn.rollback()
+                for row in rows:
+                    try:
+                        cursor.execute(INSERT_CHAT_SQL, row)
+                        self.written += 1
+                    except Exception as row_error:
+                        if getattr(row_error, "errno", None) not in _BAD_REFERENCE:
+                            raise
+                        self.rejected += 1
+                conn.commit()
+            self.batches += 1
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _overflow(self, rows):
+        if not self.spill_path:
+            self.dropped += len(rows)
+            return
+        try:
+            with self._spill_lock:
+                f = self._open_spill()
+                with f:
+                    for row in rows:
+                        f.write(json.dumps(row) + "\n")
+            self.spilled += len(rows)
+        except OSError as e:
+            print(f"Chat history spill failed, dropping {len(rows)} row(s): {e}")
+            self.dropped += len(rows)
+
+    def _open_spill(self):
+        """The spill file opened for append and flock'ed, never one a replay has renamed away"""
+        while True:
+            f = open(self.spill_path, "a", encoding="utf-8")
+            if fcntl is None:
+                return f
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if os.fstat(f.fileno()).st_ino == os.stat(self.spill_path).st_ino:
+                    return f
+            except FileNotFoundError:
+                pass
+            f.close()
+
+    def _replay_spill(self):
+        # Called from the writer thread after a successful flush
+        if not self.spill_path:
+            return
+        pending = glob.glob(glob.escape(self.spill_path) + ".replay*")
+        if not pending and not os.path.exists(self.spill_path):
+            return
+        with open(self.spill_path + ".lock", "a") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return    # another worker is replaying
+            # Files a worker renamed but never finished (it crashed or was killed mid-replay)
+            for path in sorted(glob.glob(glob.escape(self.spill_path) + ".replay*")):
+                if not self._replay_file(path):
+                    return
+            replay_path = f"{self.spill_path}.replay.{os.getpid()}"
+            with self._spill_lock:
+                try:
+                    with open(self.spill_path, "a", encoding="utf-8") as f:
+                        if fcntl is not None:
+                            # Wait out an append in progress in another worker
+                            fcntl.flock(f, fcntl.LOCK_EX)
+                        os.replace(self.spill_path, replay_path)
+                except OSError:
+                    return
+            self._replay_file(replay_path)
+
+    def _replay_file(self, path):
+        """Insert the rows in one replay file and delete it; False if MySQL failed part way"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                rows = [tuple(json.loads(line)) for line in f if line.strip()]
+        except FileNotFoundError:
+            return True
+        remaining = rows
+        try:
+            while remaining:
+                chunk = remaining[:self.batch_size]
+                self._insert(chunk)
+                self.replayed += len(chunk)
+                remaining = remaining[self.batch_size:]
+        except Exception as e:
+            self.last_error = str(e)
+            self._retry_at = time.monotonic() + CHAT_LOG_RETRY_SECONDS
+            self._overflow(remaining)
+            os.remove(path)
+            return False
+        os.remove(path)
+        return True
+
+
+chat_writer = ChatHistoryWriter()
+atexit.register(chat_writer.close)
@@ -0,0 +1,406 @@
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from database import get_db_connection
+from services.attendance_service import ticket_changes, apply_changes
+
+# Start loading an event's tickets this long before its doors open
+CHECKIN_PRELOAD_MINUTES = int(os.getenv("CHECKIN_PRELOAD_MINUTES", "60"))
+# Seconds between preloader passes; 0 disables the background preloader
+CHECKIN_PRELOAD_INTERVAL = int(os.getenv("CHECKIN_PRELOAD_INTERVAL", "60"))
+# Hot sets are dropped this long after they were loaded
+CHECKIN_HOT_SET_HOURS = int(os.getenv("CHECKIN_HOT_SET_HOURS", "12"))
+# Tickets per lookup / multi-row UPDATE statement when syncing offline scans
+CHECKIN_SYNC_CHUNK_SIZE = int(os.getenv("CHECKIN_SYNC_CHUNK_SIZE", "500"))
+
+# Admission happens here and only here: one conditional UPDATE, so two
+# scanners racing on the same QR can't both let it in.
+CHECK_IN_SQL = (
+    "UPDATE tickets SET check_in_time = NOW() "
+    "WHERE ticket_id = %s AND check_in_time IS NULL AND ticket_status = 'active'"
+)
+# Same, for a scanner that says which event's door it is at
+CHECK_IN_AT_EVENT_SQL = CHECK_IN_SQL + " AND event_id = %s"
+
+
+class DoorHotSet:
+    """
+    In-memory QR -> ticket map for events whose doors are about to open
+
+    The database stays the authority on admission; memory only makes the
+    common cases cheap. A preloaded QR skips the lookup query, and a QR
+    this process admitted itself (mark_checked_in) is rejected as a repeat
+    without touching MySQL at all. Anything else the entry says (status,
+    event, an earlier check-in) may be stale, since other workers and the
+    CRUD routes change tickets too, so those scans still go through the
+    conditional UPDATE. A QR this process hasn't seen falls through to the
+    indexed lookup (it may have been sold by another worker after the
+    preload).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_qr = {}      # qr_code -> entry dict
+        self._by_ticket = {}  # ticket_id -> qr_code
+        self._events = {}     # event_id -> (loaded_at, set of qr_codes)
+        self.hits = 0
+        self.misses = 0
+        self.duplicates_rejected = 0
+
+    def load_event(self, cursor, event_id):
+        """Load every ticket of an event; returns the number of tickets loaded"""
+        cursor.execute(
+            "SELECT ticket_id, qr_code, ticket_status, check_in_time FROM tickets WHERE event_id = %s",
+            (event_id,)
+        )
+        rows = cursor.fetchall()
+        with self._lock:
+            self._drop_event(event_id)
+            codes = set()
+            for ticket_id, qr_code, status, check_in_time in rows:
+                if not qr_code:
+                    continue
+                self._by_qr[qr_code] = {
+                    "ticket_id": ticket_id,
+                    "event_id": event_id,
+                    "status": status,
+                    "check_in_time": check_in_time,
+                    "admitted_here": False
+                }
+                self._by_ticket[ticket_id] = qr_code
+                codes.add(qr_code)
+            self._events[event_id] = (time.monotonic(), codes)
+        return len(codes)
+
+    def is_loaded(self, event_id):
+        with self._lock:
+            return event_id in self._events
+
+    def get(self, qr_code):
+        with self._lock:
+            entry = self._by_qr.get(qr_code)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(entry)
+
+    def remember(self, qr_code, ticket_id, event_id, status, check_in_time):
+        """Record a ticket resolved from MySQL, if its event is loaded"""
+        with self._lock:
+            if event_id not in self._events:
+                return
+            previous = self._by_qr.get(qr_code)
+            self._by_qr[qr_code] = {
+                "ticket_id": ticket_id,
+                "event_id": event_id,
+                "status": status,
+                "check_in_time": check_in_time,
+                "admitted_here": bool(previous and previous["ticket_id"] == ticket_id and previous["admitted_here"])
+            }
+            self._by_ticket[ticket_id] = qr_code
+            self._events[event_id][1].add(qr_code)
+
+    def mark_checked_in(self, qr_code, check_in_time):
+        """Record that this process's UPDATE admitted the ticket; later scans of it are rejected locally"""
+        with self._lock:
+            entry = self._by_qr.get(qr_code)
+            if entry is not None:
+                entry["check_in_time"] = check_in_time
+                entry["admitted_here"] = True
+
+    def count_duplicate(self):
+        with self._lock:
+            self.duplicates_rejected += 1
+
+    def discard_ticket(self, ticket_id):
+        """Forget a ticket that was edited or deleted through the regular CRUD routes"""
+        with self._lock:
+            qr_code = self._by_ticket.pop(ticket_id, None)
+            if qr_code is None:
+                return
+            entry = self._by_qr.pop(qr_code, None)
+            if entry is not None and entry["event_id"] in self._events:
+                self._events[entry["event_id"]][1].discard(qr_code)
+
+    def evict_expired(self):
+        cutoff = time.monotonic() - CHECKIN_HOT_SET_HOURS * 3600
+        with self._lock:
+            for event_id in [e for e, (loaded_at, _) in self._events.items() if loaded_at < cutoff]:
+                self._drop_event(event_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "events": sorted(self._events),
+                "tickets": len(self._by_qr),
+                "hits": self.hits,
+                "misses": self.misses,
+                "duplicates_rejected": self.duplicates_rejected
+            }
+
+    def reset(self):
+        with self._lock:
+            self._by_qr.clear()
+            self._by_ticket.clear()
+            self._events.clear()
+
+    def _drop_event(self, event_id):
+        _, codes = self._events.pop(event_id, (None, ()))
+        for qr_code in codes:
+            entry = self._by_qr.pop(qr_code, None)
+            if entry is not None:
+                self._by_ticket.pop(entry["ticket_id"], None)
+
+
+door_hot_set = DoorHotSet()
+
+
+def resolve_qr(cursor, qr_code, event_id=None):
+    """
+    Find the ticket for a QR code through idx_tickets_qr_code
+
+    Returns:
+        dict with ticket_id, event_id, status and check_in_time, or None
+    """
+    if event_id is None:
+        cursor.execute(
+            "SELECT ticket_id, event_id, ticket_status, check_in_time FROM tickets WHERE qr_code = %s LIMIT 2",
+            (qr_code,)
+        )
+    else:
+        cursor.execute(
+            "SELECT ticket_id, event_id, ticket_status, check_in_time FROM tickets WHERE qr_code = %s AND event_id = %s LIMIT 2",
+            (qr_code, event_id)
+        )
+    rows = cursor.fetchall()
+    if len(rows) != 1:
+        # Unknown, or the same code on two tickets: don't guess which one
+        return None
+    ticket_id, found_event_id, status, check_in_time = rows[0]
+    return {"ticket_id": ticket_id, "event_id": found_event_id, "status": status, "check_in_time": check_in_time}
+
+
+def check_in_ticket(cursor, ticket_id, event_id=None):
+    """
+    Admit a ticket if it is active, not yet used and (when event_id is
+    given) for that event
+
+    Returns:
+        True if this call checked it in; False if it was already checked
+        in, inactive, for another event or missing (caller re-reads to tell
+        which)
+    """
+    if event_id is None:
+        cursor.execute(CHECK_IN_SQL, (ticket_id,))
+    else:
+        cursor.execute(CHECK_IN_AT_EVENT_SQL, (ticket_id, event_id))
+    return cursor.rowcount > 0
+
+
+def ticket_state(cursor, ticket_id):
+    """(event_id, ticket_status, check_in_time) as MySQL has them now, or None"""
+    cursor.execute("SELECT event_id, ticket_status, check_in_time FROM tickets WHERE ticket_id = %s", (ticket_id,))
+    return cursor.fetchone()
+
+
+def sync_scans(cursor, scans):
+    """
+    Apply a batch of offline door scans in the caller's transaction
+
+    Scans are resolved to tickets, the ticket rows are locked, and every
+    ticket gets the earliest scan time seen for it, written with one
+    multi-row UPDATE per chunk. Replaying a batch is harmless: a ticket
+    whose check_in_time already equals the scan time is reported as
+    "replayed" and not written again.
+
+    Args:
+        cursor: Cursor on the caller's transaction
+        scans: dicts with index, qr_code or ticket_id, optional event_id,
+               and scanned_at (naive datetime)
+
+    Returns:
+        (results, conflicts): per-scan outcome dicts for accepted scans and
+        for rejected ones. Conflict reasons are not_found, ambiguous,
+        wrong_event, inactive, already_checked_in and duplicate_entry
+        (the ticket got in twice; the earlier time is kept).
+    """
+    tickets = _lock_scanned_tickets(cursor, scans)
+    results = []
+    conflicts = []
+    earliest = {}  # ticket_id -> scan that sets check_in_time
+    for scan in scans:
+        ticket = tickets["by_id"].get(scan["ticket_id"]) if scan.get("ticket_id") else None
+        if not scan.get("ticket_id"):
+            matches = tickets["by_qr"].get(scan["qr_code"], [])
+            if scan.get("event_id") is not None:
+                scoped = [t for t in matches if t["event_id"] == scan["event_id"]]
+                matches = scoped or matches
+            if len(matches) > 1:
+                conflicts.append(_conflict(scan, "ambiguous"))
+                continue
+            ticket = matches[0] if matches else None
+        if ticket is None:
+            conflicts.append(_conflict(scan, "not_found"))
+            continue
+        if scan.get("event_id") is not None and ticket["event_id"] != scan["event_id"]:
+            conflicts.append(_conflict(scan, "wrong_event", ticket))
+            continue
+        if ticket["status"] != "active":
+            conflicts.append(_conflict(scan, "inactive", ticket))
+            continue
+        scan["ticket"] = ticket
+        best = earliest.get(ticket["ticket_id"])
+        if best is None or scan["scanned_at"] < best["scanned_at"]:
+            if best is not None:
+                results.append(_outcome(best, "merged"))
+            earliest[ticket["ticket_id"]] = scan
+        else:
+            # Same ticket scanned again later in this sync; the earliest scan stands
+            results.append(_outcome(scan, "merged"))
+
+    updates = []
+    for ticket_id, scan in earliest.items():
+        stored = scan["ticket"]["check_in_time"]
+        if stored is None:
+            updates.append(scan)
+            results.append(_outcome(scan, "checked_in"))
+        elif stored == scan["scanned_at"]:
+            results.append(_outcome(scan, "replayed"))
+        elif stored < scan["scanned_at"]:
+            conflicts.append(_conflict(scan, "already_checked_in", scan["ticket"]))
+        else:
+            # This offline scan happened before the recorded entry: keep the earlier
+            # time, but flag it, since the same ticket was admitted twice
+            updates.append(scan)
+            conflicts.append(_conflict(scan, "duplicate_entry", scan["ticket"]))
+
+    for start in range(0, len(updates), CHECKIN_SYNC_CHUNK_SIZE):
+        chunk = updates[start:start + CHECKIN_SYNC_CHUNK_SIZE]
+        cases = " ".join(["WHEN %s THEN %s"] * len(chunk))
+        ids = ", ".join(["%s"] * len(chunk))
+        params = [v for scan in chunk for v in (scan["ticket"]["ticket_id"], scan["scanned_at"])]
+        params += [scan["ticket"]["ticket_id"] for scan in chunk]
+        cursor.execute(
+            f"UPDATE tickets SET check_in_time = CASE ticket_id {cases} END WHERE ticket_id IN ({ids})",
+            params
+        )
+    changes = Counter()
+    for scan in updates:
+        ticket = scan["ticket"]
+        changes.update(ticket_changes(
+            {"event_id": ticket["event_id"], "check_in_time": ticket["check_in_time"]},
+            {"event_id": ticket["event_id"], "check_in_time": scan["scanned_at"]}
+        ))
+        ticket["check_in_time"] = scan["scanned_at"]
+    apply_changes(cursor, changes)
+    return results, conflicts
+
+
+def _lock_scanned_tickets(cursor, scans):
+    # One locking read per chunk of QR codes / ticket ids, so the checks and the
+    # UPDATE see the same rows even while online scanners keep admitting people
+    by_qr = {}
+    by_id = {}
+    columns = "ticket_id, event_id, qr_code, ticket_status, check_in_time"
+    for column, values in (
+        ("qr_code", sorted({s["qr_code"] for s in scans if not s.get("ticket_id")})),
+        ("ticket_id", sorted({s["ticket_id"] for s in scans if s.get("ticket_id")}))
+    ):
+        for start in range(0, len(values), CHECKIN_SYNC_CHUNK_SIZE):
+            chunk = values[start:start + CHECKIN_SYNC_CHUNK_SIZE]
+            cursor.execute(
+                f"SELECT {columns} FROM tickets WHERE {column} IN ({', '.join(['%s'] * len(chunk))}) "
+                "ORDER BY ticket_id FOR UPDATE",
+                chunk
+            )
+            for ticket_id, event_id, qr_code, status, check_in_time in cursor.fetchall():
+                ticket = by_id.setdefault(ticket_id, {
+                    "ticket_id": ticket_id,
+                    "event_id": event_id,
+                    "qr_code": qr_code,
+                    "status": status,
+                    "check_in_time": check_in_time
+                })
+                if column == "qr_code":
+                    by_qr.setdefault(qr_code, []).append(ticket)
+    return {"by_qr": by_qr, "by_id": by_id}
+
+
+def _outcome(scan, status):
+    return {
+        "index": scan["index"],
+        "device_id": scan.get("device_id"),
+        "ticket_id": scan["ticket"]["ticket_id"],
+        "status": status
+    }
+
+
+def _conflict(scan, reason, ticket=None):
+    conflict = {"index": scan["index"], "device_id": scan.get("device_id"), "reason": reason}
+    if ticket is not None:
+        conflict["ticket_id"] = ticket["ticket_id"]
+        conflict["event_id"] = ticket["event_id"]
+        if ticket["check_in_time"] is not None:
+            conflict["check_in_time"] = ticket["check_in_time"].strftime('%Y-%m-%d %H:%M:%S')
+    return conflict
+
+
+def preload_due_events(now=None):
+    """
+    Load hot sets for events whose VIP or general doors open within CHECKIN_PRELOAD_MINUTES
+
+    Returns:
+        List of event_ids loaded by this call
+    """
+    now = now or datetime.now()
+    door_hot_set.evict_expired()
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError("Database connection failed")
+    cursor = conn.cursor()
+    loaded = []
+    try:
+        cursor.execute(
+            "SELECT event_id FROM EVENTS WHERE event_status = 'upcoming' AND ("
+            "(vip_access_time BETWEEN %s AND %s) OR (general_access_time BETWEEN %s AND %s))",
+            (now - timedelta(hours=CHECKIN_HOT_SET_HOURS), now + timedelta(minutes=CHECKIN_PRELOAD_MINUTES)) * 2
+        )
+        for (event_id,) in cursor.fetchall():
+            if not door_hot_set.is_loaded(event_id):
+                door_hot_set.load_event(cursor, event_id)
+                loaded.append(event_id)
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+    return loaded
+
+
+_preloader = None
+_preloader_lock = threading.Lock()
+
+
+def start_preloader():
+    """Run preload_due_events() every CHECKIN_PRELOAD_INTERVAL seconds on a daemon thread"""
+    global _preloader
+    if CHECKIN_PRELOAD_INTERVAL <= 0:
+        return
+    with _preloader_lock:
+        if _preloader is not None and _preloader.is_alive():
+            return
+
+        def loop():
+            while True:
+                try:
+                    loaded = preload_due_events()
+                    if loaded:
+                        print(f"Check-in hot sets loaded for events {loaded}")
+                except Exception as e:
+                    print(f"Check-in preload failed: {e}")
+                time.sleep(CHECKIN_PRELOAD_INTERVAL)
+
+        _preloader = threading.Thread(target=loop, name="checkin-preloader", daemon=True)
+        _preloader.start()
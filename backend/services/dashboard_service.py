@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from cache import TTLCache
+from services.event_service import add_invalidation_listener, sync_invalidations
+
+# Seconds a snapshot-mode dashboard may be served from memory
+DASHBOARD_SNAPSHOT_TTL = int(os.getenv("DASHBOARD_SNAPSHOT_TTL", "30"))
+DASHBOARD_SNAPSHOT_SIZE = int(os.getenv("DASHBOARD_SNAPSHOT_SIZE", "256"))
+# Ticket statuses that don't count towards revenue
+NON_REVENUE_STATUSES = ("cancelled", "refunded")
+
+snapshot_cache = TTLCache(maxsize=DASHBOARD_SNAPSHOT_SIZE, ttl=DASHBOARD_SNAPSHOT_TTL, name="dashboards")
+# An event write can add, move or drop an event on any dashboard
+add_invalidation_listener(lambda event_id: snapshot_cache.clear())
+
+# One lock per org while its snapshot is rebuilt, so a burst of dashboard
+# loads for a big org runs the queries once
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+
+def build_dashboard(cursor, org_id, today=None):
+    """
+    Events, ticket counts, revenue and running ads for an organization
+
+    Three queries, however many events the org has: its EVENTS rows, their
+    EVENT_TICKET_STATS counters and their active ADVERTISEMENTS.
+
+    Args:
+        cursor: Dictionary cursor
+        org_id: Organization to report on
+        today: Date ads must be running on (defaults to today)
+
+    Returns:
+        dict ready for jsonify()
+    """
+    today = today or date.today()
+    cursor.execute(
+        "SELECT event_id, event_name, event_date, location, event_status, event_category, "
+        "max_attendees, ticket_price, tickets_sold, tickets_held FROM EVENTS WHERE org_id = %s ORDER BY event_date",
+        (org_id,)
+    )
+    events = []
+    by_id = {}
+    for row in cursor.fetchall():
+        event = dict(row)
+        event.update(by_status={}, by_source={}, checked_in=0, active_ads=[])
+        events.append(event)
+        by_id[event["event_id"]] = event
+
+    cursor.execute(
+        "SELECT s.event_id, s.dimension, s.bucket, s.ticket_count FROM EVENT_TICKET_STATS s "
+        "JOIN EVENTS e ON e.event_id = s.event_id WHERE e.org_id = %s",
+        (org_id,)
+    )
+    for row in cursor.fetchall():
+        event = by_id.get(row["event_id"])
+        if event is None or row["ticket_count"] <= 0:
+            continue
+        if row["dimension"] == "status":
+            event["by_status"][row["bucket"]] = row["ticket_count"]
+        elif row["dimension"] == "source":
+            event["by_source"][row["bucket"]] = row["ticket_count"]
+        elif row["dimension"] == "checked_in":
+            event["checked_in"] = row["ticket_count"]
+
+    # The schema names these ad_id / ad_type; the API calls them advertisement_id / advertisement_type
+    cursor.execute(
+        "SELECT a.ad_id AS advertisement_id, a.event_id, a.advertiser_name, a.ad_type AS advertisement_type, "
+        "a.start_date, a.end_date, a.cost "
+        "FROM ADVERTISEMENTS a JOIN EVENTS e ON e.event_id = a.event_id "
+        "WHERE e.org_id = %s AND a.status = 'active' AND a.start_date <= %s AND a.end_date >= %s",
+        (org_id, today, today)
+    )
+    for row in cursor.fetchall():
+        event = by_id.get(row["event_id"])
+        if event is not None:
+            event["active_ads"].append(row)
+
+    totals = {"events": len(events), "tickets_sold": 0, "checked_in": 0, "revenue": Decimal("0"), "active_ads": 0, "ad_spend": Decimal("0")}
+    for event in events:
+        paid = sum(count for status, count in event["by_status"].items() if status not in NON_REVENUE_STATUSES)
+        revenue = (event["ticket_price"] or Decimal("0")) * paid
+        ad_spend = sum((ad["cost"] for ad in event["active_ads"]), Decimal("0"))
+        event["revenue"] = float(revenue)
+        totals["tickets_sold"] += sum(event["by_status"].values())
+        totals["checked_in"] += event["checked_in"]
+        totals["revenue"] += revenue
+        totals["active_ads"] += len(event["active_ads"])
+        totals["ad_spend"] += ad_spend
+    totals["revenue"] = float(totals["revenue"])
+    totals["ad_spend"] = float(totals["ad_spend"])
+    return {"org_id": org_id, "totals": totals, "events": events}
+
+
+def get_snapshot(org_id, loader):
+    """
+    Cached dashboard for an org, rebuilt with loader() at most once per DASHBOARD_SNAPSHOT_TTL
+
+    Returns:
+        (dashboard, age in seconds)
+    """
+    sync_invalidations()
+    entry = snapshot_cache.get(org_id)
+    if entry is None:
+        with _build_locks_guard:
+            lock = _build_locks.setdefault(org_id, threading.Lock())
+        with lock:
+            # Another request may have finished the rebuild while we waited
+            entry = snapshot_cache.get(org_id)
+            if entry is None:
+                entry = (loader(), time.monotonic())
+                snapshot_cache.set(org_id, entry)
+    dashboard, built_at = entry
+    return dashboard, round(time.monotonic() - built_at, 3)
+
+
+def snapshot_stats():
+    return snapshot_cache.stats()
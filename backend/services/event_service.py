@@ -0,0 +1,121 @@
+import os
+from cache import TTLCache, FileInvalidationBus
+
+# Read-through cache for EVENTS rows and common event list queries
+EVENT_CACHE_SIZE = int(os.getenv("EVENT_CACHE_SIZE", "2048"))
+EVENT_CACHE_TTL = int(os.getenv("EVENT_CACHE_TTL", "30"))
+# Set to a path shared by all workers on the host to broadcast invalidations
+EVENT_CACHE_BUS_PATH = os.getenv("EVENT_CACHE_BUS_PATH")
+
+event_cache = TTLCache(maxsize=EVENT_CACHE_SIZE, ttl=EVENT_CACHE_TTL, name="events")
+_bus = FileInvalidationBus(EVENT_CACHE_BUS_PATH) if EVENT_CACHE_BUS_PATH else None
+
+# Keys are tuples whose first element is the namespace. ("event", id) holds a
+# single row; every other namespace holds a list query and is dropped on any write.
+EVENT_KEY = "event"
+# Bus message prefix for a seat count change (see invalidate_seats)
+_SEATS = "seats:"
+# Tag on every list entry that didn't say which events it holds, so any seat change drops it
+_ANY_SEATS = ("seats", None)
+
+# Callables notified with an event_id (or None for "everything") on invalidation
+_listeners = []
+
+
+def sync_invalidations():
+    """Apply invalidations published by other workers"""
+    if _bus is None:
+        return
+    messages = _bus.poll()
+    if messages is None:
+        _apply("*")
+        return
+    for message in messages:
+        _apply(message)
+
+
+def _apply(message):
+    if message.startswith(_SEATS):
+        # Only the cached rows carry tickets_sold / tickets_held; listeners don't care.
+        # No list filters or sorts on the counters, so only lists showing this event go
+        event_id = int(message[len(_SEATS):])
+        event_cache.pop((EVENT_KEY, event_id))
+        event_cache.discard_tag(("seats", event_id))
+        event_cache.discard_tag(_ANY_SEATS)
+        return
+    if message == "*":
+        event_cache.clear()
+        event_id = None
+    else:
+        event_id = int(message)
+        event_cache.pop((EVENT_KEY, event_id))
+        event_cache.discard_where(lambda key: key[0] != EVENT_KEY)
+    for listener in _listeners:
+        listener(event_id)
+
+
+def add_invalidation_listener(callback):
+    """Call callback(event_id) whenever events are invalidated; event_id is None for a full flush"""
+    _listeners.append(callback)
+
+
+def get_cached(key, loader, event_ids=None):
+    """
+    Read-through lookup in the event cache
+
+    Args:
+        key: Tuple key, namespace first (e.g. ("event", 5) or ("upcoming", 5))
+        loader: Called on a miss; its result is cached unless it is None
+        event_ids: For a list query, event_ids(value) gives the events in
+            it, so a seat change drops only the lists that show that event.
+            Without it the list is dropped on every seat change
+
+    Returns:
+        Cached or freshly loaded value
+    """
+    sync_invalidations()
+    value = event_cache.get(key)
+    if value is None:
+        value = loader()
+        if value is not None:
+            if key[0] == EVENT_KEY:
+                tags = ()
+            elif event_ids is None:
+                tags = (_ANY_SEATS,)
+            else:
+                tags = [("seats", event_id) for event_id in event_ids(value)]
+            event_cache.set(key, value, tags=tags)
+    return value
+
+
+def invalidate_events(event_id=None):
+    """
+    Drop cached data after an EVENTS write
+
+    Args:
+        event_id: Row that was inserted, updated or deleted, or None to flush everything
+    """
+    message = "*" if event_id is None else str(event_id)
+    _apply(message)
+    if _bus is not None:
+        _bus.publish(message)
+
+
+def invalidate_seats(event_id):
+    """
+    Drop cached copies of an event after its tickets_sold / tickets_held changed
+
+    Narrower than invalidate_events: the event's row and the list queries
+    that include it (which also carry the counters) go, in every worker,
+    without scanning the cache, but the listeners
+    (search index, AI replies, dashboard snapshots) are not told, so a
+    ticket sale doesn't rebuild caches that don't show seat counts.
+    """
+    message = f"{_SEATS}{event_id}"
+    _apply(message)
+    if _bus is not None:
+        _bus.publish(message)
+
+
+def cache_stats():
+    return event_cache.stats()
@@ -0,0 +1,215 @@
+import re
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+
+# Words that identify each event category (matched as whole words, plurals allowed)
+CATEGORY_KEYWORDS = {
+    'music': ['music', 'concert', 'festival', 'band', 'dj', 'song'],
+    'tech': ['tech', 'technology', 'coding', 'developer', 'startup', 'ai', 'programming', 'conference'],
+    'sports': ['sport', 'game', 'match', 'football', 'basketball', 'soccer', 'baseball', 'tournament'],
+    'food': ['food', 'cooking', 'dinner', 'restaurant', 'cuisine', 'taste', 'culinary', 'chef'],
+    'art': ['art', 'painting', 'gallery', 'exhibition', 'artist', 'craft'],
+    'culture': ['cultural', 'culture', 'performance', 'theater', 'dance', 'musical'],
+    'business': ['business', 'workshop', 'seminar', 'training', 'career', 'networking'],
+}
+
+# Venue words added to the search keywords when mentioned
+LOCATION_TERMS = ['downtown', 'park', 'center', 'hall', 'garden', 'beach']
+
+# Ceiling used for "cheap", "affordable" and friends when no amount is given
+CHEAP_MAX_PRICE = 20
+
+# Largest EVENTS.ticket_price (DECIMAL(10,2)); bigger amounts are clamped to it
+MAX_PRICE = 99999999.99
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+# Single words, plurals included: word -> (kind, value)
+_LEXICON = {}
+for _category, _words in CATEGORY_KEYWORDS.items():
+    for _word in _words:
+        _LEXICON.setdefault(_word, ('category', _category))
+        _LEXICON.setdefault(_word + 's', ('category', _category))
+for _term in LOCATION_TERMS:
+    _LEXICON[_term] = _LEXICON[_term + 's'] = ('location', _term)
+for _word in ('cheap', 'affordable', 'budget', 'inexpensive'):
+    _LEXICON[_word] = ('cheap', None)
+for _word in ('under', 'below', 'max', 'maximum'):
+    _LEXICON[_word] = ('under', None)
+for _word in ('over', 'above', 'min', 'minimum'):
+    _LEXICON[_word] = ('over', None)
+for _word in ['today', 'tonight', 'tomorrow'] + WEEKDAYS:
+    _LEXICON[_word] = ('date', _word)
+_LEXICON['free'] = ('free', None)
+_LEXICON['between'] = _LEXICON['from'] = ('between', None)
+_LEXICON['to'] = _LEXICON['-'] = ('range', None)
+
+# Multi-word phrases, keyed by their first word: [(remaining words, kind, value)], longest first
+_PHRASES = {}
+for _phrase, _kind in [
+    ('no more than', 'under'), ('less than', 'under'), ('cheaper than', 'under'), ('up to', 'under'),
+    ('at most', 'under'), ('more than', 'over'), ('at least', 'over'), ('no cost', 'free'), ('zero price', 'free'),
+] + [(f'{prefix} {period}', 'date') for prefix in ('this', 'next') for period in ('weekend', 'week', 'month')] \
+  + [(f'{prefix} {day}', 'date') for prefix in ('this', 'next', 'on') for day in WEEKDAYS]:
+    _first, *_rest = _phrase.split()
+    _PHRASES.setdefault(_first, []).append((tuple(_rest), _kind, _phrase if _kind == 'date' else None))
+for _entries in _PHRASES.values():
+    _entries.sort(key=lambda entry: -len(entry[0]))
+
+# One lookup per token: word -> (phrases starting with it, single-word meaning)
+_TRIGGERS = {word: (_PHRASES.get(word, ()), _LEXICON.get(word, (None, None))) for word in set(_LEXICON) | set(_PHRASES)}
+
+# Tokenizing with str.translate() + split() runs in C and is several times
+# faster than re.findall() on chat-length messages. Everything but letters,
+# digits, "$" and "." becomes a space, and "-" is split off so "$10-$40"
+# reads as three tokens.
+_TOKEN_TABLE = str.maketrans(
+    {chr(c): ' ' for c in range(128) if not (chr(c).isalnum() or chr(c) in '$.-')} | {'-': ' - '}
+)
+_AMOUNT_RE = re.compile(r"\$?\d+(?:\.\d+)?")
+_RANGE_SEPARATORS = ('and', 'to', '-')
+
+
+def _tokenize(message):
+    # A "." only survives inside amounts like 15.50; sentence-final ones are dropped
+    return (message.lower().translate(_TOKEN_TABLE) + ' ').replace('. ', ' ').split()
+
+
+@lru_cache(maxsize=256)
+def _date_window(hint, today):
+    """Turn a date phrase into a [date_from, date_to) window of whole days"""
+    if hint in ("today", "tonight"):
+        return today, today + timedelta(days=1)
+    if hint == "tomorrow":
+        return today + timedelta(days=1), today + timedelta(days=2)
+    if hint.endswith("weekend"):
+        if today.weekday() == 6:
+            # Sunday is still this weekend (what's left of it); the next one starts on Saturday
+            if hint.startswith("next"):
+                return today + timedelta(days=6), today + timedelta(days=8)
+            return today, today + timedelta(days=1)
+        saturday = today + timedelta(days=(5 - today.weekday()) % 7)
+        if hint.startswith("next"):
+            saturday += timedelta(days=7)
+        return saturday, saturday + timedelta(days=2)
+    if hint.endswith("week"):
+        monday = today - timedelta(days=today.weekday())
+        if hint.startswith("next"):
+            return monday + timedelta(days=7), monday + timedelta(days=14)
+        return today, monday + timedelta(days=7)
+    if hint.endswith("month"):
+        first_next = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+        if hint.startswith("next"):
+            return first_next, (first_next + timedelta(days=32)).replace(day=1)
+        return today, first_next
+    # A weekday: its next occurrence (today counts), or the one after for "next <day>"
+    day = WEEKDAYS.index(hint.split()[-1])
+    start = today + timedelta(days=(day - today.weekday()) % 7)
+    if hint.startswith("next") and start == today:
+        start += timedelta(days=7)
+    return start, start + timedelta(days=1)
+
+
+def _date_range(hint, now):
+    # Windows are cached per day; only the part of today already gone is trimmed off
+    date_from, date_to = _date_window(hint, datetime.combine(now.date(), time.min))
+    return max(date_from, now), date_to
+
+
+def parse_intent(message, now=None):
+    """
+    Extract search parameters from a chat message
+
+    The message is split into words and amounts in one pass and only the
+    tokens found in the trigger table are examined further, so the cost is linear in
+    the message length no matter how many keywords we know about. Whole
+    words only: "ai" no longer matches "again", nor "art" "party".
+
+    Args:
+        message: User's chat message
+        now: Reference time for relative dates (defaults to datetime.now())
+
+    Returns:
+        dict with keywords, event_type, min_price, max_price, date_from,
+        date_to, date_label and locations
+    """
+    params = {
+        'keywords': [],
+        'max_price': None,
+        'min_price': None,
+        'event_type': None,
+        'date_from': None,
+        'date_to': None,
+        'date_label': None,
+        'locations': []
+    }
+    cheap = False
+    free = False
+
+    tokens = _tokenize(message)
+    count = len(tokens)
+    consumed = 0
+    # Most tokens mean nothing to us; only visit the ones that might
+    for i in [i for i, token in enumerate(tokens) if token in _TRIGGERS]:
+        if i < consumed:
+            continue
+        phrases, (kind, value) = _TRIGGERS[tokens[i]]
+        end = i + 1
+        for rest, phrase_kind, phrase_value in phrases:
+            if tuple(tokens[end:end + len(rest)]) == rest:
+                kind, value = phrase_kind, phrase_value
+                end += len(rest)
+                break
+
+        if kind == 'range':
+            # "$10-$40" / "10 to $40": an amount, a separator, then a dollar amount
+            if i and end < count and tokens[end][0] == '$' and _is_amount(tokens[i - 1]) and _is_amount(tokens[end]):
+                _set_range(params, tokens[i - 1], tokens[end])
+                end += 1
+        elif kind == 'between':
+            if end + 2 < count and _is_amount(tokens[end]) and tokens[end + 1] in _RANGE_SEPARATORS and _is_amount(tokens[end + 2]):
+                _set_range(params, tokens[end], tokens[end + 2])
+                end += 3
+        elif kind in ('under', 'over'):
+            if end < count and _is_amount(tokens[end]):
+                params['max_price' if kind == 'under' else 'min_price'] = _price(tokens[end])
+                end += 1
+        elif kind == 'free':
+            free = True
+        elif kind == 'cheap':
+            cheap = True
+        elif kind == 'date':
+            if params['date_label'] is None:
+                params['date_label'] = value
+                params['date_from'], params['date_to'] = _date_range(value, now or datetime.now())
+        elif kind == 'category':
+            if params['event_type'] is None:
+                params['event_type'] = value
+                params['keywords'].extend(CATEGORY_KEYWORDS[value][:2])
+        elif kind == 'location':
+            if value not in params['locations']:
+                params['locations'].append(value)
+        consumed = end
+
+    # Explicit amounts beat "free"/"cheap"; "free" beats "cheap"
+    if params['max_price'] is None and params['min_price'] is None:
+        if free:
+            params['max_price'] = 0
+        elif cheap:
+            params['max_price'] = CHEAP_MAX_PRICE
+    params['keywords'].extend(params['locations'])
+    return params
+
+
+def _is_amount(token):
+    return _AMOUNT_RE.fullmatch(token) is not None
+
+
+def _price(token):
+    # float() of a long run of digits is inf, which int() can't take
+    value = min(float(token.lstrip('$')), MAX_PRICE)
+    return int(value) if value == int(value) else value
+
+
+def _set_range(params, low, high):
+    params['min_price'], params['max_price'] = sorted((_price(low), _price(high)))
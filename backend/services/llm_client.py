@@ -0,0 +1,424 @@
+import hashlib
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# Calls allowed in flight to the provider at once, per process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# Longest a request waits for a free slot before taking the template reply
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "0.5"))
+# Longest a request waits for the provider's answer
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "8"))
+# Consecutive failures that open the breaker, and how long it stays open
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+# Chunks a streamed reply may run ahead of the client reading it
+LLM_STREAM_BUFFER = int(os.getenv("LLM_STREAM_BUFFER", "64"))
+
+
+class LLMUnavailable(Exception):
+    """The call was not made or did not finish; use the template reply"""
+
+
+class _ReaderGone(Exception):
+    """The client stopped reading a stream; not the provider's fault"""
+
+
+class GeminiBackend:
+    """google.generativeai behind the backend interface: generate(prompt, timeout) -> text"""
+
+    name = "gemini"
+
+    def __init__(self, model_name=GEMINI_MODEL):
+        import google.generativeai as genai
+        self._model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt, timeout):
+        response = self._model.generate_content(prompt, request_options={"timeout": timeout})
+        return response.text
+
+    def stream(self, prompt, timeout):
+        for part in self._model.generate_content(prompt, stream=True, request_options={"timeout": timeout}):
+            yield part.text
+
+
+class StubBackend:
+    """
+    Deterministic offline backend for load and latency tests
+
+    The reply and the simulated latency are both derived from a hash of the
+    prompt, so a run is repeatable. `failure_rate` makes that share of
+    prompts raise, and `slow_rate` makes that share take `slow_latency`.
+
+    Args:
+        latency: Base seconds per call
+        jitter: Extra seconds spread over prompts (0..jitter)
+        failure_rate: Fraction of prompts that raise RuntimeError
+        slow_rate: Fraction of prompts that take slow_latency instead
+        slow_latency: Seconds for the slow prompts
+    """
+
+    name = "stub"
+
+    def __init__(self, latency=0.05, jitter=0.02, failure_rate=0.0, slow_rate=0.0, slow_latency=2.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.calls = 0
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, timeout):
+        return "".join(self.stream(prompt, timeout))
+
+    def stream(self, prompt, timeout):
+        """Yield the reply a word at a time, spreading the simulated latency across the words"""
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        roll = digest[0] / 255
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            if roll < self.failure_rate:
+                time.sleep(self.latency)
+                raise RuntimeError("stub backend failure")
+            if roll >= 1 - self.slow_rate:
+                delay = self.slow_latency
+            else:
+                delay = self.latency + self.jitter * digest[1] / 255
+            words = f"[stub {digest[:4].hex()}] {prompt.strip().splitlines()[-1]}".split(" ")
+            for i, word in enumerate(words):
+                time.sleep(delay / len(words))
+                yield word if i == len(words) - 1 else word + " "
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing provider for a while
+
+    closed: calls go through. After `threshold` consecutive failures it
+    opens and every call is refused for `reset_timeout` seconds, then one
+    trial call is let through (half-open); its outcome closes or re-opens it.
+    """
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, reset_timeout=LLM_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self.opens = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                if self._opened_at is None or self._trial:
+                    self.opens += 1
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+    def release_trial(self):
+        """Give back a half-open trial whose call ended without an outcome, so the next call can try"""
+        with self._lock:
+            self._trial = False
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+
+class LLMClient:
+    """
+    Bounded, fail-fast front door to a text generation backend
+
+    - At most `max_concurrency` provider calls run at once, on a private
+      thread pool; a request that can't get a slot within `queue_timeout`
+      gets the fallback instead of piling up behind the others.
+    - Each request waits at most `timeout` for its answer. A call that
+      overruns keeps its slot until the provider returns, so slow calls
+      can't push concurrency past the limit.
+    - Identical prompts already in flight share one provider call.
+    - Failures and timeouts feed a CircuitBreaker; while it is open the
+      fallback is returned without calling the provider.
+
+    Args:
+        backend: Object with generate(prompt, timeout) -> str
+        max_concurrency: Provider calls in flight at once
+        timeout: Seconds a caller waits for an answer
+        queue_timeout: Seconds a caller waits for a free slot
+        breaker: CircuitBreaker (a default one is made if omitted)
+    """
+
+    def __init__(self, backend, max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT,
+                 queue_timeout=LLM_QUEUE_TIMEOUT, breaker=None):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._counters = {
+            "calls": 0, "streams": 0, "coalesced": 0, "successes": 0, "failures": 0,
+            "timeouts": 0, "rejected_busy": 0, "rejected_open": 0, "abandoned": 0
+        }
+
+    def generate(self, prompt, fallback):
+        """
+        Generate text for `prompt`, or return fallback() if the provider can't answer in time
+
+        Returns:
+            (text, used_llm)
+        """
+        try:
+            return self._call(prompt), True
+        except LLMUnavailable:
+            return fallback(), False
+
+    def stream(self, prompt, fallback, chunker=None):
+        """
+        Stream text for `prompt` as the provider produces it
+
+        Shares the concurrency slots and circuit breaker with generate(),
+        but not coalescing: each stream is its own provider call. The
+        provider is read on the private pool into a buffer of at most
+        LLM_STREAM_BUFFER chunks, and the slot is released as soon as the
+        provider is done, not when the HTTP client has read the last chunk.
+        A client that disconnects, or stops reading until the deadline,
+        ends the read early. If the call can't start or fails before its
+        first chunk, the fallback text is streamed instead (split by
+        `chunker`, if given). A failure after text has been sent ends the
+        stream with an empty ("", False) chunk.
+
+        Yields:
+            (chunk, used_llm)
+        """
+        use_fallback = True
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count("rejected_busy")
+        elif not self.breaker.allow():
+            self._slots.release()
+            self._count("rejected_open")
+        else:
+            self._count("streams")
+            deadline = time.monotonic() + self.timeout
+            buffer = queue.Queue()
+            credits = threading.Semaphore(LLM_STREAM_BUFFER)
+            gone = threading.Event()
+            # From here the slot belongs to _pump, which releases it when the provider is done
+            try:
+                self._executor.submit(self._pump, prompt, buffer, credits, gone, deadline)
+            except RuntimeError:
+                # Pool shut down: the call never started, so hand back the slot and any trial
+                self._slots.release()
+                self.breaker.release_trial()
+                buffer.put((None, LLMUnavailable("shutting down")))
+            try:
+                while True:
+                    try:
+                        chunk, error = buffer.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        # The provider went quiet past the deadline; _pump records it when it returns
+                        chunk, error = None, LLMUnavailable("timed out")
+                    if chunk is None:
+                        if error is not None and not use_fallback:
+                            # Cut off mid-reply: flag the text as not the model's complete answer
+                            yield "", False
+                        break
+                    credits.release()
+                    use_fallback = False
+                    yield chunk, True
+            finally:
+                gone.set()
+        if use_fallback:
+            text = fallback()
+            for chunk in (chunker(text) if chunker else [text]):
+                yield chunk, False
+
+    def _pump(self, prompt, buffer, credits, gone, deadline):
+        """Read one streamed reply into `buffer`, then release the stream's slot and post (None, error)"""
+        error = None
+        chunks = None
+        try:
+            chunks = self.backend.stream(prompt, self.timeout)
+            for chunk in chunks:
+                if time.monotonic() > deadline:
+                    self._count("timeouts")
+                    raise LLMUnavailable("timed out")
+                # Wait for the client to make room in the buffer, but not forever
+                while not credits.acquire(timeout=0.05):
+                    if gone.is_set() or time.monotonic() > deadline:
+                        raise _ReaderGone()
+                if gone.is_set():
+                    raise _ReaderGone()
+                buffer.put((chunk, None))
+        except _ReaderGone as e:
+            error = e
+            self._count("abandoned")
+            # Says nothing about the provider, but may have been the half-open trial
+            self.breaker.release_trial()
+        except Exception as e:
+            error = e
+            self._count("failures")
+            self.breaker.record_failure()
+        else:
+            self._count("successes")
+            self.breaker.record_success()
+        finally:
+            self._slots.release()
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                pass
+        buffer.put((None, error))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._in_flight)
+        stats["backend"] = self.backend.name
+        stats["max_concurrency"] = self.max_concurrency
+        stats["breaker"] = self.breaker.state
+        stats["breaker_opens"] = self.breaker.opens
+        return stats
+
+    def reset(self):
+        """New pool for a forked worker (the parent's threads don't survive fork)"""
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm")
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _call(self, prompt):
+        with self._lock:
+            future = self._in_flight.get(prompt)
+            if future is not None:
+                self._counters["coalesced"] += 1
+        if future is None:
+            future = self._start(prompt)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self._count("timeouts")
+            raise LLMUnavailable("timed out")
+        except LLMUnavailable:
+            raise
+        except Exception as e:
+            raise LLMUnavailable(str(e))
+
+    def _start(self, prompt):
+        # Take a slot before asking the breaker, so a busy pool never uses up its half-open trial
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count("rejected_busy")
+            raise LLMUnavailable("all slots busy")
+        if not self.breaker.allow():
+            self._slots.release()
+            self._count("rejected_open")
+            raise LLMUnavailable("circuit open")
+
+        with self._lock:
+            # Someone may have started the same prompt while we waited for a slot
+            future = self._in_flight.get(prompt)
+            if future is not None:
+                self._counters["coalesced"] += 1
+                self._slots.release()
+                return future
+            future = Future()
+            self._in_flight[prompt] = future
+            self._counters["calls"] += 1
+
+        self._executor.submit(self._run, prompt, future)
+        return future
+
+    def _run(self, prompt, future):
+        started = time.monotonic()
+        try:
+            text = self.backend.generate(prompt, self.timeout)
+        except Exception as e:
+            self._finish(prompt, future, error=e)
+            return
+        if time.monotonic() - started > self.timeout:
+            # The callers already gave up; don't let a slow provider look healthy
+            self._finish(prompt, future, error=LLMUnavailable("provider exceeded timeout"))
+            return
+        self._finish(prompt, future, text=text)
+
+    def _finish(self, prompt, future, text=None, error=None):
+        with self._lock:
+            self._in_flight.pop(prompt, None)
+            self._counters["failures" if error else "successes"] += 1
+        self._slots.release()
+        if error is None:
+            self.breaker.record_success()
+            future.set_result(text)
+        else:
+            self.breaker.record_failure()
+            future.set_exception(error)
+
+
+def build_client():
+    """
+    Client for the configured backend, or None when replies stay templated
+
+    LLM_BACKEND picks it: "gemini" (the default when GEMINI_API_KEY is set),
+    "stub" for offline testing, or "none".
+    """
+    choice = os.getenv("LLM_BACKEND", "gemini" if os.getenv("GEMINI_API_KEY") else "none").lower()
+    if choice == "stub":
+        return LLMClient(StubBackend(
+            latency=float(os.getenv("LLM_STUB_LATENCY", "0.05")),
+            failure_rate=float(os.getenv("LLM_STUB_FAILURE_RATE", "0"))
+        ))
+    if choice == "gemini":
+        try:
+            return LLMClient(GeminiBackend())
+        except Exception as e:
+            print(f"Gemini backend unavailable, using templated replies: {e}")
+    return None
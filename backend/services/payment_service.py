@@ -0,0 +1,347 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from database import get_db_connection
+
+# Payments rolled up per transaction
+ROLLUP_BATCH_SIZE = int(os.getenv("ROLLUP_BATCH_SIZE", "5000"))
+# Payments younger than this wait for the next pass, so one that commits late
+# under a lower payment_id isn't skipped by the high-water mark
+ROLLUP_SETTLE_SECONDS = int(os.getenv("ROLLUP_SETTLE_SECONDS", "60"))
+# Seconds between background rollup passes; 0 disables the background job
+ROLLUP_INTERVAL = int(os.getenv("ROLLUP_INTERVAL", "60"))
+# Dirty hours recomputed per transaction
+ROLLUP_DIRTY_BATCH = 100
+ROLLUP_UPSERT_CHUNK = 500
+ROLLUP_NAME = "revenue"
+
+GRANULARITIES = {"hour": "h", "day": "d"}
+DIMENSIONS = ("payment_method", "status", "is_vip")
+
+# REVENUE_ROLLUPS holds hourly ('h') and daily ('d') sums of PAYMENTS by
+# payment_method, status and the payer's is_vip flag (as it was when the
+# payment was rolled up). New payments are added from the high-water mark in
+# ROLLUP_STATE; edits and deletes of rolled-up payments mark their hour in
+# REVENUE_ROLLUP_DIRTY, and the next pass recomputes that hour and its day.
+# Every pass locks the ROLLUP_STATE row first, so workers never double count.
+
+# No is_vip here: PAYMENTS only knows the payer's current flag, and rollups
+# keep the one from rollup time, so the consistency check sums over it
+_RAW_HOURLY_SQL = (
+    "SELECT DATE_FORMAT(payment_date, '%%Y-%%m-%%d %%H:00:00') AS hour, payment_method, COALESCE(status, ''), "
+    "COUNT(*), SUM(amount), SUM(platform_fee) "
+    "FROM PAYMENTS "
+    "WHERE payment_date >= %s AND payment_date < %s AND payment_id <= %s "
+    "GROUP BY hour, payment_method, COALESCE(status, '')"
+)
+
+
+def mark_dirty(cursor, payment_date):
+    """Queue the hour of an edited or deleted payment for recomputation, in the caller's transaction"""
+    if payment_date is not None:
+        cursor.execute("INSERT IGNORE INTO REVENUE_ROLLUP_DIRTY (bucket_start) VALUES (%s)", (_hour(payment_date),))
+
+
+def update_rollups():
+    """
+    Roll new payments into REVENUE_ROLLUPS, then recompute dirty hours
+
+    Returns:
+        dict with payments rolled up, hours recomputed and the high-water mark
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError("Database connection failed")
+    cursor = conn.cursor()
+    rolled = 0
+    recomputed = 0
+    try:
+        while True:
+            count, last_payment_id = _roll_batch(cursor)
+            conn.commit()
+            rolled += count
+            if count < ROLLUP_BATCH_SIZE:
+                break
+        while True:
+            count = _recompute_dirty(cursor)
+            conn.commit()
+            recomputed += count
+            if count < ROLLUP_DIRTY_BATCH:
+                break
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return {"payments": rolled, "dirty_hours": recomputed, "last_payment_id": last_payment_id}
+
+
+def backfill():
+    """
+    Rebuild every rollup from PAYMENTS
+
+    Clears the rollups and the high-water mark, then rolls up the whole
+    table in ROLLUP_BATCH_SIZE batches. Reports read partial numbers until
+    it finishes.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError("Database connection failed")
+    cursor = conn.cursor()
+    try:
+        _lock_state(cursor)
+        cursor.execute("DELETE FROM REVENUE_ROLLUPS")
+        cursor.execute("DELETE FROM REVENUE_ROLLUP_DIRTY")
+        cursor.execute(
+            "UPDATE ROLLUP_STATE SET last_payment_id = 0, last_payment_date = NULL WHERE name = %s",
+            (ROLLUP_NAME,)
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return update_rollups()
+
+
+def query_rollups(cursor, granularity, start, end, group_by=DIMENSIONS):
+    """
+    Rollup buckets in [start, end), summed over the dimensions not in group_by
+
+    Returns:
+        (buckets, totals); money values are Decimals
+    """
+    cursor.execute(
+        "SELECT bucket_start, payment_method, status, is_vip, payments, amount, platform_fee FROM REVENUE_ROLLUPS "
+        "WHERE granularity = %s AND bucket_start >= %s AND bucket_start < %s ORDER BY bucket_start",
+        (GRANULARITIES[granularity], start, end)
+    )
+    buckets = {}
+    totals = {"payments": 0, "amount": Decimal("0"), "platform_fee": Decimal("0")}
+    for bucket_start, method, status, is_vip, payments, amount, fee in cursor.fetchall():
+        values = {"payment_method": method, "status": status, "is_vip": bool(is_vip)}
+        key = (bucket_start,) + tuple(values[d] for d in group_by)
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = {"bucket_start": bucket_start.strftime('%Y-%m-%d %H:%M:%S')}
+            bucket.update((d, values[d]) for d in group_by)
+            bucket.update(payments=0, amount=Decimal("0"), platform_fee=Decimal("0"))
+        for target in (bucket, totals):
+            target["payments"] += payments
+            target["amount"] += amount
+            target["platform_fee"] += fee
+    return list(buckets.values()), totals
+
+
+def check_consistency(cursor, start, end, repair=False):
+    """
+    Compare rollups in [start, end) (whole days) with a fresh aggregate of PAYMENTS
+
+    Only payments up to the high-water mark are compared, per bucket,
+    payment_method and status. is_vip is left out: a payer whose flag
+    changed after rollup would otherwise show up as a mismatch. With repair=True
+    every mismatched hour (or the first hour of a mismatched day) is queued
+    in REVENUE_ROLLUP_DIRTY for the next pass; the caller commits.
+
+    Returns:
+        dict with the hours and days that don't match
+    """
+    start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = end.replace(hour=0, minute=0, second=0, microsecond=0)
+    if end <= start:
+        end = start + timedelta(days=1)
+    cursor.execute("SELECT last_payment_id FROM ROLLUP_STATE WHERE name = %s", (ROLLUP_NAME,))
+    row = cursor.fetchone()
+    last_payment_id = row[0] if row else 0
+
+    raw = {"h": {}, "d": {}}
+    cursor.execute(_RAW_HOURLY_SQL, (start, end, last_payment_id))
+    for hour, method, status, payments, amount, fee in cursor.fetchall():
+        hour = _parse_hour(hour)
+        for key in (("h", hour), ("d", _day(hour))):
+            bucket = raw[key[0]].setdefault((key[1], method, status), [0, Decimal("0"), Decimal("0")])
+            bucket[0] += payments
+            bucket[1] += amount
+            bucket[2] += fee
+
+    stored = {"h": {}, "d": {}}
+    cursor.execute(
+        "SELECT granularity, bucket_start, payment_method, status, payments, amount, platform_fee FROM REVENUE_ROLLUPS "
+        "WHERE granularity IN ('h', 'd') AND bucket_start >= %s AND bucket_start < %s",
+        (start, end)
+    )
+    for granularity, bucket_start, method, status, payments, amount, fee in cursor.fetchall():
+        if payments or amount or fee:
+            bucket = stored[granularity].setdefault((bucket_start, method, status), [0, Decimal("0"), Decimal("0")])
+            bucket[0] += payments
+            bucket[1] += amount
+            bucket[2] += fee
+
+    mismatched = {}
+    for granularity in ("h", "d"):
+        keys = set(raw[granularity]) | set(stored[granularity])
+        mismatched[granularity] = sorted({key[0] for key in keys
+                                          if raw[granularity].get(key) != stored[granularity].get(key)})
+    if repair:
+        for bucket_start in sorted(set(mismatched["h"]) | set(mismatched["d"])):
+            mark_dirty(cursor, bucket_start)
+    return {
+        "start": start.strftime('%Y-%m-%d'),
+        "end": end.strftime('%Y-%m-%d'),
+        "last_payment_id": last_payment_id,
+        "consistent": not mismatched["h"] and not mismatched["d"],
+        "mismatched_hours": [h.strftime('%Y-%m-%d %H:%M:%S') for h in mismatched["h"]],
+        "mismatched_days": [d.strftime('%Y-%m-%d') for d in mismatched["d"]],
+        "repair_queued": bool(repair and (mismatched["h"] or mismatched["d"]))
+    }
+
+
+def rollup_status(cursor):
+    """High-water mark, payments not rolled up yet and hours waiting for recomputation"""
+    cursor.execute("SELECT last_payment_id, last_payment_date, updated_at FROM ROLLUP_STATE WHERE name = %s", (ROLLUP_NAME,))
+    row = cursor.fetchone()
+    last_payment_id, last_payment_date, updated_at = row if row else (0, None, None)
+    cursor.execute("SELECT MAX(payment_id) FROM PAYMENTS")
+    newest = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT COUNT(*) FROM REVENUE_ROLLUP_DIRTY")
+    dirty = cursor.fetchone()[0]
+    return {
+        "last_payment_id": last_payment_id,
+        "last_payment_date": last_payment_date.strftime('%Y-%m-%d %H:%M:%S') if last_payment_date else None,
+        "updated_at": updated_at.strftime('%Y-%m-%d %H:%M:%S') if updated_at else None,
+        "payment_ids_behind": max(newest - last_payment_id, 0),
+        "dirty_hours": dirty
+    }
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_rollup_worker():
+    """Run update_rollups() every ROLLUP_INTERVAL seconds on a daemon thread"""
+    global _worker
+    if ROLLUP_INTERVAL <= 0:
+        return
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+
+        def loop():
+            while True:
+                time.sleep(ROLLUP_INTERVAL)
+                try:
+                    update_rollups()
+                except Exception as e:
+                    print(f"Revenue rollup failed: {e}")
+
+        _worker = threading.Thread(target=loop, name="revenue-rollups", daemon=True)
+        _worker.start()
+
+
+def _lock_state(cursor):
+    cursor.execute("SELECT last_payment_id FROM ROLLUP_STATE WHERE name = %s FOR UPDATE", (ROLLUP_NAME,))
+    row = cursor.fetchone()
+    if row is None:
+        raise RuntimeError("ROLLUP_STATE has no 'revenue' row; run python migrate.py upgrade")
+    return row[0]
+
+
+def _roll_batch(cursor):
+    # Add payments past the high-water mark, stopping at the first one that hasn't settled
+    last_payment_id = _lock_state(cursor)
+    cursor.execute("SELECT NOW() - INTERVAL %s SECOND", (ROLLUP_SETTLE_SECONDS,))
+    cutoff = cursor.fetchone()[0]
+    cursor.execute(
+        "SELECT p.payment_id, p.payment_date, p.payment_method, COALESCE(p.status, ''), COALESCE(u.is_vip, FALSE), "
+        "p.amount, p.platform_fee FROM PAYMENTS p LEFT JOIN USERS u ON u.user_id = p.user_id "
+        "WHERE p.payment_id > %s ORDER BY p.payment_id LIMIT %s",
+        (last_payment_id, ROLLUP_BATCH_SIZE)
+    )
+    rows = cursor.fetchall()
+    groups = {}
+    count = 0
+    last_payment_date = None
+    for payment_id, payment_date, method, status, is_vip, amount, fee in rows:
+        if payment_date is None or payment_date > cutoff:
+            break
+        hour = _hour(payment_date)
+        for key in (("h", hour, method, status, bool(is_vip)), ("d", _day(hour), method, status, bool(is_vip))):
+            bucket = groups.setdefault(key, [0, Decimal("0"), Decimal("0")])
+            bucket[0] += 1
+            bucket[1] += amount
+            bucket[2] += fee
+        last_payment_id, last_payment_date = payment_id, payment_date
+        count += 1
+    if not count:
+        return 0, last_payment_id
+
+    items = sorted(groups.items())
+    for start in range(0, len(items), ROLLUP_UPSERT_CHUNK):
+        chunk = items[start:start + ROLLUP_UPSERT_CHUNK]
+        cursor.execute(
+            "INSERT INTO REVENUE_ROLLUPS (granularity, bucket_start, payment_method, status, is_vip, payments, amount, platform_fee) "
+            f"VALUES {', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s)'] * len(chunk))} "
+            "ON DUPLICATE KEY UPDATE payments = payments + VALUES(payments), amount = amount + VALUES(amount), "
+            "platform_fee = platform_fee + VALUES(platform_fee)",
+            [v for key, totals in chunk for v in (*key, *totals)]
+        )
+    cursor.execute(
+        "UPDATE ROLLUP_STATE SET last_payment_id = %s, last_payment_date = %s WHERE name = %s",
+        (last_payment_id, last_payment_date, ROLLUP_NAME)
+    )
+    # A short batch means we caught up (or stopped at an unsettled payment)
+    return count, last_payment_id
+
+
+def _recompute_dirty(cursor):
+    # Rebuild queued hours from PAYMENTS, then their days from the hourly rows
+    last_payment_id = _lock_state(cursor)
+    cursor.execute(
+        "SELECT bucket_start FROM REVENUE_ROLLUP_DIRTY ORDER BY bucket_start LIMIT %s FOR UPDATE",
+        (ROLLUP_DIRTY_BATCH,)
+    )
+    hours = [row[0] for row in cursor.fetchall()]
+    if not hours:
+        return 0
+    for hour in hours:
+        cursor.execute("DELETE FROM REVENUE_ROLLUPS WHERE granularity = 'h' AND bucket_start = %s", (hour,))
+        cursor.execute(
+            "INSERT INTO REVENUE_ROLLUPS (granularity, bucket_start, payment_method, status, is_vip, payments, amount, platform_fee) "
+            "SELECT 'h', %s, p.payment_method, COALESCE(p.status, ''), COALESCE(u.is_vip, FALSE), COUNT(*), SUM(p.amount), SUM(p.platform_fee) "
+            "FROM PAYMENTS p LEFT JOIN USERS u ON u.user_id = p.user_id "
+            "WHERE p.payment_date >= %s AND p.payment_date < %s AND p.payment_id <= %s "
+            "GROUP BY p.payment_method, COALESCE(p.status, ''), COALESCE(u.is_vip, FALSE)",
+            (hour, hour, hour + timedelta(hours=1), last_payment_id)
+        )
+    for day in sorted({_day(hour) for hour in hours}):
+        cursor.execute("DELETE FROM REVENUE_ROLLUPS WHERE granularity = 'd' AND bucket_start = %s", (day,))
+        cursor.execute(
+            "INSERT INTO REVENUE_ROLLUPS (granularity, bucket_start, payment_method, status, is_vip, payments, amount, platform_fee) "
+            "SELECT 'd', %s, payment_method, status, is_vip, SUM(payments), SUM(amount), SUM(platform_fee) FROM REVENUE_ROLLUPS "
+            "WHERE granularity = 'h' AND bucket_start >= %s AND bucket_start < %s "
+            "GROUP BY payment_method, status, is_vip",
+            (day, day, day + timedelta(days=1))
+        )
+    cursor.execute(
+        f"DELETE FROM REVENUE_ROLLUP_DIRTY WHERE bucket_start IN ({', '.join(['%s'] * len(hours))})",
+        hours
+    )
+    return len(hours)
+
+
+def _hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _day(value):
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _parse_hour(value):
+    return value if isinstance(value, datetime) else datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,362 @@
+import bisect
+import heapq
+import os
+import re
+import threading
+from database import get_db_connection
+from services.event_service import add_invalidation_listener
+
+# Weight of a keyword hit in each indexed field
+FIELD_WEIGHTS = {
+    "event_name": 3.0,
+    "event_category": 2.0,
+    "location": 2.0,
+    "event_description": 1.0
+}
+# Most vocabulary terms a single prefix keyword may expand to
+MAX_PREFIX_EXPANSION = int(os.getenv("SEARCH_MAX_PREFIX_EXPANSION", "64"))
+# Rows per fetchmany() while building from MySQL
+BUILD_CHUNK_SIZE = 5000
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+class EventSearchIndex:
+    """
+    In-memory inverted index over EVENTS for chat search
+
+    Keywords match any indexed token that starts with them (so "tech"
+    still finds "technology", like the old LIKE '%tech%' did for prefixes),
+    and results are ranked by summed field weights, then by event date.
+
+    Each token keeps a posting list sorted best-first, so a query reads
+    only the head of each list and stops as soon as no unread event could
+    beat the current top `limit` (Fagin's threshold algorithm). Queries
+    without keywords walk a date-ordered list of upcoming events. Neither
+    path touches every event.
+
+    A full rebuild is loaded into a fresh index without holding the lock
+    and swapped in at the end, so searches keep reading the old contents
+    meanwhile instead of waiting for the whole load.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # One refresh at a time; searches that find one running use the current contents
+        self._refresh_lock = threading.Lock()
+        self._docs = {}          # event_id -> event row
+        self._dates = {}         # event_id -> sortable event date
+        self._postings = {}      # token -> {event_id: score}, for random access
+        self._ranked = {}        # token -> [(-score, date, event_id)] sorted, built lazily
+        self._doc_tokens = {}    # event_id -> set of tokens, for removal
+        self._vocab = []         # sorted tokens, for prefix lookups
+        self._upcoming = []      # sorted (event_date, event_id) of upcoming events
+        self._dirty = set()
+        self._needs_rebuild = True
+        self.ready = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    def build(self, events):
+        """
+        Replace the index contents with `events` (any iterable of event rows)
+
+        Changes marked while the new contents load stay pending for the
+        next refresh().
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            needs_rebuild, self._needs_rebuild = self._needs_rebuild, False
+        fresh = EventSearchIndex()
+        try:
+            for event in events:
+                fresh._add(event)
+        except Exception:
+            with self._lock:
+                self._dirty |= dirty
+                self._needs_rebuild = self._needs_rebuild or needs_rebuild
+            raise
+        fresh._vocab = sorted(fresh._postings)
+        fresh._upcoming.sort()
+        with self._lock:
+            self._docs, self._dates, self._postings = fresh._docs, fresh._dates, fresh._postings
+            self._ranked, self._doc_tokens = fresh._ranked, fresh._doc_tokens
+            self._vocab, self._upcoming = fresh._vocab, fresh._upcoming
+            self.ready = True
+
+    def build_from_database(self):
+        """Load every event from MySQL, streaming rows with fetchmany()"""
+        conn = get_db_connection()
+        if not conn:
+            raise ConnectionError("Database connection failed")
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        cursor.execute("SELECT * FROM EVENTS")
+
+        def rows():
+            while True:
+                batch = cursor.fetchmany(BUILD_CHUNK_SIZE)
+                if not batch:
+                    break
+                yield from batch
+
+        try:
+            self.build(rows())
+        finally:
+            cursor.close()
+            conn.close()
+
+    def upsert(self, event):
+        """Add or replace one event"""
+        with self._lock:
+            self._remove(event["event_id"])
+            for token in self._add(event, keep_order=True):
+                i = bisect.bisect_left(self._vocab, token)
+                if i == len(self._vocab) or self._vocab[i] != token:
+                    self._vocab.insert(i, token)
+
+    def remove(self, event_id):
+        with self._lock:
+            self._remove(event_id)
+
+    def mark_dirty(self, event_id=None):
+        """Schedule an event (or, with None, everything) to be reloaded before the next search"""
+        with self._lock:
+            if event_id is None:
+                self._needs_rebuild = True
+            else:
+                self._dirty.add(event_id)
+
+    def refresh(self):
+        """Apply pending reloads from MySQL; returns at once if another thread is already refreshing"""
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self._refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self):
+        with self._lock:
+            if self._needs_rebuild:
+                rebuild = True
+            elif not self._dirty:
+                return
+            else:
+                rebuild = False
+                ids = list(self._dirty)
+                self._dirty.clear()
+        if rebuild:
+            self.build_from_database()
+            return
+        conn = get_db_connection()
+        if not conn:
+            with self._lock:
+                self._dirty.update(ids)
+            raise ConnectionError("Database connection failed")
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"SELECT * FROM EVENTS WHERE event_id IN ({', '.join(['%s'] * len(ids))})", ids)
+        rows = {row["event_id"]: row for row in cursor.fetchall()}
+        cursor.close()
+        conn.close()
+        with self._lock:
+            for event_id in ids:
+                if event_id in rows:
+                    self.upsert(rows[event_id])
+                else:
+                    self._remove(event_id)
+
+    def search(self, keywords=None, max_price=None, event_type=None, upcoming_only=True, limit=10,
+               min_price=None, date_from=None, date_to=None):
+        """
+        Find events matching the chat search criteria
+
+        Args:
+            keywords: Words to match (any of them) against name, description, location and category
+            max_price: Maximum ticket price
+            event_type: Exact event_category
+            upcoming_only: Only events with event_status 'upcoming'
+            limit: Maximum number of events to return
+            min_price: Minimum ticket price
+            date_from: Earliest event_date (inclusive)
+            date_to: Latest event_date (exclusive)
+
+        Returns:
+            List of event rows, best match first
+        """
+        window = (
+            _sortable_date(date_from) if date_from is not None else None,
+            _sortable_date(date_to) if date_to is not None else None
+        )
+        with self._lock:
+            if keywords:
+                tokens = []
+                for keyword in keywords:
+                    for term in tokenize(keyword):
+                        for token in self._expand(term):
+                            if token not in tokens:
+                                tokens.append(token)
+                return self._top_k(tokens, (max_price, min_price, event_type, upcoming_only, window), limit)
+
+            if upcoming_only:
+                # Start at date_from rather than at the first upcoming event
+                start = bisect.bisect_left(self._upcoming, (window[0],)) if window[0] else 0
+                ordered = self._upcoming[start:]
+            else:
+                ordered = sorted((d, i) for i, d in self._dates.items())
+            results = []
+            for date, event_id in ordered:
+                if window[1] and date >= window[1]:
+                    break
+                event = self._docs[event_id]
+                if _matches(event, max_price, min_price, event_type, upcoming_only, window, date):
+                    results.append(event)
+                    if len(results) >= limit:
+                        break
+            return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                "events": len(self._docs),
+                "upcoming": len(self._upcoming),
+                "terms": len(self._postings),
+                "pending_updates": len(self._dirty),
+                "needs_rebuild": self._needs_rebuild
+            }
+
+    def _top_k(self, tokens, filters, limit):
+        lists = [self._ranked_list(token) for token in tokens]
+        postings = [self._postings[token] for token in tokens]
+        positions = [0] * len(lists)
+        seen = set()
+        candidates = []
+        best = []  # min-heap of the `limit` best scores seen so far
+        while True:
+            progressed = False
+            for i, ranked in enumerate(lists):
+                if positions[i] >= len(ranked):
+                    continue
+                _, date, event_id = ranked[positions[i]]
+                positions[i] += 1
+                progressed = True
+                if event_id in seen:
+                    continue
+                seen.add(event_id)
+                if not _matches(self._docs[event_id], *filters, date):
+                    continue
+                score = sum(p.get(event_id, 0.0) for p in postings)
+                candidates.append((-score, date, event_id))
+                if len(best) < limit:
+                    heapq.heappush(best, score)
+                elif score > best[0]:
+                    heapq.heapreplace(best, score)
+            if not progressed:
+                break
+            # No unread event can score more than the sum of the next entries
+            threshold = sum(-ranked[pos][0] for ranked, pos in zip(lists, positions) if pos < len(ranked))
+            if len(best) >= limit and best[0] >= threshold:
+                break
+        candidates.sort()
+        return [self._docs[event_id] for _, _, event_id in candidates[:limit]]
+
+    def _ranked_list(self, token):
+        ranked = self._ranked.get(token)
+        if ranked is None:
+            dates = self._dates
+            ranked = sorted((-score, dates[event_id], event_id) for event_id, score in self._postings[token].items())
+            self._ranked[token] = ranked
+        return ranked
+
+    def _expand(self, term):
+        # Every vocabulary token that starts with `term`
+        i = bisect.bisect_left(self._vocab, term)
+        tokens = []
+        while i < len(self._vocab) and self._vocab[i].startswith(term) and len(tokens) < MAX_PREFIX_EXPANSION:
+            tokens.append(self._vocab[i])
+            i += 1
+        return tokens
+
+    def _add(self, event, keep_order=False):
+        event_id = event["event_id"]
+        date = _sortable_date(event.get("event_date"))
+        self._docs[event_id] = event
+        self._dates[event_id] = date
+        tokens = set()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(event.get(field)):
+                postings = self._postings.setdefault(token, {})
+                postings[event_id] = postings.get(event_id, 0.0) + weight
+                tokens.add(token)
+        for token in tokens:
+            # Re-sorted on the next query that reads it
+            self._ranked.pop(token, None)
+        self._doc_tokens[event_id] = tokens
+        if event.get("event_status") == "upcoming":
+            entry = (date, event_id)
+            # build() appends and sorts once at the end
+            if keep_order:
+                bisect.insort(self._upcoming, entry)
+            else:
+                self._upcoming.append(entry)
+        return tokens
+
+    def _remove(self, event_id):
+        event = self._docs.pop(event_id, None)
+        if event is None:
+            return
+        date = self._dates.pop(event_id)
+        for token in self._doc_tokens.pop(event_id, ()):
+            self._ranked.pop(token, None)
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(event_id, None)
+                if not postings:
+                    del self._postings[token]
+                    i = bisect.bisect_left(self._vocab, token)
+                    if i < len(self._vocab) and self._vocab[i] == token:
+                        del self._vocab[i]
+        if event.get("event_status") == "upcoming":
+            entry = (date, event_id)
+            i = bisect.bisect_left(self._upcoming, entry)
+            if i < len(self._upcoming) and self._upcoming[i] == entry:
+                del self._upcoming[i]
+
+
+def _sortable_date(value):
+    # Dates arrive as datetimes from MySQL; compare everything as ISO strings
+    if value is None:
+        return "9999"
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def _matches(event, max_price, min_price, event_type, upcoming_only, window, date):
+    if upcoming_only and event.get("event_status") != "upcoming":
+        return False
+    if event_type and event.get("event_category") != event_type:
+        return False
+    if max_price is not None or min_price is not None:
+        price = event.get("ticket_price")
+        if price is None:
+            return False
+        if max_price is not None and price > max_price:
+            return False
+        if min_price is not None and price < min_price:
+            return False
+    date_from, date_to = window
+    if date_from and date < date_from:
+        return False
+    if date_to and date >= date_to:
+        return False
+    return True
+
+
+event_index = EventSearchIndex()
+# Reload changed events whenever the event cache is invalidated (locally or by another worker)
+add_invalidation_listener(event_index.mark_dirty)
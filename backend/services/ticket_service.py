@@ -0,0 +1,152 @@
+import os
+
+# How long a checkout hold keeps a seat before it lapses
+TICKET_HOLD_SECONDS = int(os.getenv("TICKET_HOLD_SECONDS", "300"))
+
+# Every path that touches capacity locks the EVENTS row before any
+# TICKET_HOLDS or TICKETS row, so concurrent buyers can't deadlock.
+#
+# Every TICKETS row holds one seat whatever its status: a cancelled or
+# refunded ticket keeps its seat until the ticket is deleted, as in the
+# COUNT(*) backfill of migration 0001. Changing a ticket's status leaves
+# capacity alone; moving it to another event moves the seat.
+
+_RESERVE_SQL = (
+    "UPDATE EVENTS SET {column} = {column} + %s WHERE event_id = %s "
+    "AND (max_attendees IS NULL OR tickets_sold + tickets_held + %s <= max_attendees)"
+)
+
+
+def reserve_seats(cursor, event_id, quantity=1, hold=False):
+    """
+    Atomically claim capacity on an event
+
+    One conditional UPDATE on the event's counter row does the check and
+    the increment together, so only that row is locked and overselling is
+    impossible no matter how many buyers race. Must run inside the caller's
+    transaction; roll back to give the seats back.
+
+    Args:
+        cursor: Cursor on the caller's transaction
+        event_id: Event to reserve on
+        quantity: Number of seats
+        hold: Count the seats as held (checkout in progress) rather than sold
+
+    Returns:
+        True if the seats were reserved, False if the event is full
+    """
+    sql = _RESERVE_SQL.format(column="tickets_held" if hold else "tickets_sold")
+    cursor.execute(sql, (quantity, event_id, quantity))
+    if cursor.rowcount:
+        return True
+    # Capacity may be tied up in holds that have lapsed; free them and retry once
+    if release_expired_holds(cursor, event_id):
+        cursor.execute(sql, (quantity, event_id, quantity))
+        return cursor.rowcount > 0
+    return False
+
+
+def release_seats(cursor, event_id, quantity=1):
+    """Give back sold seats (ticket deleted or insert abandoned)"""
+    cursor.execute(
+        "UPDATE EVENTS SET tickets_sold = GREATEST(tickets_sold - %s, 0) WHERE event_id = %s",
+        (quantity, event_id)
+    )
+
+
+def lock_events(cursor, event_ids):
+    """Lock several EVENTS rows in event_id order, so two transactions locking the same pair can't deadlock"""
+    ids = sorted(set(event_ids))
+    cursor.execute(
+        f"SELECT event_id FROM EVENTS WHERE event_id IN ({', '.join(['%s'] * len(ids))}) ORDER BY event_id FOR UPDATE",
+        ids
+    )
+    cursor.fetchall()
+
+
+def event_exists(cursor, event_id):
+    cursor.execute("SELECT 1 FROM EVENTS WHERE event_id = %s", (event_id,))
+    return cursor.fetchone() is not None
+
+
+def release_expired_holds(cursor, event_id):
+    """
+    Expire lapsed holds on an event and return their seats
+
+    Returns:
+        Number of holds expired
+    """
+    cursor.execute("SELECT event_id FROM EVENTS WHERE event_id = %s FOR UPDATE", (event_id,))
+    if cursor.fetchone() is None:
+        return 0
+    cursor.execute(
+        "UPDATE TICKET_HOLDS SET status = 'expired' WHERE event_id = %s AND status = 'active' AND expires_at <= UTC_TIMESTAMP()",
+        (event_id,)
+    )
+    expired = cursor.rowcount
+    if expired:
+        cursor.execute(
+            "UPDATE EVENTS SET tickets_held = GREATEST(tickets_held - %s, 0) WHERE event_id = %s",
+            (expired, event_id)
+        )
+    return expired
+
+
+def create_hold(cursor, event_id, user_id):
+    """
+    Hold one seat for TICKET_HOLD_SECONDS while the buyer checks out
+
+    Returns:
+        hold_id, or None if the event is full
+    """
+    if not reserve_seats(cursor, event_id, hold=True):
+        return None
+    cursor.execute(
+        "INSERT INTO TICKET_HOLDS (event_id, user_id, status, expires_at) VALUES (%s, %s, 'active', UTC_TIMESTAMP() + INTERVAL %s SECOND)",
+        (event_id, user_id, TICKET_HOLD_SECONDS)
+    )
+    return cursor.lastrowid
+
+
+def convert_hold(cursor, hold_id, event_id, user_id):
+    """
+    Turn an unexpired hold into a sold seat
+
+    Returns:
+        True on success; False if the hold is unknown, expired or already
+        used, in which case the caller must roll back
+    """
+    cursor.execute(
+        "UPDATE EVENTS SET tickets_held = GREATEST(tickets_held - 1, 0), tickets_sold = tickets_sold + 1 WHERE event_id = %s",
+        (event_id,)
+    )
+    if not cursor.rowcount:
+        return False
+    cursor.execute(
+        "UPDATE TICKET_HOLDS SET status = 'converted' WHERE hold_id = %s AND event_id = %s AND user_id = %s AND status = 'active' AND expires_at > UTC_TIMESTAMP()",
+        (hold_id, event_id, user_id)
+    )
+    return cursor.rowcount > 0
+
+
+def release_hold(cursor, hold_id):
+    """
+    Cancel an active hold and return its seat
+
+    Returns:
+        The hold's event_id if it was active, None otherwise (caller must roll back)
+    """
+    cursor.execute("SELECT event_id FROM TICKET_HOLDS WHERE hold_id = %s", (hold_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    event_id = row[0]
+    cursor.execute(
+        "UPDATE EVENTS SET tickets_held = GREATEST(tickets_held - 1, 0) WHERE event_id = %s",
+        (event_id,)
+    )
+    cursor.execute(
+        "UPDATE TICKET_HOLDS SET status = 'released' WHERE hold_id = %s AND status = 'active'",
+        (hold_id,)
+    )
+    return event_id if cursor.rowcount > 0 else None
@@ -0,0 +1,124 @@
+import json
+import os
+from flask import Response, current_app, request, stream_with_context
+from database import get_db_connection
+from pagination import parse_fields
+
+# Rows pulled from MySQL per fetchmany() round trip
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json"
+}
+
+
+def _iter_batches(cursor, columns, chunk_size):
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield [dict(zip(columns, row)) for row in rows]
+
+
+def export_response(table, columns, pk, where=None, params=()):
+    """
+    Stream every matching row of `table` without materializing the result
+
+    Reads with fetchmany() on an unbuffered cursor and serializes each batch
+    as it arrives, so memory stays flat regardless of table size. Supports
+    ?format=ndjson (default, one object per line) or ?format=json (a single
+    array written in chunks), plus the usual ?fields= projection.
+
+    Args:
+        table: Table name
+        columns: Columns the endpoint may export
+        pk: Primary key column, used for a stable ORDER BY
+        where: Optional extra filter, e.g. "user_id = %s"
+        params: Parameters for `where`
+
+    Returns:
+        Flask streaming Response, or an (error, status) tuple
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return {"error": f"Unsupported format '{fmt}'"}, 400
+    try:
+        selected = parse_fields(columns)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    query = f"SELECT {', '.join(selected)} FROM {table}"
+    if where:
+        query += f" WHERE {where}"
+    query += f" ORDER BY {pk} ASC"
+
+    # Run the query before any header goes out, so a bad connection or
+    # statement is still a proper 500 rather than a 200 with a cut-off body
+    conn = get_db_connection()
+    if not conn:
+        return {"error": "Database connection failed"}, 500
+    # Unbuffered: rows stay on the socket until fetchmany() asks for them
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(query, params)
+    except Exception as e:
+        print(f"Error exporting {table}: {e}")
+        cursor.close()
+        conn.close()
+        return {"error": str(e)}, 500
+
+    def generate(cursor):
+        dumps = current_app.json.dumps
+        first = True
+        try:
+            if fmt == "json":
+                yield "["
+            for batch in _iter_batches(cursor, selected, EXPORT_CHUNK_SIZE):
+                if fmt == "ndjson":
+                    yield "".join(dumps(row) + "\n" for row in batch)
+                else:
+                    chunk = ",".join(dumps(row) for row in batch)
+                    yield chunk if first else "," + chunk
+                    first = False
+            if fmt == "json":
+                yield "]"
+        except Exception as e:
+            # Headers are already sent; the truncated body signals the failure
+            print(f"Error exporting {table}: {e}")
+            if fmt == "ndjson":
+                yield dumps({"error": str(e)}) + "\n"
+        finally:
+            cursor.close()
+            conn.close()
+
+    return Response(stream_with_context(generate(cursor)), mimetype=EXPORT_FORMATS[fmt])
+
+
+def sse_response(events):
+    """
+    Stream (event, data) pairs as Server-Sent Events
+
+    Each pair becomes an "event:" line plus a JSON "data:" line and is
+    flushed as soon as the generator yields it, so the client sees the first
+    event without waiting for the rest.
+
+    Args:
+        events: Iterable of (event name, JSON-serializable data)
+
+    Returns:
+        Flask streaming Response
+    """
+    def generate():
+        for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx and similar proxies from buffering the stream
+            "X-Accel-Buffering": "no"
+        }
+    )
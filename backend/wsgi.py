@@ -0,0 +1,57 @@
+"""
+WSGI entry point for production serving
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app the master imports this module once: the app, its routes
+and the chat search index are built before forking, so workers share that
+memory copy-on-write and boot instantly. Nothing that owns a thread or a
+socket may cross the fork, so the master builds the app without background
+jobs and closes any DB connections it opened; each worker then calls
+init_worker() from gunicorn's post_worker_init hook.
+"""
+import database
+import metrics
+from app import create_app, start_background_jobs
+
+app = create_app(start_background=False)
+# Connections opened while preloading (migrations, search index) stay in the master
+database.reset_pool(dispose=True)
+
+
+def init_worker(singletons=True):
+    """
+    Give a freshly forked worker its own pools and threads
+
+    Caches come across from the master as they were after preload; the
+    event invalidation bus offset comes with them, so a worker forked late
+    replays every invalidation published since and catches up.
+
+    Args:
+        singletons: Also run the database-wide jobs (attendance reconcile,
+            revenue rollups); gunicorn.conf.py grants this to one worker
+    """
+    from services.auth_service import password_hasher
+    from services.chat_history import chat_writer
+    from services.ai_service import llm_client
+
+    database.reset_pool()
+    password_hasher.reset()
+    chat_writer.reset()
+    if llm_client is not None:
+        llm_client.reset()
+    start_background_jobs(singletons=singletons)
+
+
+def shutdown_worker():
+    """Flush buffered writes and close this worker's connections before it exits"""
+    from services.auth_service import password_hasher
+    from services.chat_history import chat_writer
+    from services.ai_service import llm_client
+
+    chat_writer.close()
+    metrics.write_snapshot()
+    password_hasher.shutdown()
+    if llm_client is not None:
+        llm_client.shutdown()
+    database.reset_pool(dispose=True)